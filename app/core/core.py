@@ -5,9 +5,12 @@ from pydantic import BaseModel
 from app.core.constants import Status
 from app.core.models import (
     Account,
+    Application,
     ApplicationId,
+    ApplicationIds,
     Industry,
     Matched,
+    MessagePage,
     OrganizationSize,
     Preference,
     SwipeDirection,
@@ -29,6 +32,7 @@ from app.core.services.application import ApplicationService
 from app.core.services.chat import ChatService
 from app.core.services.company import CompanyService
 from app.core.services.match import MatchService
+from app.core.services.notification import NotificationService
 from app.core.services.user import UserService
 
 
@@ -40,6 +44,7 @@ class Core:
     user_service: UserService
     match_service: MatchService
     chat_service: ChatService
+    notification_service: NotificationService
 
     def register(self, request: RegisterRequest) -> CoreResponse:
         status, account = self.account_service.register(
@@ -95,8 +100,8 @@ class Core:
     def create_application(
         self, account: Account, request: CreateApplicationRequest
     ) -> CoreResponse:
-        company = self.company_service.get_company(request.company_id)
-        if company is None or company.owner_username != account.username:
+        owner_username = self.company_service.get_owner_username(request.company_id)
+        if owner_username is None or owner_username != account.username:
             return CoreResponse(status=Status.COMPANY_DOES_NOT_EXIST)
 
         status, application = self.application_service.create_application(
@@ -116,6 +121,41 @@ class Core:
             status=status, response_content=ApplicationId(application_id=application.id)
         )
 
+    def create_applications(
+        self,
+        account: Account,
+        company_id: int,
+        requests: list[CreateApplicationRequest],
+    ) -> CoreResponse:
+        """Creates a batch of the company's applications, all or none of them."""
+        owner_username = self.company_service.get_owner_username(company_id)
+        if owner_username is None or owner_username != account.username:
+            return CoreResponse(status=Status.COMPANY_DOES_NOT_EXIST)
+
+        status, applications = self.application_service.create_applications(
+            [
+                Application.construct(
+                    id=0,
+                    title=request.title,
+                    location=request.location,
+                    job_type=request.job_type,
+                    experience_level=request.experience_level,
+                    skills=request.skills,
+                    description=request.description,
+                    company_id=company_id,
+                    views=0,
+                )
+                for request in requests
+            ]
+        )
+
+        return CoreResponse(
+            status=status,
+            response_content=ApplicationIds(
+                application_ids=[application.id for application in applications]
+            ),
+        )
+
     def get_application(self, request: GetApplicationRequest) -> CoreResponse:
         status, application = self.application_service.get_application(id=request.id)
 
@@ -123,8 +163,7 @@ class Core:
         return CoreResponse(status=status, response_content=application_response)
 
     def get_applications(self, company_id: int) -> CoreResponse:
-        company = self.company_service.get_company(company_id)
-        if company is None:
+        if not self.company_service.has_company(company_id):
             return CoreResponse(status=Status.COMPANY_DOES_NOT_EXIST)
 
         applications = self.application_service.get_applications(company_id)
@@ -137,12 +176,12 @@ class Core:
     def update_application(
         self, account: Account, request: UpdateApplicationRequest
     ) -> CoreResponse:
-        status, application = self.application_service.get_application(request.id)
-        if status != Status.OK or application is None:
+        status, company_id = self.application_service.get_company_id(request.id)
+        if status != Status.OK or company_id is None:
             return CoreResponse(status=status)
 
-        company = self.company_service.get_company(application.company_id)
-        if company is None or company.owner_username != account.username:
+        owner_username = self.company_service.get_owner_username(company_id)
+        if owner_username is None or owner_username != account.username:
             return CoreResponse(status=Status.COMPANY_DOES_NOT_EXIST)
 
         status, application = self.application_service.update_application(
@@ -237,10 +276,8 @@ class Core:
     def get_swipe_list_users(
         self, swiper_application_id: int, amount: int
     ) -> CoreResponse:
-        status, application = self.application_service.get_application(
-            id=swiper_application_id
-        )
-        if status != Status.OK or application is None:
+        status, _ = self.application_service.get_company_id(id=swiper_application_id)
+        if status != Status.OK:
             return CoreResponse(status=status)
 
         status, swipe_list = self.match_service.get_swipe_list_users(
@@ -272,47 +309,54 @@ class Core:
             status=status, response_content=SwipeListResponse(swipe_list=swipe_list)
         )
 
-    def _match(self, username: str, application_id: int) -> None:
+    def handle_match(self, username: str, application_id: int) -> CoreResponse:
+        # run by the outbox worker at least once per match; create_chat returns
+        # an existing chat and the notifications are keyed by it, so running
+        # again changes nothing
         status, application = self.application_service.get_application(
             id=application_id
         )
         if status != Status.OK or application is None:
-            return
+            return CoreResponse(status=status)
 
-        company = self.company_service.get_company(company_id=application.company_id)
+        company = self.company_service.get_company(application.company_id)
         if company is None:
-            return
+            return CoreResponse(status=Status.COMPANY_DOES_NOT_EXIST)
+        if company.owner_username == username:
+            return CoreResponse(status=Status.OK)
 
-        status, user = self.user_service.get_user(username=company.owner_username)
+        status, user = self.user_service.get_user(username=username)
         if status != Status.OK or user is None:
-            return
+            return CoreResponse(status=status)
 
-        if username != user.username:
-            self.chat_service.create_chat(username, user.username)
-            print(f"Chat between user: {username} and user: {user.username}")
+        status, chat = self.chat_service.create_chat(username, company.owner_username)
+        if status != Status.OK or chat is None:
+            return CoreResponse(status=status)
+
+        # both sides get everything needed to open the new chat
+        self.notification_service.notify_match(
+            chat=chat, application=application, company=company, user=user
+        )
+        return CoreResponse(status=Status.OK, response_content=chat)
 
     def swipe_application(
         self, swiper_username: str, application_id: int, direction: SwipeDirection
     ) -> CoreResponse:
-        status, application = self.application_service.get_application(
-            id=application_id
-        )
-        if status != Status.OK or application is None:
+        status, _ = self.application_service.get_company_id(id=application_id)
+        if status != Status.OK:
             return CoreResponse(status=status)
 
         status, user = self.user_service.get_user(username=swiper_username)
         if status != Status.OK or user is None:
             return CoreResponse(status=status)
 
+        # a match is picked up from the outbox by handle_match
         status, matched = self.match_service.swipe_application(
             swiper_username=swiper_username,
             application_id=application_id,
             direction=direction,
         )
 
-        if matched:
-            self._match(username=swiper_username, application_id=application_id)
-
         return CoreResponse(status=status, response_content=Matched(matched=matched))
 
     def swipe_user(
@@ -325,10 +369,8 @@ class Core:
         if status != Status.OK or user is None:
             return CoreResponse(status=status)
 
-        status, application = self.application_service.get_application(
-            id=swiper_application_id
-        )
-        if status != Status.OK or application is None:
+        status, _ = self.application_service.get_company_id(id=swiper_application_id)
+        if status != Status.OK:
             return CoreResponse(status=status)
 
         status, matched = self.match_service.swipe_user(
@@ -337,9 +379,6 @@ class Core:
             direction=direction,
         )
 
-        if matched:
-            self._match(username=swiped_username, application_id=swiper_application_id)
-
         return CoreResponse(status=status, response_content=Matched(matched=matched))
 
     def get_messages(self, account: Account, recipient_username: str) -> CoreResponse:
@@ -348,6 +387,25 @@ class Core:
             pass
         return CoreResponse(status=status, response_content=chat)
 
+    def get_message_history(
+        self,
+        account: Account,
+        recipient_username: str,
+        before: int | None,
+        limit: int,
+    ) -> CoreResponse:
+        status, messages = self.chat_service.get_messages(
+            account.username, recipient_username, before=before, limit=limit
+        )
+        if status != Status.OK:
+            return CoreResponse(status=status)
+
+        next_before = messages[0].message_id if len(messages) == limit else None
+        return CoreResponse(
+            status=status,
+            response_content=MessagePage(messages=messages, next_before=next_before),
+        )
+
     def get_user_chats(self, account: Account) -> CoreResponse:
         status, user_chats = self.chat_service.get_user_chats(username=account.username)
         return CoreResponse(status=status, response_content=UserChats(chats=user_chats))
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Hashable, Iterable, Iterator, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+_current: ContextVar[IdentityMap | None] = ContextVar("identity_map", default=None)
+
+_MISSING = object()
+
+
+@dataclass
+class IdentityMap:
+    """
+    Entities loaded during one unit of work (a request or a WebSocket message),
+    keyed by kind and id. Misses are remembered too, so checking for something
+    that does not exist twice costs one query.
+    """
+
+    entries: dict[tuple[str, Hashable], Any] = field(default_factory=dict)
+
+    def get(self, kind: str, key: Hashable) -> Any:
+        return self.entries.get((kind, key), _MISSING)
+
+    def put(self, kind: str, key: Hashable, value: Any) -> None:
+        self.entries[(kind, key)] = value
+
+    def evict(self, kind: str, key: Hashable) -> None:
+        self.entries.pop((kind, key), None)
+
+
+@contextmanager
+def identity_scope() -> Iterator[IdentityMap]:
+    current = _current.get()
+    if current is not None:
+        yield current
+        return
+
+    identity_map = IdentityMap()
+    token = _current.set(identity_map)
+    try:
+        yield identity_map
+    finally:
+        _current.reset(token)
+
+
+def load(kind: str, key: K, loader: Callable[[K], V]) -> V:
+    identity_map = _current.get()
+    if identity_map is None:
+        return loader(key)
+
+    value = identity_map.get(kind, key)
+    if value is _MISSING:
+        value = loader(key)
+        identity_map.put(kind, key, value)
+
+    return value  # type: ignore[no-any-return]
+
+
+def load_many(
+    kind: str, keys: Iterable[K], loader: Callable[[list[K]], dict[K, V]]
+) -> dict[K, V | None]:
+    """
+    Resolves every key, fetching all the ones not seen yet in this unit of work
+    with a single loader call. Keys the loader does not return map to None.
+    """
+    identity_map = _current.get()
+    keys = list(dict.fromkeys(keys))
+
+    if identity_map is None:
+        found = loader(keys)
+        return {key: found.get(key) for key in keys}
+
+    result: dict[K, V | None] = {}
+    missing = []
+    for key in keys:
+        value = identity_map.get(kind, key)
+        if value is _MISSING:
+            missing.append(key)
+        else:
+            result[key] = value
+
+    if missing:
+        found = loader(missing)
+        for key in missing:
+            result[key] = found.get(key)
+            identity_map.put(kind, key, result[key])
+
+    return result
+
+
+def store(kind: str, key: Hashable, value: Any) -> None:
+    identity_map = _current.get()
+    if identity_map is not None:
+        identity_map.put(kind, key, value)
+
+
+def evict(kind: str, key: Hashable) -> None:
+    identity_map = _current.get()
+    if identity_map is not None:
+        identity_map.evict(kind, key)
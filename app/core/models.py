@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from enum import StrEnum
+from typing import Any
 
 from pydantic import BaseModel, Field
 
@@ -152,6 +153,10 @@ class ApplicationId(BaseModel):
     application_id: int
 
 
+class ApplicationIds(BaseModel):
+    application_ids: list[int]
+
+
 class InMemoryToken(BaseModel):
     token: str
 
@@ -177,8 +182,42 @@ class Chat(BaseModel):
     chat_id: int
     username1: str
     username2: str
+    # only the newest messages, when older ones were archived older_before is
+    # set: pass it as `before` to GET /chat/{recipient}/messages to page back
     message_list: list[Message] = Field(default_factory=list)
+    older_before: int | None = None
+
+
+class MessagePage(BaseModel):
+    messages: list[Message] = Field(default_factory=list)
+    # pass as `before` to get the page preceding this one
+    next_before: int | None = None
 
 
 class UserChats(BaseModel):
     chats: list[Chat] = Field(default_factory=list)
+
+
+class MatchCounterpart(BaseModel):
+    username: str
+    # the company's name for the candidate, the username for the company
+    name: str
+    image_uri: str = ""
+
+
+class MatchEvent(BaseModel):
+    chat_id: int
+    application_id: int
+    application_title: str
+    counterpart: MatchCounterpart
+
+
+class Notification(BaseModel):
+    id: int
+    username: str
+    kind: str
+    data: dict[str, Any] = Field(default_factory=dict)
+    # a keyed notification is only ever added once per user and kind; once
+    # acknowledged it is kept, emptied, to remember that
+    key: str | None = None
+    acknowledged: bool = False
@@ -0,0 +1,8 @@
+from typing import Protocol
+
+from app.core.models import Notification
+
+
+class INotificationPublisher(Protocol):
+    def publish(self, notification: Notification) -> None:
+        pass
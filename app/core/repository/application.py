@@ -16,15 +16,27 @@ class IApplicationRepository(Protocol):
     ) -> Application | None:
         pass
 
+    def create_applications(self, applications: list[Application]) -> list[Application]:
+        """Inserts all of them together, each gets a new id in place of its own."""
+        pass
+
     def get_application(self, id: int) -> Application | None:
         pass
 
     def get_company_applications(self, company_id: int) -> list[Application]:
         pass
 
+    def get_companies_applications(
+        self, company_ids: list[int]
+    ) -> dict[int, list[Application]]:
+        pass
+
     def has_application(self, id: int) -> bool:
         pass
 
+    def get_company_id(self, id: int) -> int | None:
+        pass
+
     def update_application(
         self,
         id: int,
@@ -5,6 +5,7 @@ from app.core.models import Chat, Message
 
 class IChatRepository(Protocol):
     def create_chat(self, username1: str, username2: str) -> Chat | None:
+        """Returns the existing chat if the two users already have one."""
         pass
 
     def get_chat(self, username1: str, username2: str) -> Chat | None:
@@ -13,8 +14,22 @@ class IChatRepository(Protocol):
     def has_chat(self, username1: str, username2: str) -> bool:
         pass
 
-    def add_message(self, message: Message) -> bool:
+    def get_chat_id(self, username1: str, username2: str) -> int | None:
+        pass
+
+    def add_message(self, message: Message) -> Message | None:
         pass
 
     def get_user_chats(self, username: str) -> list[Chat]:
         pass
+
+    def get_messages(
+        self, chat_id: int, before: int | None, limit: int
+    ) -> list[Message]:
+        pass
+
+    def get_undelivered(self, username: str, limit: int) -> list[Message]:
+        pass
+
+    def acknowledge(self, username: str, message_id: int) -> None:
+        pass
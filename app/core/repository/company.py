@@ -10,6 +10,12 @@ class ICompanyRepository(Protocol):
     def get_user_companies(self, username: str) -> list[Company]:
         pass
 
+    def has_company(self, company_id: int) -> bool:
+        pass
+
+    def get_owner_username(self, company_id: int) -> str | None:
+        pass
+
     def create_company(
         self,
         name: str,
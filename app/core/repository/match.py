@@ -18,7 +18,8 @@ class IMatchRepository(Protocol):
         application_id: int,
         direction: SwipeDirection,
         swipe_for: SwipeFor,
-    ) -> None:
+    ) -> bool:
+        """Returns whether the swipe left both sides liking each other."""
         pass
 
     def matched(self, username: str, application_id: int) -> bool:
@@ -0,0 +1,17 @@
+from typing import Any, Protocol
+
+from app.core.models import Notification
+
+
+class INotificationRepository(Protocol):
+    def add_notification(
+        self, username: str, kind: str, data: dict[str, Any], key: str | None = None
+    ) -> Notification | None:
+        """Returns None when the user already had a `kind` notification `key`."""
+        pass
+
+    def get_notifications(self, username: str, limit: int) -> list[Notification]:
+        pass
+
+    def acknowledge(self, username: str, notification_id: int) -> None:
+        pass
@@ -13,6 +13,9 @@ class IUserRepository(Protocol):
     def get_user(self, username: str) -> User | None:
         pass
 
+    def get_users(self, usernames: list[str]) -> dict[str, User]:
+        pass
+
     def has_user(self, username: str) -> bool:
         pass
 
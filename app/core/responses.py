@@ -15,6 +15,16 @@ class ApplicationsResponse(BaseModel):
     applications: list[Application]
 
 
+class RowError(BaseModel):
+    line: int
+    error: str
+
+
+class BulkApplicationsResponse(BaseModel):
+    application_ids: list[int] = Field(default_factory=list)
+    errors: list[RowError] = Field(default_factory=list)
+
+
 class SwipeListResponse(BaseModel):
     swipe_list: list[Application] | list[User] = Field(default_factory=list)
 
@@ -1,5 +1,6 @@
 from dataclasses import dataclass
 
+from app.core import identity_map
 from app.core.constants import Status
 from app.core.models import Application, ExperienceLevel, JobLocation, JobType
 from app.core.repository.application import IApplicationRepository
@@ -33,15 +34,40 @@ class ApplicationService:
         if application is None:
             return Status.APPLICATION_CREATE_ERROR, None
 
+        identity_map.store("application", application.id, application)
+        # the owning company's application list just changed
+        identity_map.evict("company", company_id)
         return Status.OK, application
 
+    def create_applications(
+        self, applications: list[Application]
+    ) -> tuple[Status, list[Application]]:
+        created = self.application_repository.create_applications(applications)
+        if len(created) != len(applications):
+            return Status.APPLICATION_CREATE_ERROR, created
+
+        for company_id in {application.company_id for application in created}:
+            identity_map.evict("company", company_id)
+        return Status.OK, created
+
     def get_application(self, id: int) -> tuple[Status, Application | None]:
-        application = self.application_repository.get_application(id=id)
+        application = identity_map.load(
+            "application", id, self.application_repository.get_application
+        )
         if application is None:
             return Status.APPLICATION_DOES_NOT_EXIST, None
 
         return Status.OK, application
 
+    def get_company_id(self, id: int) -> tuple[Status, int | None]:
+        company_id = identity_map.load(
+            "application.company_id", id, self.application_repository.get_company_id
+        )
+        if company_id is None:
+            return Status.APPLICATION_DOES_NOT_EXIST, None
+
+        return Status.OK, company_id
+
     def update_application(
         self,
         id: int,
@@ -66,14 +92,19 @@ class ApplicationService:
         )
 
         if application is None:
+            identity_map.evict("application", id)
             return Status.APPLICATION_UPDATE_ERROR, None
 
+        identity_map.store("application", id, application)
+        # the owning company's application list holds the old version
+        identity_map.evict("company", application.company_id)
         return Status.OK, application
 
     def application_interaction(self, id: int) -> Status:
         if not self.application_repository.has_application(id=id):
             return Status.APPLICATION_DOES_NOT_EXIST
 
+        identity_map.evict("application", id)
         if not self.application_repository.application_interaction(id=id):
             return Status.APPLICATION_INTERACTION_ERROR
 
@@ -83,6 +114,12 @@ class ApplicationService:
         if not self.application_repository.has_application(id=id):
             return Status.APPLICATION_DOES_NOT_EXIST
 
+        # usually already loaded by the ownership check
+        _, company_id = self.get_company_id(id)
+        identity_map.evict("application", id)
+        identity_map.evict("application.company_id", id)
+        if company_id is not None:
+            identity_map.evict("company", company_id)
         if not self.application_repository.delete_application(id=id):
             return Status.APPLICATION_DELETE_ERROR
 
@@ -1,5 +1,6 @@
 from dataclasses import dataclass
 
+from app.core import identity_map
 from app.core.constants import Status
 from app.core.models import Chat, Message
 from app.core.repository.chat import IChatRepository
@@ -11,10 +12,14 @@ class ChatService:
     user_repository: IUserRepository
     chat_repository: IChatRepository
 
+    def _users_exist(self, *usernames: str) -> bool:
+        users = identity_map.load_many(
+            "user", usernames, self.user_repository.get_users
+        )
+        return all(user is not None for user in users.values())
+
     def create_chat(self, username1: str, username2: str) -> tuple[Status, Chat | None]:
-        if self.user_repository.has_user(
-            username=username1
-        ) and self.user_repository.has_user(username=username2):
+        if self._users_exist(username1, username2):
             chat: Chat | None = self.chat_repository.create_chat(
                 username1=username1, username2=username2
             )
@@ -23,9 +28,7 @@ class ChatService:
         return Status.USER_NOT_FOUND, None
 
     def get_chat(self, username1: str, username2: str) -> tuple[Status, Chat | None]:
-        if self.user_repository.has_user(
-            username=username1
-        ) and self.user_repository.has_user(username=username2):
+        if self._users_exist(username1, username2):
             chat: Chat | None = self.chat_repository.get_chat(
                 username1=username1, username2=username2
             )
@@ -34,18 +37,42 @@ class ChatService:
             return Status.OK, chat
         return Status.USER_NOT_FOUND, None
 
-    def send_message(self, message: Message) -> Status:
-        if (
-            self.user_repository.has_user(username=message.sender_username)
-            and self.user_repository.has_user(username=message.recipient_username)
-            and self.chat_repository.has_chat(
-                username1=message.sender_username, username2=message.recipient_username
-            )
-        ):
-            if not self.chat_repository.add_message(message=message):
-                return Status.USER_NOT_FOUND
-            return Status.OK
-        return Status.USER_NOT_FOUND
+    def send_message(self, message: Message) -> tuple[Status, Message | None]:
+        if not self._users_exist(message.sender_username, message.recipient_username):
+            return Status.USER_NOT_FOUND, None
+
+        # add_message looks the chat up by id and fails when there is none
+        stored = self.chat_repository.add_message(message=message)
+        if stored is None:
+            return Status.USER_NOT_FOUND, None
+        return Status.OK, stored
+
+    def get_messages(
+        self, username1: str, username2: str, before: int | None, limit: int
+    ) -> tuple[Status, list[Message]]:
+        if not self._users_exist(username1, username2):
+            return Status.USER_NOT_FOUND, []
+
+        chat_id = self.chat_repository.get_chat_id(
+            username1=username1, username2=username2
+        )
+        if chat_id is None:
+            return Status.USER_NOT_FOUND, []
+
+        messages = self.chat_repository.get_messages(
+            chat_id=chat_id, before=before, limit=limit
+        )
+        return Status.OK, messages
+
+    def get_undelivered(
+        self, username: str, limit: int
+    ) -> tuple[Status, list[Message]]:
+        messages = self.chat_repository.get_undelivered(username=username, limit=limit)
+        return Status.OK, messages
+
+    def acknowledge(self, username: str, message_id: int) -> Status:
+        self.chat_repository.acknowledge(username=username, message_id=message_id)
+        return Status.OK
 
     def get_user_chats(self, username: str) -> tuple[Status, list[Chat]]:
         user_chats: list[Chat] = self.chat_repository.get_user_chats(username=username)
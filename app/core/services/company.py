@@ -1,5 +1,6 @@
 from dataclasses import dataclass
 
+from app.core import identity_map
 from app.core.constants import Status
 from app.core.models import Account, Application, Company, Industry, OrganizationSize
 from app.core.repository.account import IAccountRepository
@@ -12,7 +13,19 @@ class CompanyService:
     account_repository: IAccountRepository
 
     def get_company(self, company_id: int) -> Company | None:
-        return self.company_repository.get_company(company_id=company_id)
+        return identity_map.load(
+            "company", company_id, self.company_repository.get_company
+        )
+
+    def has_company(self, company_id: int) -> bool:
+        return self.get_owner_username(company_id=company_id) is not None
+
+    def get_owner_username(self, company_id: int) -> str | None:
+        return identity_map.load(
+            "company.owner_username",
+            company_id,
+            self.company_repository.get_owner_username,
+        )
 
     def create_company(
         self,
@@ -40,6 +53,7 @@ class CompanyService:
         if company is None:
             return Status.ERROR_CREATING_COMPANY, company
 
+        identity_map.store("company", company.id, company)
         return Status.OK, company
 
     def update_company(
@@ -65,6 +79,7 @@ class CompanyService:
             image_uri=image_uri,
             cover_image_uri=cover_image_uri,
         )
+        identity_map.store("company", company_id, company)
         if company is None:
             return Status.COMPANY_DOES_NOT_EXIST, None
 
@@ -74,11 +89,14 @@ class CompanyService:
         if not account.has_company_with_id(company_id=company_id):
             return Status.COMPANY_DOES_NOT_EXIST
 
+        identity_map.evict("company", company_id)
+        identity_map.evict("company.owner_username", company_id)
         if self.company_repository.delete_company(company_id=company_id):
             return Status.OK
         return Status.ERROR_DELETING_COMPANY
 
     def link_application(self, company_id: int, application: Application) -> Status:
+        identity_map.evict("company", company_id)
         if not self.company_repository.link_application(
             company_id=company_id, application=application
         ):
@@ -29,16 +29,12 @@ class MatchService:
     def swipe_application(
         self, swiper_username: str, application_id: int, direction: SwipeDirection
     ) -> tuple[Status, bool]:
-        self.match_repository.swipe(
+        matched = self.match_repository.swipe(
             username=swiper_username,
             application_id=application_id,
             direction=direction,
             swipe_for=SwipeFor.APPLICATION,
         )
-
-        matched = direction == SwipeDirection.RIGHT and self.match_repository.matched(
-            username=swiper_username, application_id=application_id
-        )
         return Status.OK, matched
 
     # Return true if matched, otherwise return false
@@ -48,14 +44,10 @@ class MatchService:
         swiped_username: str,
         direction: SwipeDirection,
     ) -> tuple[Status, bool]:
-        self.match_repository.swipe(
+        matched = self.match_repository.swipe(
             username=swiped_username,
             application_id=swiper_application_id,
             direction=direction,
             swipe_for=SwipeFor.USER,
         )
-
-        matched = direction == SwipeDirection.RIGHT and self.match_repository.matched(
-            username=swiped_username, application_id=swiper_application_id
-        )
         return Status.OK, matched
@@ -0,0 +1,83 @@
+from dataclasses import dataclass
+from typing import Any
+
+from app.core.constants import Status
+from app.core.models import (
+    Application,
+    Chat,
+    Company,
+    MatchCounterpart,
+    MatchEvent,
+    Notification,
+    User,
+)
+from app.core.publisher import INotificationPublisher
+from app.core.repository.notification import INotificationRepository
+
+
+@dataclass
+class NotificationService:
+    notification_repository: INotificationRepository
+    # without a publisher notifications wait for the user's next connect
+    publisher: INotificationPublisher | None = None
+
+    def notify(
+        self, username: str, kind: str, data: dict[str, Any], key: str | None = None
+    ) -> Notification | None:
+        # handlers run at least once, a key makes their notifications go out once
+        notification = self.notification_repository.add_notification(
+            username=username, kind=kind, data=data, key=key
+        )
+        if notification is not None and self.publisher is not None:
+            self.publisher.publish(notification)
+
+        return notification
+
+    def notify_match(
+        self, chat: Chat, application: Application, company: Company, user: User
+    ) -> None:
+        key = f"{chat.chat_id}:{application.id}"
+        self.notify(
+            username=user.username,
+            kind="match",
+            data=MatchEvent(
+                chat_id=chat.chat_id,
+                application_id=application.id,
+                application_title=application.title,
+                counterpart=MatchCounterpart(
+                    username=company.owner_username,
+                    name=company.name,
+                    image_uri=company.image_uri,
+                ),
+            ).dict(),
+            key=key,
+        )
+        self.notify(
+            username=company.owner_username,
+            kind="match",
+            data=MatchEvent(
+                chat_id=chat.chat_id,
+                application_id=application.id,
+                application_title=application.title,
+                counterpart=MatchCounterpart(
+                    username=user.username,
+                    name=user.username,
+                    image_uri=user.image_uri,
+                ),
+            ).dict(),
+            key=key,
+        )
+
+    def get_notifications(
+        self, username: str, limit: int
+    ) -> tuple[Status, list[Notification]]:
+        notifications = self.notification_repository.get_notifications(
+            username=username, limit=limit
+        )
+        return Status.OK, notifications
+
+    def acknowledge(self, username: str, notification_id: int) -> Status:
+        self.notification_repository.acknowledge(
+            username=username, notification_id=notification_id
+        )
+        return Status.OK
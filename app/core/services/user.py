@@ -1,5 +1,6 @@
 from dataclasses import dataclass
 
+from app.core import identity_map
 from app.core.constants import Status
 from app.core.models import Account, Preference, User
 from app.core.repository.user import IUserRepository
@@ -11,6 +12,7 @@ class UserService:
 
     def create_user(self, account: Account) -> tuple[Status, User | None]:
         user = self.user_repository.create_user(username=account.username)
+        identity_map.store("user", account.username, user)
 
         status = Status.USER_SETUP_ERROR if user is None else Status.OK
 
@@ -23,16 +25,17 @@ class UserService:
         updated_user = self.user_repository.update_user(
             username=account.username, user=user
         )
+        identity_map.evict("user", account.username)
 
         status = Status.USER_SETUP_ERROR if updated_user is None else Status.OK
 
         return status, updated_user
 
     def get_user(self, username: str) -> tuple[Status, User | None]:
-        if not self.user_repository.has_user(username=username):
+        user = identity_map.load("user", username, self.user_repository.get_user)
+        if user is None:
             return Status.ACCOUNT_DOES_NOT_EXIST, None
 
-        user = self.user_repository.get_user(username=username)
         return Status.OK, user
 
     def update_preferences(
@@ -41,6 +44,7 @@ class UserService:
         updated_user = self.user_repository.update_preferences(
             username=account.username, preference=preference
         )
+        identity_map.store("user", account.username, updated_user)
 
         status = Status.USER_SETUP_ERROR if updated_user is None else Status.OK
 
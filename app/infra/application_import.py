@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import AsyncIterator, BinaryIO, Iterator, cast
+
+import orjson
+from pydantic import ValidationError, parse_obj_as
+
+from app.core.constants import Status
+from app.core.core import Core
+from app.core.models import Account, ApplicationIds
+from app.core.requests import CreateApplicationRequest
+from app.core.responses import BulkApplicationsResponse, CoreResponse, RowError
+
+# far beyond any real application, and what a single line may hold in memory
+MAX_LINE_LENGTH = 64 * 1024
+
+
+def _describe(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc'][1:])}: {detail['msg']}"
+        for detail in error.errors()
+    )
+
+
+def read_file_lines(
+    file: BinaryIO, max_length: int = MAX_LINE_LENGTH
+) -> Iterator[bytes | None]:
+    """
+    read_lines() for a file: never reads more than `max_length` bytes of a line
+    at once, and skips a longer one up to its end, yielding None for it.
+    """
+    while line := file.readline(max_length + 1):
+        if line.endswith(b"\n"):
+            yield line[:-1]
+        elif len(line) <= max_length:
+            # the last line, without a newline
+            yield line
+        else:
+            while line and not line.endswith(b"\n"):
+                line = file.readline(max_length + 1)
+            yield None
+
+
+async def read_lines(
+    chunks: AsyncIterator[bytes], max_length: int = MAX_LINE_LENGTH
+) -> AsyncIterator[bytes | None]:
+    """
+    Splits a byte stream into lines. A line longer than `max_length` is not
+    buffered but skipped up to its end, and comes out as None.
+    """
+    buffer = bytearray()
+    oversized = False
+    async for chunk in chunks:
+        start = 0
+        while (end := chunk.find(b"\n", start)) != -1:
+            if oversized or len(buffer) + end - start > max_length:
+                yield None
+            else:
+                buffer += chunk[start:end]
+                yield bytes(buffer)
+            buffer.clear()
+            oversized = False
+            start = end + 1
+
+        if not oversized:
+            buffer += chunk[start:]
+            if len(buffer) > max_length:
+                buffer.clear()
+                oversized = True
+
+    if oversized:
+        yield None
+    elif buffer:
+        yield bytes(buffer)
+
+
+@dataclass
+class ApplicationImport:
+    """
+    Validates JSONL rows as they arrive and creates the valid ones
+    `chunk_size` at a time, each chunk in one transaction. Rows that fail are
+    reported by line number and do not hold up the others. Should the company
+    be deleted midway, the chunks already created stay and every row from then
+    on fails.
+    """
+
+    core: Core
+    account: Account
+    company_id: int
+    chunk_size: int = 500
+    result: BulkApplicationsResponse = field(default_factory=BulkApplicationsResponse)
+    _pending: list[tuple[int, CreateApplicationRequest]] = field(default_factory=list)
+    _stopped: Status | None = None
+
+    def _fail(self, line: int, error: str) -> None:
+        self.result.errors.append(RowError(line=line, error=error))
+
+    def check(self) -> CoreResponse:
+        """Whether the account may import into the company, before any rows."""
+        # creating nothing only checks who owns the company
+        return self.core.create_applications(
+            account=self.account, company_id=self.company_id, requests=[]
+        )
+
+    def add(self, line: int, text: bytes | str | None) -> bool:
+        """
+        Takes a line as read, None for one too long to read. Returns whether a
+        chunk is ready to be flushed.
+        """
+        if text is None or len(text) > MAX_LINE_LENGTH:
+            self._fail(line, f"longer than {MAX_LINE_LENGTH} bytes")
+            return False
+        if not text.strip():
+            return False
+        if self._stopped is not None:
+            self._fail(line, self._stopped.value)
+            return False
+
+        try:
+            row = orjson.loads(text)
+            if not isinstance(row, dict):
+                raise ValueError("expected a JSON object")
+            request = parse_obj_as(
+                CreateApplicationRequest, {"company_id": self.company_id, **row}
+            )
+        except ValidationError as error:
+            self._fail(line, _describe(error))
+            return False
+        except ValueError as error:
+            self._fail(line, str(error))
+            return False
+
+        if request.company_id != self.company_id:
+            self._fail(line, "company_id: does not match the company imported into")
+            return False
+
+        self._pending.append((line, request))
+        return len(self._pending) >= self.chunk_size
+
+    def add_all(self, lines: list[tuple[int, bytes | None]]) -> None:
+        """
+        Adds lines and flushes each chunk they fill. Validation is CPU-bound, so
+        callers on an event loop run this in a thread.
+        """
+        for line, text in lines:
+            if self.add(line, text):
+                self.flush()
+
+    def flush(self) -> CoreResponse:
+        pending, self._pending = self._pending, []
+        if not pending:
+            return CoreResponse()
+
+        response = self.core.create_applications(
+            account=self.account,
+            company_id=self.company_id,
+            requests=[request for _, request in pending],
+        )
+        if response.status == Status.OK:
+            created = cast(ApplicationIds, response.response_content)
+            self.result.application_ids += created.application_ids
+        else:
+            for line, _ in pending:
+                self._fail(line, response.status.value)
+            if response.status == Status.COMPANY_DOES_NOT_EXIST:
+                self._stopped = response.status
+
+        return response
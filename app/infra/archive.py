@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import sys
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from sqlite3 import Connection
+
+import orjson
+
+from app.core.models import Message
+from app.infra.db_setup import connect
+from app.infra.metrics import MetricsRegistry
+from app.infra.repository import hydration
+from app.infra.writer import Writer
+
+logger = logging.getLogger(__name__)
+
+
+def create_archive_tables(connection: Connection) -> None:
+    connection.execute(
+        """
+        CREATE TABLE IF NOT EXISTS message_block (
+            id INTEGER PRIMARY KEY,
+            chat_id INTEGER NOT NULL,
+            first_id INTEGER NOT NULL,
+            last_id INTEGER NOT NULL,
+            count INTEGER NOT NULL,
+            data BLOB NOT NULL
+        )
+        """
+    )
+    connection.execute(
+        """
+        CREATE INDEX IF NOT EXISTS message_block_chat
+            ON message_block (chat_id, last_id)
+        """
+    )
+    connection.commit()
+
+
+@dataclass
+class MessageArchive:
+    """
+    Cold chat history, kept in a SQLite file of its own as zlib-compressed
+    blocks of consecutive messages from one chat. Blocks are immutable, so
+    decoded ones are cached.
+    """
+
+    path: Path | str
+
+    def __post_init__(self) -> None:
+        self.connection = connect(self.path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        create_archive_tables(self.connection)
+        self._block = functools.lru_cache(maxsize=256)(self._load_block)
+
+    def last_archived_id(self, chat_id: int) -> int:
+        cursor = self.connection.cursor()
+        row = cursor.execute(
+            "SELECT MAX(last_id) FROM message_block WHERE chat_id = ?", [chat_id]
+        ).fetchone()
+        cursor.close()
+
+        return 0 if row[0] is None else int(row[0])
+
+    def last_archived_ids(self, chat_ids: list[int]) -> dict[int, int]:
+        """The last archived id of each of `chat_ids` with anything archived."""
+        if not chat_ids:
+            return {}
+
+        cursor = self.connection.cursor()
+        rows = cursor.execute(
+            f"SELECT chat_id, MAX(last_id) FROM message_block "
+            f"WHERE chat_id IN ({','.join('?' * len(chat_ids))}) GROUP BY chat_id",
+            chat_ids,
+        ).fetchall()
+        cursor.close()
+
+        return {chat_id: last_id for chat_id, last_id in rows}
+
+    def store(self, chat_id: int, rows: list[tuple[int, str, str, str, str]]) -> None:
+        data = zlib.compress(orjson.dumps(rows))
+        self.connection.execute(
+            "INSERT INTO message_block (chat_id, first_id, last_id, count, data) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [chat_id, rows[0][0], rows[-1][0], len(rows), data],
+        )
+        self.connection.commit()
+
+    def _load_block(self, block_id: int) -> list[Message]:
+        cursor = self.connection.cursor()
+        row = cursor.execute(
+            "SELECT data FROM message_block WHERE id = ?", [block_id]
+        ).fetchone()
+        cursor.close()
+
+        return [hydration.message(row) for row in orjson.loads(zlib.decompress(row[0]))]
+
+    def get_messages(self, chat_id: int, before: int, limit: int) -> list[Message]:
+        """Up to `limit` messages older than `before`, newest first."""
+        cursor = self.connection.cursor()
+        blocks = cursor.execute(
+            "SELECT id FROM message_block "
+            "WHERE chat_id = ? AND first_id < ? "
+            "ORDER BY last_id DESC",
+            [chat_id, before],
+        )
+
+        result: list[Message] = []
+        for (block_id,) in blocks:
+            for message in reversed(self._block(block_id)):
+                if message.message_id < before:
+                    result.append(message)
+                    if len(result) == limit:
+                        cursor.close()
+                        return result
+
+        cursor.close()
+        return result
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+@dataclass
+class MessageArchiver:
+    """
+    Periodically moves all but the newest `hot_messages` of every chat into the
+    archive, a whole block at a time. Messages their recipient has not
+    acknowledged yet stay hot, along with everything after them, so offline
+    delivery only ever reads the message table.
+
+    Blocks are written before the hot rows are deleted, and rows at or below a
+    chat's last archived id are only deleted, so an interrupted run is finished
+    by the next one.
+    """
+
+    connection: Connection
+    writer: Writer
+    archive: MessageArchive
+    metrics: MetricsRegistry
+    hot_messages: int = 200
+    block_size: int = 100
+    interval: float = 300.0
+    _task: asyncio.Task[None] | None = None
+
+    def __post_init__(self) -> None:
+        self.archived = self.metrics.counter(
+            "messages_archived_total", "Messages moved to the archive tier"
+        )
+
+    def _archive_chat(self, chat_id: int, count: int) -> None:
+        cold = (count - self.hot_messages) // self.block_size * self.block_size
+        after = self.archive.last_archived_id(chat_id)
+
+        cursor = self.connection.cursor()
+        (undelivered,) = cursor.execute(
+            """
+            SELECT MIN(m.id)
+              FROM message m
+              LEFT JOIN delivery_cursor d ON d.user_id = m.recipient_id
+             WHERE m.chat_id = ?
+               AND m.id > COALESCE(d.message_id, 0)
+            """,
+            [chat_id],
+        ).fetchone()
+        # blocks keep usernames, so they read back without the user table
+        rows = cursor.execute(
+            """
+            SELECT m.id, s.username, r.username, m.time, m.text
+              FROM message m
+              JOIN user s ON s.id = m.sender_id
+              JOIN user r ON r.id = m.recipient_id
+             WHERE m.chat_id = ? AND m.id < ?
+             ORDER BY m.id
+             LIMIT ?
+            """,
+            [chat_id, sys.maxsize if undelivered is None else undelivered, cold],
+        ).fetchall()
+        cursor.close()
+
+        fresh = [row for row in rows if row[0] > after]
+        fresh = fresh[: len(fresh) // self.block_size * self.block_size]
+        for start in range(0, len(fresh), self.block_size):
+            end = start + self.block_size
+            self.archive.store(chat_id, fresh[start:end])
+
+        last_id = fresh[-1][0] if fresh else after
+        if last_id == 0:
+            return
+
+        self.writer.execute(
+            lambda connection: connection.execute(
+                "DELETE FROM message WHERE chat_id = ? AND id <= ?",
+                [chat_id, last_id],
+            ).close()
+        )
+        self.archived.inc(len(fresh))
+
+    def run_once(self) -> None:
+        cursor = self.connection.cursor()
+        chats = cursor.execute(
+            "SELECT chat_id, COUNT(*) FROM message "
+            "GROUP BY chat_id HAVING COUNT(*) >= ?",
+            [self.hot_messages + self.block_size],
+        ).fetchall()
+        cursor.close()
+
+        for chat_id, count in chats:
+            self._archive_chat(chat_id, count)
+
+    async def _run_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.run_once)
+            except Exception:
+                logger.exception("archiving messages failed")
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run_periodically())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
@@ -10,6 +10,12 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DB_PATH = Path(BASE_DIR).joinpath("..").joinpath("app.db")
 
 
+def connect(
+    path: Path | str = DB_PATH, factory: type[Connection] = Connection
+) -> Connection:
+    return sqlite3.connect(path, check_same_thread=False, factory=factory)
+
+
 @dataclass
 class ConnectionProvider:
     _connection: Connection | None = field(default=None, init=False)
@@ -17,7 +23,7 @@ class ConnectionProvider:
     @classmethod
     def get_connection(cls) -> Connection:
         if cls._connection is None:
-            cls._connection = sqlite3.connect(DB_PATH, check_same_thread=False)
+            cls._connection = connect(DB_PATH)
 
         return cls._connection
 
@@ -30,6 +36,16 @@ def create_tables(cursor: Cursor, connection: Connection) -> None:
     cursor.execute("DROP TABLE IF EXISTS swipe;")
     cursor.execute("DROP TABLE IF EXISTS message;")
     cursor.execute("DROP TABLE IF EXISTS chat;")
+    cursor.execute("DROP TABLE IF EXISTS delivery_cursor;")
+    cursor.execute("DROP TABLE IF EXISTS notification;")
+    cursor.execute("DROP TABLE IF EXISTS outbox;")
+
+    # lets the swipe compactor hand the pages it empties back to the filesystem;
+    # the mode of an existing file only changes when it is rebuilt, once
+    (auto_vacuum,) = cursor.execute("PRAGMA auto_vacuum").fetchone()
+    if auto_vacuum != 2:
+        cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        cursor.execute("VACUUM")
 
     cursor.execute(
         """
@@ -88,17 +104,26 @@ def create_tables(cursor: Cursor, connection: Connection) -> None:
         """
     )
 
+    # the busiest tables refer to users by id rather than by repeating usernames
+    cursor.execute(
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS user_username ON user (username)
+        """
+    )
+
+    # keyed and clustered by its primary key, with no separate rowid b-tree
     cursor.execute(
         """
         CREATE TABLE IF NOT EXISTS swipe (
-            id INTEGER PRIMARY KEY,
-            username TEXT,
-            application_id INTEGER,
-            swipe_for TEXT,
-            direction TEXT,
-            FOREIGN KEY (username) REFERENCES user (username),
+            user_id INTEGER NOT NULL,
+            application_id INTEGER NOT NULL,
+            swipe_for TEXT NOT NULL,
+            direction TEXT NOT NULL,
+            swiped_at REAL NOT NULL,
+            PRIMARY KEY (user_id, application_id, swipe_for),
+            FOREIGN KEY (user_id) REFERENCES user (id),
             FOREIGN KEY (application_id) REFERENCES application (id)
-        );
+        ) WITHOUT ROWID;
         """
     )
 
@@ -106,29 +131,100 @@ def create_tables(cursor: Cursor, connection: Connection) -> None:
         """
         CREATE TABLE IF NOT EXISTS chat (
             id INTEGER PRIMARY KEY,
-            username1 TEXT,
-            username2 TEXT,
-            FOREIGN KEY (username1) REFERENCES user (username),
-            FOREIGN KEY (username2) REFERENCES user (username)
+            user_id1 INTEGER NOT NULL,
+            user_id2 INTEGER NOT NULL,
+            FOREIGN KEY (user_id1) REFERENCES user (id),
+            FOREIGN KEY (user_id2) REFERENCES user (id)
         );
         """
     )
+    # a chat is stored once per pair of users, with user_id1 < user_id2
+    cursor.execute(
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS chat_pair ON chat (user_id1, user_id2)
+        """
+    )
+    cursor.execute("CREATE INDEX IF NOT EXISTS chat_user_id2 ON chat (user_id2)")
 
     cursor.execute(
         """
         CREATE TABLE IF NOT EXISTS message (
             id INTEGER PRIMARY KEY,
-            sender_username TEXT,
-            recipient_username TEXT,
+            sender_id INTEGER NOT NULL,
+            recipient_id INTEGER NOT NULL,
             time TEXT,
             text TEXT,
             chat_id INTEGER,
-            FOREIGN KEY (sender_username) REFERENCES user (username),
-            FOREIGN KEY (recipient_username) REFERENCES user (username),
+            FOREIGN KEY (sender_id) REFERENCES user (id),
+            FOREIGN KEY (recipient_id) REFERENCES user (id),
             FOREIGN KEY (chat_id) REFERENCES chat (id)
         );
         """
     )
+    cursor.execute("CREATE INDEX IF NOT EXISTS message_chat ON message (chat_id, id)")
+    cursor.execute(
+        """
+        CREATE INDEX IF NOT EXISTS message_recipient ON message (recipient_id, id)
+        """
+    )
+
+    # the newest message each user has acknowledged receiving
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS delivery_cursor (
+            user_id INTEGER PRIMARY KEY,
+            message_id INTEGER NOT NULL,
+            FOREIGN KEY (user_id) REFERENCES user (id)
+        );
+        """
+    )
+
+    # events waiting for their user to acknowledge them, deleted once they do;
+    # keyed ones are only emptied, so that the key still keeps out repeats
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS notification (
+            id INTEGER PRIMARY KEY,
+            username TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            key TEXT,
+            data TEXT NOT NULL,
+            acknowledged INTEGER NOT NULL DEFAULT 0,
+            FOREIGN KEY (username) REFERENCES user (username)
+        );
+        """
+    )
+    cursor.execute(
+        """
+        CREATE INDEX IF NOT EXISTS notification_user ON notification (username, id)
+         WHERE acknowledged = 0
+        """
+    )
+    cursor.execute(
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS notification_key
+            ON notification (username, kind, key)
+        """
+    )
+
+    # side effects of writes, recorded in the same transaction and carried out
+    # by the outbox workers
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY,
+            kind TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            available_at REAL NOT NULL DEFAULT 0
+        );
+        """
+    )
+    cursor.execute(
+        """
+        CREATE INDEX IF NOT EXISTS outbox_available ON outbox (available_at)
+        """
+    )
 
     connection.commit()
 
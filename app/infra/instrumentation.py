@@ -0,0 +1,52 @@
+import functools
+import inspect
+import time
+from typing import Any, Callable
+
+from app.core.responses import CoreResponse
+from app.infra.metrics import MetricsRegistry
+
+Method = Callable[..., Any]
+
+
+def wrap_methods(obj: Any, wrapper: Callable[[str, Method], Method]) -> None:
+    """
+    Replaces every public method of `obj` with wrapper(name, bound_method) on the
+    instance itself, leaving the class and other instances untouched.
+    """
+    for name in dir(type(obj)):
+        if name.startswith("_") or not inspect.isfunction(getattr(type(obj), name)):
+            continue
+
+        setattr(obj, name, wrapper(name, getattr(obj, name)))
+
+
+def instrument_core(core: Any, registry: MetricsRegistry) -> None:
+    duration = registry.histogram(
+        "core_method_duration_seconds",
+        "Time spent in Core methods",
+        labels=("method",),
+    )
+    responses = registry.counter(
+        "core_responses_total",
+        "CoreResponse statuses returned by Core methods",
+        labels=("method", "status"),
+    )
+
+    def timed(name: str, method: Method) -> Method:
+        @functools.wraps(method)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                result = method(*args, **kwargs)
+            finally:
+                duration.observe(time.perf_counter() - start, method=name)
+
+            if isinstance(result, CoreResponse):
+                responses.inc(method=name, status=result.status.name)
+
+            return result
+
+        return wrapper
+
+    wrap_methods(core, timed)
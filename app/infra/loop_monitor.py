@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator
+
+from app.infra.metrics import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+@dataclass
+class Stall:
+    duration: float
+    stack: list[str]
+
+    def __str__(self) -> str:
+        header = f"event loop blocked for {self.duration * 1000:.0f}ms in:\n"
+        return header + "".join(self.stack)
+
+
+@dataclass
+class LoopMonitor:
+    """
+    A heartbeat task measures how late the loop wakes it up (the loop lag) and a
+    watchdog thread notices when the heartbeat stops beating for longer than
+    `threshold`, capturing the loop thread's stack while it is still blocked.
+    """
+
+    metrics: MetricsRegistry
+    interval: float = 0.1
+    threshold: float = 0.1
+    stalls: deque[Stall] = field(default_factory=lambda: deque(maxlen=50))
+    _last_beat: float = 0.0
+    _loop_thread: int | None = None
+    _stack: list[str] | None = None
+    _task: asyncio.Task[None] | None = None
+    _watchdog: threading.Thread | None = None
+    _stop: threading.Event = field(default_factory=threading.Event)
+
+    def __post_init__(self) -> None:
+        self.lag = self.metrics.histogram(
+            "event_loop_lag_seconds",
+            "Delay between a heartbeat's due time and when the loop ran it",
+            buckets=LAG_BUCKETS,
+        )
+        self.blocked = self.metrics.counter(
+            "event_loop_blocked_total",
+            "Times the event loop was blocked for longer than the threshold",
+        )
+
+    async def _heartbeat(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._last_beat = now
+
+            lag = max(0.0, now - expected)
+            self.lag.observe(lag)
+            if lag >= self.threshold:
+                self._record(lag)
+
+    def _record(self, lag: float) -> None:
+        # the stack is None when the watchdog did not get to look in time
+        stall = Stall(duration=lag, stack=self._stack or [])
+        self._stack = None
+        self.stalls.append(stall)
+        self.blocked.inc()
+        logger.warning("%s", stall)
+
+    def _watch(self) -> None:
+        poll = min(self.interval, self.threshold) / 2
+
+        while not self._stop.wait(poll):
+            overdue = time.monotonic() - self._last_beat - self.interval
+            if overdue < self.threshold or self._stack is not None:
+                continue
+
+            frame = sys._current_frames().get(self._loop_thread or 0)
+            if frame is not None:
+                self._stack = traceback.format_stack(frame)
+
+    async def start(self) -> None:
+        self._loop_thread = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        # let the first beat get scheduled, or a stall right away goes unseen
+        await asyncio.sleep(0)
+        self._watchdog = threading.Thread(
+            target=self._watch, name="loop-watchdog", daemon=True
+        )
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join()
+            self._watchdog = None
+
+
+@asynccontextmanager
+async def assert_no_blocking(threshold: float = 0.05) -> AsyncIterator[LoopMonitor]:
+    """Fails when anything inside the block stalls the loop for over `threshold`."""
+    monitor = LoopMonitor(
+        MetricsRegistry(), interval=threshold / 5, threshold=threshold
+    )
+    await monitor.start()
+    try:
+        yield monitor
+        # let the heartbeat catch up with a stall right at the end of the block
+        await asyncio.sleep(monitor.interval * 2)
+    finally:
+        await monitor.stop()
+
+    if monitor.stalls:
+        raise AssertionError("\n".join(str(stall) for stall in monitor.stalls))
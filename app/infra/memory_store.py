@@ -0,0 +1,492 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from sqlite3 import Connection
+from typing import Any, BinaryIO, Callable, Generic, Hashable, Iterable, TypeVar
+
+import orjson
+from pydantic import BaseModel
+
+from app.core.models import (
+    Account,
+    Application,
+    Chat,
+    Company,
+    Message,
+    Notification,
+    SwipeDirection,
+    SwipeFor,
+    User,
+)
+from app.infra.repository import hydration
+
+logger = logging.getLogger(__name__)
+
+M = TypeVar("M", bound=BaseModel)
+
+
+class ChatMessage(Message):
+    chat_id: int
+
+
+class Swipe(BaseModel):
+    username: str
+    application_id: int
+    swipe_for: SwipeFor
+    direction: SwipeDirection
+    # when the direction last changed, 0 in snapshots taken before it was kept
+    swiped_at: float = 0.0
+
+
+class DeliveryCursor(BaseModel):
+    username: str
+    message_id: int
+
+
+class OutboxEvent(BaseModel):
+    id: int
+    kind: str
+    payload: dict[str, Any]
+    attempts: int = 0
+    available_at: float = 0.0
+
+
+def chat_pair(username1: str, username2: str) -> tuple[str, str]:
+    return (username1, username2) if username1 <= username2 else (username2, username1)
+
+
+@dataclass
+class Table(Generic[M]):
+    """
+    Rows of one model keyed by primary key. Every secondary index maps a value to
+    the keys of the rows carrying it, in insertion order; an index function
+    returns all the values a row is found under, so a chat can be looked up by
+    either of its users.
+
+    Rows are replaced, never changed in place, which is what lets a snapshot
+    copy the row lists under the lock and serialize them outside of it.
+    """
+
+    name: str
+    model: type[M]
+    key: Callable[[M], Hashable]
+    indexes: dict[str, Callable[[M], Iterable[Hashable]]] = field(default_factory=dict)
+    lock: threading.RLock = field(default_factory=threading.RLock)
+    rows: dict[Hashable, M] = field(default_factory=dict)
+    last_id: int = 0
+    _entries: dict[str, dict[Hashable, dict[Hashable, None]]] = field(init=False)
+
+    def __post_init__(self) -> None:
+        self._entries = {name: {} for name in self.indexes}
+
+    def get(self, key: Hashable) -> M | None:
+        return self.rows.get(key)
+
+    def find(self, index: str, value: Hashable) -> list[M]:
+        with self.lock:
+            keys = self._entries[index].get(value, {})
+            return [self.rows[key] for key in keys]
+
+    def scan(self) -> list[M]:
+        with self.lock:
+            return list(self.rows.values())
+
+    def next_id(self) -> int:
+        with self.lock:
+            self.last_id += 1
+            return self.last_id
+
+    def put(self, row: M) -> None:
+        key = self.key(row)
+
+        with self.lock:
+            previous = self.rows.get(key)
+            if previous is not None:
+                self._unindex(key, previous)
+
+            self.rows[key] = row
+            for name, values in self.indexes.items():
+                entries = self._entries[name]
+                for value in values(row):
+                    entries.setdefault(value, {})[key] = None
+
+            if isinstance(key, int) and key > self.last_id:
+                self.last_id = key
+
+    def delete(self, key: Hashable) -> M | None:
+        with self.lock:
+            row = self.rows.pop(key, None)
+            if row is not None:
+                self._unindex(key, row)
+            return row
+
+    def _unindex(self, key: Hashable, row: M) -> None:
+        for name, values in self.indexes.items():
+            entries = self._entries[name]
+            for value in values(row):
+                keys = entries.get(value)
+                if keys is not None:
+                    keys.pop(key, None)
+                    if not keys:
+                        del entries[value]
+
+
+def _generation(path: Path) -> int:
+    return int(path.stem.rsplit("-", 1)[1])
+
+
+@dataclass
+class MemoryStore:
+    """
+    Every table of the in-memory backend, behind one lock. Without a directory
+    it is purely volatile. With one, each change is appended to a journal as it
+    is made and snapshot() periodically writes out all tables and starts a new
+    journal, so a restart loads one snapshot and replays only what came after.
+
+    The journal is flushed on every write, which survives a crashed process;
+    fsync=True also survives a crashed machine, at the cost of a disk sync per
+    write.
+    """
+
+    directory: Path | None = None
+    snapshot_interval: float = 60.0
+    fsync: bool = False
+    lock: threading.RLock = field(default_factory=threading.RLock)
+    accounts: Table[Account] = field(init=False)
+    users: Table[User] = field(init=False)
+    companies: Table[Company] = field(init=False)
+    applications: Table[Application] = field(init=False)
+    chats: Table[Chat] = field(init=False)
+    messages: Table[ChatMessage] = field(init=False)
+    swipes: Table[Swipe] = field(init=False)
+    cursors: Table[DeliveryCursor] = field(init=False)
+    notifications: Table[Notification] = field(init=False)
+    outbox: Table[OutboxEvent] = field(init=False)
+    _generation: int = 0
+    _changes: int = 0
+    _journal: BinaryIO | None = None
+    _snapshot_lock: threading.Lock = field(default_factory=threading.Lock)
+    _task: asyncio.Task[None] | None = None
+
+    def __post_init__(self) -> None:
+        self.accounts = Table(
+            "account", Account, key=lambda a: a.username, lock=self.lock
+        )
+        self.users = Table("user", User, key=lambda u: u.username, lock=self.lock)
+        self.companies = Table(
+            "company",
+            Company,
+            key=lambda c: c.id,
+            indexes={"owner": lambda c: (c.owner_username,)},
+            lock=self.lock,
+        )
+        self.applications = Table(
+            "application",
+            Application,
+            key=lambda a: a.id,
+            indexes={
+                "company": lambda a: (a.company_id,),
+                "filters": lambda a: ((a.location, a.job_type, a.experience_level),),
+            },
+            lock=self.lock,
+        )
+        self.chats = Table(
+            "chat",
+            Chat,
+            key=lambda c: c.chat_id,
+            indexes={
+                "pair": lambda c: (chat_pair(c.username1, c.username2),),
+                "user": lambda c: {c.username1, c.username2},
+            },
+            lock=self.lock,
+        )
+        self.messages = Table(
+            "message",
+            ChatMessage,
+            key=lambda m: m.message_id,
+            indexes={
+                "chat": lambda m: (m.chat_id,),
+                "recipient": lambda m: (m.recipient_username,),
+            },
+            lock=self.lock,
+        )
+        self.swipes = Table(
+            "swipe",
+            Swipe,
+            key=lambda s: (s.username, s.application_id, s.swipe_for),
+            lock=self.lock,
+        )
+        self.cursors = Table(
+            "delivery_cursor",
+            DeliveryCursor,
+            key=lambda c: c.username,
+            lock=self.lock,
+        )
+        self.notifications = Table(
+            "notification",
+            Notification,
+            key=lambda n: n.id,
+            indexes={
+                # only those still waiting to be acknowledged
+                "user": lambda n: () if n.acknowledged else (n.username,),
+                "key": lambda n: (
+                    () if n.key is None else ((n.username, n.kind, n.key),)
+                ),
+            },
+            lock=self.lock,
+        )
+        self.outbox = Table("outbox", OutboxEvent, key=lambda e: e.id, lock=self.lock)
+
+    @property
+    def tables(self) -> dict[str, Table[Any]]:
+        tables: list[Table[Any]] = [
+            self.accounts,
+            self.users,
+            self.companies,
+            self.applications,
+            self.chats,
+            self.messages,
+            self.swipes,
+            self.cursors,
+            self.notifications,
+            self.outbox,
+        ]
+        return {table.name: table for table in tables}
+
+    def put(self, table: Table[M], row: M) -> None:
+        with self.lock:
+            table.put(row)
+            self._append(["put", table.name, row.dict()])
+
+    def delete(self, table: Table[M], key: Hashable) -> M | None:
+        with self.lock:
+            row = table.delete(key)
+            if row is not None:
+                self._append(["delete", table.name, key])
+            return row
+
+    def _append(self, record: list[Any]) -> None:
+        if self._journal is None:
+            return
+
+        self._journal.write(orjson.dumps(record) + b"\n")
+        self._journal.flush()
+        if self.fsync:
+            os.fsync(self._journal.fileno())
+        self._changes += 1
+
+    def _path(self, kind: str, generation: int) -> Path:
+        assert self.directory is not None
+        suffix = "json" if kind == "snapshot" else "log"
+        return self.directory.joinpath(f"{kind}-{generation:08d}.{suffix}")
+
+    def open(self) -> None:
+        if self.directory is None:
+            return
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        snapshots = sorted(self.directory.glob("snapshot-*.json"), key=_generation)
+        if snapshots:
+            self._generation = _generation(snapshots[-1])
+            tables = self.tables
+            for name, rows in orjson.loads(snapshots[-1].read_bytes()).items():
+                table = tables[name]
+                for row in rows:
+                    table.put(table.model.parse_obj(row))
+
+        # a crash between writing a snapshot and starting its journal can
+        # leave more than one journal to replay
+        for journal in sorted(self.directory.glob("journal-*.log"), key=_generation):
+            if _generation(journal) >= self._generation:
+                self._replay(journal)
+                self._generation = _generation(journal)
+
+        self._journal = self._path("journal", self._generation).open("ab")
+
+    def _replay(self, path: Path) -> None:
+        tables = self.tables
+
+        with path.open("rb") as file:
+            for number, line in enumerate(file, start=1):
+                try:
+                    operation, name, value = orjson.loads(line)
+                except orjson.JSONDecodeError:
+                    # only the last write can be torn by a crash
+                    logger.warning("ignoring torn journal record %s:%d", path, number)
+                    break
+
+                table = tables[name]
+                if operation == "put":
+                    table.put(table.model.parse_obj(value))
+                else:
+                    table.delete(tuple(value) if isinstance(value, list) else value)
+                self._changes += 1
+
+    def snapshot(self) -> None:
+        if self.directory is None:
+            return
+
+        with self._snapshot_lock:
+            with self.lock:
+                if self._changes == 0:
+                    return
+
+                rows = {name: table.scan() for name, table in self.tables.items()}
+                self._generation += 1
+                generation = self._generation
+                if self._journal is not None:
+                    self._journal.close()
+                self._journal = self._path("journal", generation).open("ab")
+                self._changes = 0
+
+            data = orjson.dumps(
+                {name: [row.dict() for row in table] for name, table in rows.items()}
+            )
+            path = self._path("snapshot", generation)
+            temporary = path.with_suffix(".tmp")
+            with temporary.open("wb") as file:
+                file.write(data)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temporary, path)
+
+            for old in [
+                *self.directory.glob("snapshot-*.json"),
+                *self.directory.glob("journal-*.log"),
+            ]:
+                if _generation(old) < generation:
+                    old.unlink()
+
+    def load_sqlite(self, connection: Connection) -> None:
+        """Copies a SQLite database into the store, e.g. to migrate backends."""
+        cursor = connection.cursor()
+
+        with self.lock:
+            for username, password in cursor.execute("SELECT * FROM account"):
+                self.put(self.accounts, Account(username=username, password=password))
+            for (
+                _,
+                username,
+                image_uri,
+                cover_image_uri,
+                education,
+                skills,
+                experience,
+                preference,
+            ) in cursor.execute("SELECT * FROM user"):
+                self.put(
+                    self.users,
+                    hydration.user(
+                        username=username,
+                        image_uri=image_uri,
+                        cover_image_uri=cover_image_uri,
+                        education=education,
+                        skills=skills,
+                        experience=experience,
+                        preference_data=preference,
+                    ),
+                )
+            for row in cursor.execute("SELECT * FROM company"):
+                self.put(self.companies, hydration.company(row))
+            for row in cursor.execute("SELECT * FROM application"):
+                self.put(self.applications, hydration.application(row))
+            for row in cursor.execute(
+                "SELECT c.id, u1.username, u2.username FROM chat c "
+                "JOIN user u1 ON u1.id = c.user_id1 "
+                "JOIN user u2 ON u2.id = c.user_id2"
+            ):
+                self.put(self.chats, hydration.chat(row))
+            for row in cursor.execute(
+                "SELECT m.id, s.username, r.username, m.time, m.text, m.chat_id "
+                "FROM message m "
+                "JOIN user s ON s.id = m.sender_id "
+                "JOIN user r ON r.id = m.recipient_id"
+            ):
+                message = hydration.message(row[:5])
+                self.put(self.messages, ChatMessage(**message.dict(), chat_id=row[5]))
+            for (
+                username,
+                application_id,
+                swipe_for,
+                direction,
+                swiped_at,
+            ) in cursor.execute(
+                "SELECT u.username, s.application_id, s.swipe_for, s.direction, "
+                "s.swiped_at FROM swipe s JOIN user u ON u.id = s.user_id"
+            ):
+                self.put(
+                    self.swipes,
+                    Swipe(
+                        username=username,
+                        application_id=application_id,
+                        swipe_for=swipe_for,
+                        direction=direction,
+                        swiped_at=swiped_at,
+                    ),
+                )
+            for username, message_id in cursor.execute(
+                "SELECT u.username, d.message_id FROM delivery_cursor d "
+                "JOIN user u ON u.id = d.user_id"
+            ):
+                self.put(
+                    self.cursors,
+                    DeliveryCursor(username=username, message_id=message_id),
+                )
+            for *row, key, acknowledged in cursor.execute(
+                "SELECT id, username, kind, data, key, acknowledged FROM notification"
+            ):
+                self.put(
+                    self.notifications,
+                    hydration.notification(row).copy(
+                        update={"key": key, "acknowledged": bool(acknowledged)}
+                    ),
+                )
+            for id, kind, payload, attempts, available_at in cursor.execute(
+                "SELECT id, kind, payload, attempts, available_at FROM outbox"
+            ):
+                self.put(
+                    self.outbox,
+                    OutboxEvent(
+                        id=id,
+                        kind=kind,
+                        payload=hydration.loads(payload),
+                        attempts=attempts,
+                        available_at=available_at,
+                    ),
+                )
+
+        cursor.close()
+
+    def close(self) -> None:
+        self.snapshot()
+
+        with self.lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+
+    async def _snapshot_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+            try:
+                await asyncio.to_thread(self.snapshot)
+            except Exception:
+                logger.exception("memory store snapshot failed")
+
+    async def start(self) -> None:
+        if self.directory is not None:
+            self._task = asyncio.create_task(self._snapshot_periodically())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+        await asyncio.to_thread(self.close)
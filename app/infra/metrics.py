@@ -0,0 +1,333 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import os
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+LabelValues = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _format_labels(names: tuple[str, ...], values: LabelValues, **extra: str) -> str:
+    pairs = [*zip(names, values), *extra.items()]
+    if not pairs:
+        return ""
+
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+
+    return repr(float(value))
+
+
+@dataclass
+class Metric(ABC):
+    name: str
+    help: str
+    label_names: tuple[str, ...] = ()
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    type = "untyped"
+
+    def _key(self, labels: dict[str, str]) -> LabelValues:
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    @abstractmethod
+    def snapshot(self) -> dict[str, Any]:
+        pass
+
+    @abstractmethod
+    def render(self, samples: list[Any]) -> list[str]:
+        pass
+
+
+@dataclass
+class Counter(Metric):
+    values: dict[LabelValues, float] = field(default_factory=dict)
+
+    type = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {"samples": [[list(k), v] for k, v in self.values.items()]}
+
+    def render(self, samples: list[Any]) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.label_names, tuple(labels))} "
+            f"{_format_value(value)}"
+            for labels, value in samples
+        ]
+
+
+@dataclass
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self.values[key] = value
+
+
+@dataclass
+class Histogram(Metric):
+    buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    # per label set: [count per bucket..., +Inf count, sum]
+    values: dict[LabelValues, list[float]] = field(default_factory=dict)
+
+    type = "histogram"
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self.values.get(key)
+            if series is None:
+                series = self.values[key] = [0.0] * (len(self.buckets) + 2)
+
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            else:
+                series[len(self.buckets)] += 1
+            series[-1] += value
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "buckets": list(self.buckets),
+                "samples": [[list(k), list(v)] for k, v in self.values.items()],
+            }
+
+    def render(self, samples: list[Any]) -> list[str]:
+        lines = []
+        for labels, series in samples:
+            labels = tuple(labels)
+            cumulative = 0.0
+            for bound, count in zip([*self.buckets, math.inf], series):
+                cumulative += count
+                le = _format_labels(self.label_names, labels, le=_format_value(bound))
+                lines.append(f"{self.name}_bucket{le} {_format_value(cumulative)}")
+
+            suffix = _format_labels(self.label_names, labels)
+            lines.append(f"{self.name}_sum{suffix} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{suffix} {_format_value(cumulative)}")
+
+        return lines
+
+
+def _merge(kind: str, documents: list[list[Any]]) -> list[Any]:
+    merged: dict[tuple[str, ...], Any] = {}
+
+    for samples in documents:
+        for labels, value in samples:
+            key = tuple(labels)
+            if key not in merged:
+                merged[key] = list(value) if kind == "histogram" else value
+            elif kind == "histogram":
+                merged[key] = [a + b for a, b in zip(merged[key], value)]
+            else:
+                merged[key] += value
+
+    return [[list(k), v] for k, v in merged.items()]
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+    return True
+
+
+@dataclass
+class MetricsRegistry:
+    """
+    Process-local metrics. When `directory` is set every process sharing it (e.g.
+    gunicorn workers) writes its snapshot there and render() aggregates all of
+    them: counters and histograms are summed over every file, gauges only over
+    processes that are still alive.
+    """
+
+    directory: Path | None = None
+    metrics: dict[str, Metric] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def _register(self, metric: Metric) -> Any:
+        with self._lock:
+            existing = self.metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric):
+                    raise ValueError(f"metric {metric.name} already registered")
+                return existing
+
+            self.metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help: str, labels: tuple[str, ...] = ()) -> Counter:
+        counter: Counter = self._register(Counter(name, help, labels))
+        return counter
+
+    def gauge(self, name: str, help: str, labels: tuple[str, ...] = ()) -> Gauge:
+        gauge: Gauge = self._register(Gauge(name, help, labels))
+        return gauge
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        histogram: Histogram = self._register(
+            Histogram(name, help, labels, buckets=buckets)
+        )
+        return histogram
+
+    def snapshot(self) -> dict[str, Any]:
+        return {name: metric.snapshot() for name, metric in self.metrics.items()}
+
+    @property
+    def _snapshot_path(self) -> Path | None:
+        if self.directory is None:
+            return None
+
+        return self.directory.joinpath(f"metrics-{os.getpid()}.json")
+
+    def flush(self) -> None:
+        path = self._snapshot_path
+        if path is None:
+            return
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.snapshot()))
+        os.replace(tmp, path)
+
+    def _collect(self) -> dict[str, list[Any]]:
+        if self.directory is None:
+            return {
+                name: snapshot["samples"] for name, snapshot in self.snapshot().items()
+            }
+
+        self.flush()
+        documents: dict[str, list[list[Any]]] = {}
+
+        for path in sorted(self.directory.glob("metrics-*.json")):
+            pid = int(path.stem.split("-")[1])
+            try:
+                snapshot = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+
+            for name, data in snapshot.items():
+                metric = self.metrics.get(name)
+                if metric is None:
+                    continue
+                if isinstance(metric, Gauge) and not _pid_alive(pid):
+                    continue
+
+                documents.setdefault(name, []).append(data["samples"])
+
+        return {
+            name: _merge(self.metrics[name].type, samples)
+            for name, samples in documents.items()
+        }
+
+    def render(self) -> str:
+        collected = self._collect()
+        lines = []
+
+        for name, metric in sorted(self.metrics.items()):
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.type}")
+            lines.extend(metric.render(sorted(collected.get(name, []))))
+
+        return "\n".join(lines) + "\n"
+
+
+@dataclass
+class MetricsFlusher:
+    registry: MetricsRegistry
+    interval: float = 5.0
+    _task: asyncio.Task[None] | None = field(default=None, init=False)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await asyncio.to_thread(self.registry.flush)
+
+    async def start(self) -> None:
+        if self.registry.directory is not None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        self.registry.flush()
+
+
+@dataclass
+class HttpMetrics:
+    in_flight: Gauge
+    duration: Histogram
+    responses: Counter
+
+    @classmethod
+    def register(cls, registry: MetricsRegistry) -> HttpMetrics:
+        return cls(
+            in_flight=registry.gauge(
+                "http_requests_in_flight", "HTTP requests currently being served"
+            ),
+            duration=registry.histogram(
+                "http_request_duration_seconds",
+                "HTTP request latency by route",
+                labels=("method", "route", "status"),
+            ),
+            responses=registry.counter(
+                "http_responses_total",
+                "HTTP responses by route and status code",
+                labels=("method", "route", "status"),
+            ),
+        )
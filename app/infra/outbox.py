@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from sqlite3 import Connection
+from typing import Any, Callable, Protocol
+
+import orjson
+
+from app.core.identity_map import identity_scope
+from app.infra.memory_store import MemoryStore, OutboxEvent
+from app.infra.metrics import MetricsRegistry
+from app.infra.repository import hydration
+from app.infra.writer import Writer
+
+logger = logging.getLogger(__name__)
+
+# whatever a handler returns is ignored, only raising gets an event retried
+Handler = Callable[[dict[str, Any]], object]
+
+
+def enqueue(connection: Connection, kind: str, payload: dict[str, Any]) -> None:
+    """Records an event inside the caller's write transaction."""
+    connection.execute(
+        "INSERT INTO outbox (kind, payload) VALUES (?, ?)",
+        [kind, orjson.dumps(payload).decode()],
+    ).close()
+
+
+class Outbox(Protocol):
+    def claim(self, limit: int, lease: float, max_attempts: int) -> list[OutboxEvent]:
+        pass
+
+    def complete(self, event_ids: list[int]) -> None:
+        pass
+
+
+@dataclass
+class SqliteOutbox(Outbox):
+    connection: Connection
+    writer: Writer
+
+    def _pending(self, now: float, max_attempts: int) -> bool:
+        cursor = self.connection.cursor()
+        row = cursor.execute(
+            "SELECT EXISTS (SELECT 1 FROM outbox WHERE available_at <= ? "
+            "AND attempts < ?)",
+            [now, max_attempts],
+        ).fetchone()
+        cursor.close()
+
+        return bool(row[0])
+
+    def claim(self, limit: int, lease: float, max_attempts: int) -> list[OutboxEvent]:
+        now = time.time()
+        # idle workers poll, and this keeps their polling off the writer
+        if not self._pending(now, max_attempts):
+            return []
+
+        def update(connection: Connection) -> list[Any]:
+            cursor = connection.cursor()
+            rows = cursor.execute(
+                """
+                UPDATE outbox SET attempts = attempts + 1, available_at = ?
+                 WHERE id IN (
+                       SELECT id FROM outbox
+                        WHERE available_at <= ? AND attempts < ?
+                        ORDER BY id
+                        LIMIT ?
+                 )
+                RETURNING id, kind, payload, attempts, available_at
+                """,
+                [now + lease, now, max_attempts, limit],
+            ).fetchall()
+            cursor.close()
+            return rows
+
+        return [
+            OutboxEvent.construct(
+                id=id,
+                kind=kind,
+                payload=hydration.loads(payload),
+                attempts=attempts,
+                available_at=available_at,
+            )
+            for id, kind, payload, attempts, available_at in self.writer.execute(update)
+        ]
+
+    def complete(self, event_ids: list[int]) -> None:
+        if not event_ids:
+            return
+
+        self.writer.execute(
+            lambda connection: connection.execute(
+                f"DELETE FROM outbox WHERE id IN ({','.join('?' * len(event_ids))})",
+                event_ids,
+            ).close()
+        )
+
+
+@dataclass
+class InMemoryOutbox(Outbox):
+    store: MemoryStore
+
+    def claim(self, limit: int, lease: float, max_attempts: int) -> list[OutboxEvent]:
+        now = time.time()
+
+        with self.store.lock:
+            events = [
+                event.copy(
+                    update={"attempts": event.attempts + 1, "available_at": now + lease}
+                )
+                for event in self.store.outbox.scan()
+                if event.available_at <= now and event.attempts < max_attempts
+            ][:limit]
+            for event in events:
+                self.store.put(self.store.outbox, event)
+
+        return events
+
+    def complete(self, event_ids: list[int]) -> None:
+        with self.store.lock:
+            for event_id in event_ids:
+                self.store.delete(self.store.outbox, event_id)
+
+
+@dataclass
+class OutboxWorker:
+    """
+    Carries out the events that writes left in the outbox, with `concurrency`
+    tasks each claiming a batch at a time. A claimed event is leased for `lease`
+    seconds and deleted once its handler returns; if the handler raises, or the
+    process dies first, the lease runs out and the event is handed out again.
+    Delivery is therefore at least once and handlers have to be idempotent.
+
+    Events still failing after `max_attempts` stay in the table and are no
+    longer claimed.
+    """
+
+    outbox: Outbox
+    handlers: dict[str, Handler]
+    metrics: MetricsRegistry
+    concurrency: int = 4
+    batch_size: int = 32
+    interval: float = 0.05
+    lease: float = 30.0
+    max_attempts: int = 10
+    _tasks: list[asyncio.Task[None]] = field(default_factory=list)
+
+    def __post_init__(self) -> None:
+        self.handled = self.metrics.counter(
+            "outbox_events_total",
+            "Outbox events handled, by outcome",
+            labels=("kind", "outcome"),
+        )
+
+    def _handle(self, event: OutboxEvent) -> bool:
+        handler = self.handlers.get(event.kind)
+        if handler is None:
+            logger.warning("dropping outbox event %d of unknown kind", event.id)
+            self.handled.inc(kind=event.kind, outcome="dropped")
+            return True
+
+        try:
+            with identity_scope():
+                handler(event.payload)
+        except Exception:
+            logger.exception(
+                "outbox event %d (%s) failed, attempt %d of %d",
+                event.id,
+                event.kind,
+                event.attempts,
+                self.max_attempts,
+            )
+            self.handled.inc(kind=event.kind, outcome="failed")
+            return False
+
+        self.handled.inc(kind=event.kind, outcome="ok")
+        return True
+
+    def run_once(self) -> int:
+        events = self.outbox.claim(self.batch_size, self.lease, self.max_attempts)
+        self.outbox.complete([event.id for event in events if self._handle(event)])
+
+        return len(events)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                claimed = await asyncio.to_thread(self.run_once)
+            except Exception:
+                logger.exception("processing the outbox failed")
+                claimed = 0
+
+            if claimed == 0:
+                await asyncio.sleep(self.interval)
+
+    async def start(self) -> None:
+        self._tasks = [
+            asyncio.create_task(self._run()) for _ in range(self.concurrency)
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import itertools
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import FrameType
+from typing import Any, Iterator
+
+from app.infra.instrumentation import Method, wrap_methods
+
+_active: ContextVar[Profile | None] = ContextVar("profile", default=None)
+
+
+def _collapse(frame: FrameType | None) -> str:
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_name}")
+        frame = frame.f_back
+
+    return ";".join(reversed(names))
+
+
+@dataclass
+class Profile:
+    """
+    Statistical profile of one request. A sampler thread periodically records the
+    stacks of the threads working on the request: the event loop thread while the
+    request's own task is running on it, and any threadpool thread currently
+    inside a Core call made on the request's behalf (see profile_core()).
+    """
+
+    name: str
+    interval: float = 0.005
+    stacks: Counter[str] = field(default_factory=Counter)
+    threads: set[int] = field(default_factory=set)
+    _loop: asyncio.AbstractEventLoop | None = None
+    _loop_thread: int | None = None
+    _task: asyncio.Task[Any] | None = None
+    _stop: threading.Event = field(default_factory=threading.Event)
+    _thread: threading.Thread | None = None
+
+    def _current_task(self) -> asyncio.Task[Any] | None:
+        # reads the loop's current task from the sampler thread; racy by nature,
+        # which is fine for sampling
+        current_tasks: dict[Any, asyncio.Task[Any]] = getattr(
+            asyncio.tasks, "_current_tasks", {}
+        )
+        return current_tasks.get(self._loop)
+
+    def _sample(self) -> None:
+        frames = sys._current_frames()
+
+        for ident in list(self.threads):
+            if ident == self._loop_thread and self._current_task() is not self._task:
+                continue
+
+            frame = frames.get(ident)
+            if frame is not None:
+                self.stacks[_collapse(frame)] += 1
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._task = asyncio.current_task()
+        self._loop_thread = threading.get_ident()
+        self.threads.add(self._loop_thread)
+
+        self._thread = threading.Thread(
+            target=self._run, name=f"profile-{self.name}", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self.threads.clear()
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.items())
+
+
+@contextmanager
+def profiled(label: str, interval: float) -> Iterator[Profile]:
+    name = f"{time.strftime('%Y%m%dT%H%M%S')}-{label}-{uuid.uuid4().hex[:8]}"
+    profile = Profile(name=name, interval=interval)
+    profile.start()
+    token = _active.set(profile)
+    try:
+        yield profile
+    finally:
+        _active.reset(token)
+        profile.stop()
+
+
+def profile_core(core: Any) -> None:
+    def track(name: str, method: Method) -> Method:
+        @functools.wraps(method)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            profile = _active.get()
+            if profile is None:
+                return method(*args, **kwargs)
+
+            ident = threading.get_ident()
+            registered = ident not in profile.threads
+            profile.threads.add(ident)
+            try:
+                return method(*args, **kwargs)
+            finally:
+                if registered:
+                    profile.threads.discard(ident)
+
+        return wrapper
+
+    wrap_methods(core, track)
+
+
+@dataclass
+class ProfileStore:
+    directory: Path
+    keep: int = 100
+
+    def save(self, profile: Profile) -> Path:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory.joinpath(f"{profile.name}.folded")
+        path.write_text(profile.collapsed())
+
+        for stale in itertools.islice(self.list(), self.keep, None):
+            self.directory.joinpath(stale).unlink(missing_ok=True)
+
+        return path
+
+    def list(self) -> list[str]:
+        if not self.directory.exists():
+            return []
+
+        return sorted(
+            (path.name for path in self.directory.glob("*.folded")), reverse=True
+        )
+
+    def read(self, name: str) -> str | None:
+        # only hand out files this store wrote, never arbitrary paths
+        if name not in self.list():
+            return None
+
+        return self.directory.joinpath(name).read_text()
@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable, Iterator
+
+logger = logging.getLogger(__name__)
+
+_current: ContextVar[QueryLog | None] = ContextVar("query_log", default=None)
+
+
+@dataclass
+class QueryRecord:
+    statement: str
+    duration: float = 0.0
+    rows: int = 0
+    slow_logged: bool = False
+
+
+@dataclass
+class QueryLog:
+    records: list[QueryRecord] = field(default_factory=list)
+
+    @property
+    def count(self) -> int:
+        return len(self.records)
+
+    @property
+    def duration(self) -> float:
+        return sum(record.duration for record in self.records)
+
+    def repeated(self, min_count: int = 2) -> dict[str, int]:
+        """Statements executed at least `min_count` times, the usual N+1 smell."""
+        counts = Counter(record.statement for record in self.records)
+        return {statement: n for statement, n in counts.items() if n >= min_count}
+
+    def summary(self) -> str:
+        lines = [f"{self.count} queries in {self.duration * 1000:.1f}ms"]
+        for statement, n in sorted(self.repeated().items(), key=lambda kv: -kv[1]):
+            lines.append(f"  {n}x {statement}")
+
+        return "\n".join(lines)
+
+
+@contextmanager
+def capture() -> Iterator[QueryLog]:
+    log = QueryLog()
+    token = _current.set(log)
+    try:
+        yield log
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def assert_max_queries(limit: int) -> Iterator[QueryLog]:
+    with capture() as log:
+        yield log
+
+    if log.count > limit:
+        raise AssertionError(f"expected at most {limit} queries\n{log.summary()}")
+
+
+def _normalize(statement: str) -> str:
+    return " ".join(statement.split())
+
+
+class TracingCursor(sqlite3.Cursor):
+    connection: TracingConnection
+    _record: QueryRecord | None = None
+    _parameters: Any = ()
+
+    def _begin(self, statement: str) -> QueryRecord | None:
+        log = _current.get()
+        if log is None and self.connection.slow_query_seconds is None:
+            self._record = None
+            return None
+
+        self._record = QueryRecord(statement=_normalize(statement))
+        if log is not None:
+            log.records.append(self._record)
+
+        return self._record
+
+    def _check_slow(self, record: QueryRecord, parameters: Any = ()) -> None:
+        threshold = self.connection.slow_query_seconds
+        if threshold is None or record.slow_logged or record.duration < threshold:
+            return
+
+        record.slow_logged = True
+        plan = self.connection.explain(record.statement, parameters)
+        logger.warning(
+            "slow query (%.1fms): %s\n%s",
+            record.duration * 1000,
+            record.statement,
+            "\n".join(plan),
+        )
+
+    def execute(self, sql: str, parameters: Any = ()) -> TracingCursor:
+        record = self._begin(sql)
+        if record is None:
+            super().execute(sql, parameters)
+            return self
+
+        start = time.perf_counter()
+        try:
+            super().execute(sql, parameters)
+        finally:
+            record.duration += time.perf_counter() - start
+
+        record.rows = max(self.rowcount, 0)
+        self._parameters = parameters
+        self._check_slow(record, parameters)
+        return self
+
+    def executemany(self, sql: str, seq_of_parameters: Iterable[Any]) -> TracingCursor:
+        record = self._begin(sql)
+        if record is None:
+            super().executemany(sql, seq_of_parameters)
+            return self
+
+        start = time.perf_counter()
+        try:
+            super().executemany(sql, seq_of_parameters)
+        finally:
+            record.duration += time.perf_counter() - start
+
+        record.rows = max(self.rowcount, 0)
+        return self
+
+    def fetchone(self) -> Any:
+        record = self._record
+        if record is None:
+            return super().fetchone()
+
+        start = time.perf_counter()
+        row = super().fetchone()
+        record.duration += time.perf_counter() - start
+        record.rows += row is not None
+        return row
+
+    def fetchall(self) -> list[Any]:
+        record = self._record
+        if record is None:
+            return super().fetchall()
+
+        start = time.perf_counter()
+        rows = super().fetchall()
+        record.duration += time.perf_counter() - start
+        record.rows += len(rows)
+        self._check_slow(record, self._parameters)
+        return rows
+
+
+class TracingConnection(sqlite3.Connection):
+    """
+    Connection whose cursors record every statement into the query log of the
+    current context (see capture()) and log statements slower than
+    `slow_query_seconds` together with their query plan.
+    """
+
+    slow_query_seconds: float | None = None
+
+    def cursor(self, factory: Any = TracingCursor) -> Any:
+        return super().cursor(factory)
+
+    def execute(self, sql: str, parameters: Any = ()) -> Any:
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql: str, parameters: Iterable[Any]) -> Any:
+        return self.cursor().executemany(sql, parameters)
+
+    def explain(self, statement: str, parameters: Any = ()) -> list[str]:
+        if not statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            return []
+
+        try:
+            rows = sqlite3.Connection.execute(
+                self, f"EXPLAIN QUERY PLAN {statement}", parameters
+            ).fetchall()
+        except sqlite3.Error:
+            return []
+
+        return [f"  {row[-1]}" for row in rows]
+
+
+class ThreadLocalConnection:
+    """
+    Read connection that gives every thread going through it a connection of
+    its own, opened with `connect` on first use, so that threadpool threads do
+    not take turns on a single one. Connections of threads that have exited
+    are closed as new ones are opened, close() closes the rest.
+    """
+
+    def __init__(self, connect: Callable[[], TracingConnection]) -> None:
+        self._connect = connect
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: dict[threading.Thread, TracingConnection] = {}
+        self._closed = False
+
+    def get(self) -> TracingConnection:
+        connection: TracingConnection | None = getattr(self._local, "connection", None)
+        if connection is not None:
+            return connection
+
+        with self._lock:
+            if self._closed:
+                raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+
+            for thread in [t for t in self._connections if not t.is_alive()]:
+                self._connections.pop(thread).close()
+
+            connection = self._connect()
+            self._connections[threading.current_thread()] = connection
+
+        self._local.connection = connection
+        return connection
+
+    def cursor(self, factory: Any = TracingCursor) -> Any:
+        return self.get().cursor(factory)
+
+    def execute(self, sql: str, parameters: Any = ()) -> Any:
+        return self.get().execute(sql, parameters)
+
+    def executemany(self, sql: str, parameters: Iterable[Any]) -> Any:
+        return self.get().executemany(sql, parameters)
+
+    def commit(self) -> None:
+        self.get().commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            connections = list(self._connections.values())
+            self._connections.clear()
+
+        for connection in connections:
+            connection.close()
@@ -1,64 +1,69 @@
-from dataclasses import dataclass, field
+from dataclasses import dataclass
 from sqlite3 import Connection
 
 from app.core.models import Account
 from app.core.repository.account import IAccountRepository
 from app.core.repository.company import ICompanyRepository
+from app.infra.memory_store import MemoryStore
+from app.infra.writer import Writer
 
 
 @dataclass
 class InMemoryAccountRepository(IAccountRepository):
+    store: MemoryStore
     company_repository: ICompanyRepository
-    accounts: dict[str, Account] = field(default_factory=dict)
 
     def create_account(self, username: str, password: str) -> Account | None:
-        account = Account(
-            username=username,
-            password=password,
-        )
+        account = Account(username=username, password=password)
 
-        self.accounts[username] = account
-        return account
+        with self.store.lock:
+            if self.store.accounts.get(username) is not None:
+                return None
+            self.store.put(self.store.accounts, account)
+
+        return account.copy()
 
     def get_account(self, username: str) -> Account | None:
-        account = self.accounts.get(username)
+        account = self.store.accounts.get(username)
 
         if account is None:
             return None
 
-        account.companies = self.company_repository.get_user_companies(
-            username=username
+        return account.copy(
+            update={
+                "companies": self.company_repository.get_user_companies(
+                    username=username
+                )
+            }
         )
 
-        return account
-
     def has_account(self, username: str) -> bool:
-        return self.get_account(username=username) is not None
+        return self.store.accounts.get(username) is not None
 
     def is_valid(self, username: str, password: str) -> bool:
-        return (
-            username in self.accounts and self.accounts[username].password == password
-        )
+        account = self.store.accounts.get(username)
+        return account is not None and account.password == password
 
 
 @dataclass
 class SqliteAccountRepository(IAccountRepository):
     connection: Connection
+    writer: Writer
     company_repository: ICompanyRepository
 
     def create_account(self, username: str, password: str) -> Account | None:
-        cursor = self.connection.cursor()
         account = Account(username=username, password=password)
 
-        res = cursor.execute(
-            "INSERT INTO account (username, password) VALUES (?, ?)",
-            (account.username, account.password),
-        )
-
-        self.connection.commit()
-        cursor.close()
+        def insert(connection: Connection) -> int:
+            cursor = connection.cursor()
+            res = cursor.execute(
+                "INSERT INTO account (username, password) VALUES (?, ?)",
+                (account.username, account.password),
+            )
+            cursor.close()
+            return res.rowcount
 
-        if res.rowcount == 0:
+        if self.writer.execute(insert) == 0:
             return None
 
         return account
@@ -80,12 +85,19 @@ class SqliteAccountRepository(IAccountRepository):
         return Account(username=username, password=password, companies=companies)
 
     def has_account(self, username: str) -> bool:
-        return self.get_account(username=username) is not None
+        cursor = self.connection.cursor()
+        row = cursor.execute(
+            "SELECT EXISTS (SELECT 1 FROM account WHERE username = ?)", [username]
+        ).fetchone()
+        cursor.close()
 
-    def is_valid(self, username: str, password: str) -> bool:
-        account = self.get_account(username=username)
+        return bool(row[0])
 
-        if account is None:
-            return False
+    def is_valid(self, username: str, password: str) -> bool:
+        cursor = self.connection.cursor()
+        row = cursor.execute(
+            "SELECT password FROM account WHERE username = ?", [username]
+        ).fetchone()
+        cursor.close()
 
-        return account.username == username and account.password == password
+        return row is not None and row[0] == password
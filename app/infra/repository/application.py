@@ -1,19 +1,17 @@
-from dataclasses import dataclass, field
+from dataclasses import dataclass
 from sqlite3 import Connection
 from typing import Any
 
 from app.core.models import Application, ExperienceLevel, JobLocation, JobType
 from app.core.repository.application import IApplicationRepository
+from app.infra.memory_store import MemoryStore
+from app.infra.repository import hydration
+from app.infra.writer import Writer
 
 
 @dataclass
 class InMemoryApplicationRepository(IApplicationRepository):
-    applications: dict[int, Application] = field(default_factory=dict)
-    _application_id: int = 0
-
-    def _next_id(self) -> int:
-        self._application_id += 1
-        return self._application_id
+    store: MemoryStore
 
     def create_application(
         self,
@@ -25,9 +23,8 @@ class InMemoryApplicationRepository(IApplicationRepository):
         description: str,
         company_id: int,
     ) -> Application | None:
-        application_id = self._next_id()
         application = Application(
-            id=application_id,
+            id=self.store.applications.next_id(),
             title=title,
             location=location,
             job_type=job_type,
@@ -38,22 +35,42 @@ class InMemoryApplicationRepository(IApplicationRepository):
             views=0,
         )
 
-        self.applications[application_id] = application
+        self.store.put(self.store.applications, application)
         return application
 
+    def create_applications(self, applications: list[Application]) -> list[Application]:
+        with self.store.lock:
+            created = [
+                application.copy(
+                    update={"id": self.store.applications.next_id(), "views": 0}
+                )
+                for application in applications
+            ]
+            for application in created:
+                self.store.put(self.store.applications, application)
+
+        return created
+
     def get_application(self, id: int) -> Application | None:
-        return self.applications.get(id)
+        return self.store.applications.get(id)
 
     def get_company_applications(self, company_id: int) -> list[Application]:
-        return list(
-            filter(
-                lambda application: application.company_id == company_id,
-                self.applications.values(),
-            )
-        )
+        return self.store.applications.find("company", company_id)
+
+    def get_companies_applications(
+        self, company_ids: list[int]
+    ) -> dict[int, list[Application]]:
+        return {
+            company_id: self.store.applications.find("company", company_id)
+            for company_id in company_ids
+        }
 
     def has_application(self, id: int) -> bool:
-        return self.get_application(id=id) is not None
+        return self.store.applications.get(id) is not None
+
+    def get_company_id(self, id: int) -> int | None:
+        application = self.store.applications.get(id)
+        return None if application is None else application.company_id
 
     def update_application(
         self,
@@ -65,74 +82,46 @@ class InMemoryApplicationRepository(IApplicationRepository):
         skills: list[str],
         description: str,
     ) -> Application | None:
-        if not self.has_application(id=id):
-            return None
-
-        self.applications[id].update(
-            location=location,
-            job_type=job_type,
-            experience_level=experience_level,
-            description=description,
-        )
+        with self.store.lock:
+            application = self.store.applications.get(id)
+            if application is None:
+                return None
+
+            application = application.copy(
+                update={
+                    "title": title,
+                    "location": location,
+                    "job_type": job_type,
+                    "experience_level": experience_level,
+                    "skills": skills,
+                    "description": description,
+                }
+            )
+            self.store.put(self.store.applications, application)
 
-        return self.applications[id]
+        return application
 
     def application_interaction(self, id: int) -> bool:
-        if not self.has_application(id=id):
-            return False
+        with self.store.lock:
+            application = self.store.applications.get(id)
+            if application is None:
+                return False
+
+            self.store.put(
+                self.store.applications,
+                application.copy(update={"views": application.views + 1}),
+            )
 
-        self.applications[id].views += 1
         return True
 
     def delete_application(self, id: int) -> bool:
-        if not self.has_application(id=id):
-            return False
-
-        self.applications.pop(id)
-        return True
+        return self.store.delete(self.store.applications, id) is not None
 
 
 @dataclass
 class SqliteApplicationRepository(IApplicationRepository):
     connection: Connection
-
-    @staticmethod
-    def _convert_row(row: Any) -> Application | None:
-        (
-            id,
-            title,
-            location,
-            job_type,
-            experience_level,
-            description,
-            skill_encoded,
-            views,
-            company_id,
-        ) = row
-
-        return Application(
-            id=id,
-            title=title,
-            location=location,
-            job_type=job_type,
-            experience_level=experience_level,
-            skills=skill_encoded.split(","),
-            description=description,
-            views=views,
-            company_id=company_id,
-        )
-
-    @staticmethod
-    def _convert_rows(rows: Any) -> list[Application]:
-        result = []
-
-        for row in rows:
-            application = SqliteApplicationRepository._convert_row(row=row)
-
-            if application is not None:
-                result.append(application)
-
-        return result
+    writer: Writer
 
     def create_application(
         self,
@@ -144,41 +133,72 @@ class SqliteApplicationRepository(IApplicationRepository):
         description: str,
         company_id: int,
     ) -> Application | None:
-        cursor = self.connection.cursor()
         skills_encoded = ",".join(skills)
-        res = cursor.execute(
-            "INSERT INTO application "
-            "(title, location, job_type, experience_level, description, "
-            " skills, views, company_id) "
-            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
-            (
-                title,
-                location,
-                job_type,
-                experience_level,
-                description,
-                skills_encoded,
-                0,
-                company_id,
-            ),
-        )
-
-        self.connection.commit()
 
-        if res.rowcount == 0 or res.lastrowid is None:
+        def insert(connection: Connection) -> Any:
+            cursor = connection.cursor()
+            row = cursor.execute(
+                "INSERT INTO application "
+                "(title, location, job_type, experience_level, description, "
+                " skills, views, company_id) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "RETURNING *",
+                (
+                    title,
+                    location,
+                    job_type,
+                    experience_level,
+                    description,
+                    skills_encoded,
+                    0,
+                    company_id,
+                ),
+            ).fetchone()
             cursor.close()
-            return None
+            return row
 
-        res = cursor.execute(
-            "SELECT * FROM application WHERE ROWID = ?", [res.lastrowid]
-        )
+        row = self.writer.execute(insert)
 
-        row = res.fetchone()
         if row is None:
             return None
 
-        cursor.close()
-        return SqliteApplicationRepository._convert_row(row=row)
+        return hydration.application(row)
+
+    def create_applications(self, applications: list[Application]) -> list[Application]:
+        if not applications:
+            return []
+
+        # executemany cannot return rows, but inserted in one transaction the
+        # batch gets consecutive ids, ending at the last inserted one
+        def insert(connection: Connection) -> int:
+            cursor = connection.cursor()
+            cursor.executemany(
+                "INSERT INTO application "
+                "(title, location, job_type, experience_level, description, "
+                " skills, views, company_id) "
+                "VALUES (?, ?, ?, ?, ?, ?, 0, ?)",
+                [
+                    (
+                        application.title,
+                        application.location,
+                        application.job_type,
+                        application.experience_level,
+                        application.description,
+                        ",".join(application.skills),
+                        application.company_id,
+                    )
+                    for application in applications
+                ],
+            )
+            (last_id,) = cursor.execute("SELECT last_insert_rowid()").fetchone()
+            cursor.close()
+            return int(last_id)
+
+        first_id = self.writer.execute(insert) - len(applications) + 1
+        return [
+            application.copy(update={"id": first_id + i, "views": 0})
+            for i, application in enumerate(applications)
+        ]
 
     def get_application(self, id: int) -> Application | None:
         cursor = self.connection.cursor()
@@ -189,7 +209,7 @@ class SqliteApplicationRepository(IApplicationRepository):
             return None
 
         cursor.close()
-        return SqliteApplicationRepository._convert_row(row=row)
+        return hydration.application(row)
 
     def get_company_applications(self, company_id: int) -> list[Application]:
         cursor = self.connection.cursor()
@@ -203,10 +223,45 @@ class SqliteApplicationRepository(IApplicationRepository):
             return []
 
         cursor.close()
-        return SqliteApplicationRepository._convert_rows(rows=rows)
+        return hydration.applications(rows)
+
+    def get_companies_applications(
+        self, company_ids: list[int]
+    ) -> dict[int, list[Application]]:
+        result: dict[int, list[Application]] = {id: [] for id in company_ids}
+        if not company_ids:
+            return result
+
+        cursor = self.connection.cursor()
+        rows = cursor.execute(
+            "SELECT * FROM application "
+            f"WHERE company_id IN ({','.join('?' * len(company_ids))})",
+            company_ids,
+        ).fetchall()
+        cursor.close()
+
+        for application in hydration.applications(rows):
+            result[application.company_id].append(application)
+
+        return result
 
     def has_application(self, id: int) -> bool:
-        return self.get_application(id=id) is not None
+        cursor = self.connection.cursor()
+        row = cursor.execute(
+            "SELECT EXISTS (SELECT 1 FROM application WHERE id = ?)", [id]
+        ).fetchone()
+        cursor.close()
+
+        return bool(row[0])
+
+    def get_company_id(self, id: int) -> int | None:
+        cursor = self.connection.cursor()
+        row = cursor.execute(
+            "SELECT company_id FROM application WHERE id = ?", [id]
+        ).fetchone()
+        cursor.close()
+
+        return None if row is None else int(row[0])
 
     def update_application(
         self,
@@ -218,65 +273,56 @@ class SqliteApplicationRepository(IApplicationRepository):
         skills: list[str],
         description: str,
     ) -> Application | None:
-        application = self.get_application(id=id)
-
-        if application is None:
-            return None
         skills_encoded = ",".join(skills)
 
-        cursor = self.connection.cursor()
-
-        res = cursor.execute(
-            "UPDATE application "
-            "   SET title = ?, "
-            "       location = ?, "
-            "       job_type = ?, "
-            "       experience_level = ?, "
-            "       skills = ?, "
-            "       description = ?"
-            " WHERE id = ?",
-            (
-                title,
-                str(location),
-                str(job_type),
-                str(experience_level),
-                skills_encoded,
-                description,
-                id,
-            ),
-        )
+        def update(connection: Connection) -> Any:
+            cursor = connection.cursor()
+            row = cursor.execute(
+                "UPDATE application "
+                "   SET title = ?, "
+                "       location = ?, "
+                "       job_type = ?, "
+                "       experience_level = ?, "
+                "       skills = ?, "
+                "       description = ?"
+                " WHERE id = ?"
+                " RETURNING *",
+                (
+                    title,
+                    str(location),
+                    str(job_type),
+                    str(experience_level),
+                    skills_encoded,
+                    description,
+                    id,
+                ),
+            ).fetchone()
+            cursor.close()
+            return row
 
-        self.connection.commit()
-        cursor.close()
+        row = self.writer.execute(update)
 
-        if res.rowcount == 0:
+        if row is None:
             return None
 
-        return self.get_application(id=id)
+        return hydration.application(row)
 
     def application_interaction(self, id: int) -> bool:
-        application = self.get_application(id=id)
-
-        if application is None:
-            return False
-
-        cursor = self.connection.cursor()
-
-        res = cursor.execute(
-            "UPDATE application SET views = ? WHERE id = ?", (application.views + 1, id)
-        )
-
-        self.connection.commit()
-        cursor.close()
+        def update(connection: Connection) -> int:
+            cursor = connection.cursor()
+            res = cursor.execute(
+                "UPDATE application SET views = views + 1 WHERE id = ?", [id]
+            )
+            cursor.close()
+            return res.rowcount
 
-        return res.rowcount != 0
+        return self.writer.execute(update) != 0
 
     def delete_application(self, id: int) -> bool:
-        cursor = self.connection.cursor()
-
-        res = cursor.execute("DELETE FROM application WHERE id = ?", [id])
-
-        self.connection.commit()
-        cursor.close()
+        def delete(connection: Connection) -> int:
+            cursor = connection.cursor()
+            res = cursor.execute("DELETE FROM application WHERE id = ?", [id])
+            cursor.close()
+            return res.rowcount
 
-        return res.rowcount != 0
+        return self.writer.execute(delete) != 0
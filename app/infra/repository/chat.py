@@ -1,138 +1,272 @@
+import bisect
+import sys
 from dataclasses import dataclass
 from sqlite3 import Connection
+from typing import Any
 
 from app.core.models import Chat, Message
 from app.core.repository.chat import IChatRepository
+from app.infra.archive import MessageArchive
+from app.infra.memory_store import (
+    ChatMessage,
+    DeliveryCursor,
+    MemoryStore,
+    chat_pair,
+)
+from app.infra.repository import hydration
+from app.infra.user_ids import UserIds
+from app.infra.writer import Writer
+
+
+def _message(message: ChatMessage) -> Message:
+    return Message.construct(
+        message_id=message.message_id,
+        sender_username=message.sender_username,
+        recipient_username=message.recipient_username,
+        time=message.time,
+        text=message.text,
+    )
 
 
 @dataclass
 class InMemoryChatRepository(IChatRepository):
-    chat_lists: list[Chat]
+    store: MemoryStore
 
-    def create_chat(self, username1: str, username2: str) -> Chat | None:
-        chat: Chat = Chat(
-            chat_id=len(self.chat_lists),
-            username1=username1,
-            username2=username2,
-            message_list=[],
+    def _get_chat_messages(self, chat_id: int) -> list[Message]:
+        return [
+            _message(message) for message in self.store.messages.find("chat", chat_id)
+        ]
+
+    def _with_messages(self, chat: Chat) -> Chat:
+        return chat.copy(
+            update={"message_list": self._get_chat_messages(chat_id=chat.chat_id)}
         )
-        self.chat_lists.append(chat)
-        return chat
+
+    def create_chat(self, username1: str, username2: str) -> Chat | None:
+        username1, username2 = chat_pair(username1, username2)
+
+        with self.store.lock:
+            chats = self.store.chats.find("pair", (username1, username2))
+            if chats:
+                return chats[0].copy(update={"message_list": []})
+
+            chat = Chat(
+                chat_id=self.store.chats.next_id(),
+                username1=username1,
+                username2=username2,
+            )
+            self.store.put(self.store.chats, chat)
+
+        return chat.copy(update={"message_list": []})
 
     def get_chat(self, username1: str, username2: str) -> Chat | None:
-        for chat in self.chat_lists:
-            if (chat.username2 == username2 and chat.username1 == username1) or (
-                chat.username2 == username1 and chat.username1 == username2
-            ):
-                return chat
-        return None
+        chats = self.store.chats.find("pair", chat_pair(username1, username2))
+        return self._with_messages(chats[0]) if chats else None
 
     def has_chat(self, username1: str, username2: str) -> bool:
-        for chat in self.chat_lists:
-            if (chat.username2 == username2 and chat.username1 == username1) or (
-                chat.username1 == username2 and chat.username2 == username1
-            ):
-                return True
-        return False
-
-    def add_message(self, message: Message) -> bool:
-        for chat in self.chat_lists:
-            if (
-                chat.username2 == message.sender_username
-                and chat.username1 == message.recipient_username
-            ) or (
-                chat.username2 == message.recipient_username
-                and chat.username1 == message.sender_username
-            ):
-                chat.message_list.append(message)
-                return True
-        return False
+        return self.get_chat_id(username1=username1, username2=username2) is not None
+
+    def get_chat_id(self, username1: str, username2: str) -> int | None:
+        chats = self.store.chats.find("pair", chat_pair(username1, username2))
+        return chats[0].chat_id if chats else None
+
+    def add_message(self, message: Message) -> Message | None:
+        chat_id = self.get_chat_id(
+            username1=message.sender_username, username2=message.recipient_username
+        )
+        if chat_id is None:
+            return None
+
+        stored = ChatMessage(
+            message_id=self.store.messages.next_id(),
+            sender_username=message.sender_username,
+            recipient_username=message.recipient_username,
+            time=message.time,
+            text=message.text,
+            chat_id=chat_id,
+        )
+        self.store.put(self.store.messages, stored)
+        return _message(stored)
 
     def get_user_chats(self, username: str) -> list[Chat]:
-        user_chats: list[Chat] = []
-        for chat in self.chat_lists:
-            if chat.username2 == username or chat.username1 == username:
-                user_chats.append(chat)
-        return user_chats
+        return [
+            self._with_messages(chat)
+            for chat in self.store.chats.find("user", username)
+        ]
+
+    def get_messages(
+        self, chat_id: int, before: int | None, limit: int
+    ) -> list[Message]:
+        messages = self._get_chat_messages(chat_id=chat_id)
+        if before is not None:
+            messages = messages[
+                : bisect.bisect_left(messages, before, key=lambda m: m.message_id)
+            ]
+
+        return messages[-limit:]
+
+    def get_undelivered(self, username: str, limit: int) -> list[Message]:
+        cursor = self.store.cursors.get(username)
+        messages = self.store.messages.find("recipient", username)
+
+        start = bisect.bisect_right(
+            messages,
+            0 if cursor is None else cursor.message_id,
+            key=lambda m: m.message_id,
+        )
+        end = start + limit
+        return [_message(message) for message in messages[start:end]]
+
+    def acknowledge(self, username: str, message_id: int) -> None:
+        with self.store.lock:
+            cursor = self.store.cursors.get(username)
+            if cursor is None or cursor.message_id < message_id:
+                self.store.put(
+                    self.store.cursors,
+                    DeliveryCursor(username=username, message_id=message_id),
+                )
 
 
 @dataclass
 class SqliteChatRepository(IChatRepository):
     connection: Connection
+    writer: Writer
+    # the chat and message tables store user ids, usernames are mapped here
+    user_ids: UserIds
+    # holds every message older than the hot ones left in the message table
+    archive: MessageArchive | None = None
+
+    def _pair(self, username1: str, username2: str) -> tuple[int, int] | None:
+        ids = self.user_ids.ids([username1, username2])
+        if username1 not in ids or username2 not in ids:
+            return None
+
+        user_id1, user_id2 = ids[username1], ids[username2]
+        return (user_id1, user_id2) if user_id1 <= user_id2 else (user_id2, user_id1)
+
+    def _messages(self, rows: list[Any]) -> list[Message]:
+        """Hydrates (id, sender_id, recipient_id, time, text) rows."""
+        usernames = self.user_ids.usernames(
+            user_id for row in rows for user_id in row[1:3]
+        )
+        return [
+            hydration.message((id, usernames[sender], usernames[recipient], *rest))
+            for id, sender, recipient, *rest in rows
+        ]
+
+    def _chats(
+        self, rows: list[Any], messages: dict[int, list[Message]] | None = None
+    ) -> list[Chat]:
+        """Hydrates (id, user_id1, user_id2) rows."""
+        usernames = self.user_ids.usernames(
+            user_id for row in rows for user_id in row[1:3]
+        )
+        archived = {}
+        if messages is not None and self.archive is not None:
+            archived = self.archive.last_archived_ids([row[0] for row in rows])
+
+        return [
+            hydration.chat(
+                (chat_id, usernames[user_id1], usernames[user_id2]),
+                messages=None if messages is None else messages[chat_id],
+                older_before=self._older_before(
+                    archived.get(chat_id),
+                    None if messages is None else messages[chat_id],
+                ),
+            )
+            for chat_id, user_id1, user_id2 in rows
+        ]
+
+    @staticmethod
+    def _older_before(
+        last_archived_id: int | None, messages: list[Message] | None
+    ) -> int | None:
+        """Where paging back from the hot messages into the archive starts."""
+        if last_archived_id is None:
+            return None
+        if messages:
+            return min(messages[0].message_id, last_archived_id + 1)
+        return last_archived_id + 1
 
     def _get_chat_messages(self, chat_id: int) -> list[Message]:
         cursor = self.connection.cursor()
 
-        result = []
-
-        for (
-            id,
-            sender_username,
-            recipient_username,
-            time,
-            text,
-            chat_id,
-        ) in cursor.execute(
+        res = cursor.execute(
             """
-            SELECT * FROM message
+            SELECT id, sender_id, recipient_id, time, text
+              FROM message
              WHERE chat_id = ?
+             ORDER BY id
             """,
             [chat_id],
-        ):
-            message = Message(
-                message_id=id,
-                sender_username=sender_username,
-                recipient_username=recipient_username,
-                time=time,
-                text=text,
-            )
-
-            result.append(message)
+        )
+        result = self._messages(res.fetchall())
 
         cursor.close()
         return result
 
-    def create_chat(self, username1: str, username2: str) -> Chat | None:
-        cursor = self.connection.cursor()
+    def _get_chats_messages(self, chat_ids: list[int]) -> dict[int, list[Message]]:
+        result: dict[int, list[Message]] = {chat_id: [] for chat_id in chat_ids}
+        if not chat_ids:
+            return result
 
-        res = cursor.execute(
-            """
-            INSERT INTO chat (username1, username2)
-            VALUES (?, ?)
+        cursor = self.connection.cursor()
+        rows = cursor.execute(
+            f"""
+            SELECT chat_id, id, sender_id, recipient_id, time, text
+              FROM message
+             WHERE chat_id IN ({",".join("?" * len(chat_ids))})
+             ORDER BY id
             """,
-            [username1, username2],
-        )
+            chat_ids,
+        ).fetchall()
+        cursor.close()
 
-        if res.lastrowid is None:
-            return None
+        messages = self._messages([row[1:] for row in rows])
+        for row, message in zip(rows, messages):
+            result[row[0]].append(message)
 
-        last_row_id = res.lastrowid
+        return result
 
-        res = cursor.execute(
-            """
-            SELECT * FROM chat
-             WHERE ROWID = ?
-            """,
-            [last_row_id],
-        )
+    def create_chat(self, username1: str, username2: str) -> Chat | None:
+        pair = self._pair(username1, username2)
+        if pair is None:
+            return None
 
-        chat_id, u1, u2 = res.fetchone()
-        chat = Chat(chat_id=chat_id, username1=u1, username2=u2)
+        # the no-op update makes RETURNING hand back an existing chat as well
+        def insert(connection: Connection) -> Any:
+            cursor = connection.cursor()
+            row = cursor.execute(
+                """
+                INSERT INTO chat (user_id1, user_id2)
+                VALUES (?, ?)
+                ON CONFLICT (user_id1, user_id2)
+                DO UPDATE SET user_id1 = excluded.user_id1
+                RETURNING id, user_id1, user_id2
+                """,
+                pair,
+            ).fetchone()
+            cursor.close()
+            return row
+
+        row = self.writer.execute(insert)
 
-        self.connection.commit()
-        cursor.close()
-        return chat
+        if row is None:
+            return None
+
+        return self._chats([row])[0]
 
     def get_chat(self, username1: str, username2: str) -> Chat | None:
+        pair = self._pair(username1, username2)
+        if pair is None:
+            return None
+
         cursor = self.connection.cursor()
 
         res = cursor.execute(
-            """
-            SELECT * FROM chat
-             WHERE (username1 = ? AND username2 = ?)
-                OR (username1 = ? AND username2 = ?)
-            """,
-            [username1, username2, username2, username1],
+            "SELECT id, user_id1, user_id2 FROM chat "
+            "WHERE user_id1 = ? AND user_id2 = ?",
+            pair,
         )
 
         row = res.fetchone()
@@ -140,72 +274,154 @@ class SqliteChatRepository(IChatRepository):
         if row is None:
             return None
 
-        chat_id, u1, u2 = row
-        chat = Chat(
-            chat_id=chat_id,
-            username1=u1,
-            username2=u2,
-            message_list=self._get_chat_messages(chat_id=chat_id),
-        )
+        chat = self._chats(
+            [row], messages={row[0]: self._get_chat_messages(chat_id=row[0])}
+        )[0]
 
         cursor.close()
         return chat
 
     def has_chat(self, username1: str, username2: str) -> bool:
-        return self.get_chat(username1=username1, username2=username2) is not None
+        return self.get_chat_id(username1=username1, username2=username2) is not None
+
+    def get_chat_id(self, username1: str, username2: str) -> int | None:
+        pair = self._pair(username1, username2)
+        if pair is None:
+            return None
 
-    def add_message(self, message: Message) -> bool:
         cursor = self.connection.cursor()
+        row = cursor.execute(
+            "SELECT id FROM chat WHERE user_id1 = ? AND user_id2 = ?", pair
+        ).fetchone()
+        cursor.close()
 
-        chat = self.get_chat(
-            username1=message.sender_username, username2=message.recipient_username
-        )
-        if chat is None:
-            return False
+        return None if row is None else int(row[0])
 
-        res = cursor.execute(
-            """
-            INSERT INTO message
-            (sender_username, recipient_username, time, text, chat_id)
-            VALUES (?, ?, ?, ?, ?)
-            """,
-            [
-                message.sender_username,
-                message.recipient_username,
-                message.time,
-                message.text,
-                chat.chat_id,
-            ],
-        )
+    def add_message(self, message: Message) -> Message | None:
+        ids = self.user_ids.ids([message.sender_username, message.recipient_username])
+        sender_id = ids.get(message.sender_username)
+        recipient_id = ids.get(message.recipient_username)
+        if sender_id is None or recipient_id is None:
+            return None
 
-        if res.rowcount == 0:
-            return False
+        # finding the chat is part of the insert, which adds nothing without one
+        def insert(connection: Connection) -> Any:
+            cursor = connection.cursor()
+            row = cursor.execute(
+                """
+                INSERT INTO message (sender_id, recipient_id, time, text, chat_id)
+                SELECT ?, ?, ?, ?, id
+                  FROM chat
+                 WHERE user_id1 = ? AND user_id2 = ?
+                RETURNING id
+                """,
+                [
+                    sender_id,
+                    recipient_id,
+                    message.time,
+                    message.text,
+                    min(sender_id, recipient_id),
+                    max(sender_id, recipient_id),
+                ],
+            ).fetchone()
+            cursor.close()
+            return row
+
+        row = self.writer.execute(insert)
 
-        self.connection.commit()
-        cursor.close()
-        return True
+        if row is None:
+            return None
+
+        return message.copy(update={"message_id": row[0]})
 
     def get_user_chats(self, username: str) -> list[Chat]:
+        user_id = self.user_ids.id(username)
+        if user_id is None:
+            return []
+
         cursor = self.connection.cursor()
 
-        result = []
+        rows = cursor.execute(
+            """
+            SELECT id, user_id1, user_id2 FROM chat
+             WHERE user_id1 = ?
+                OR user_id2 = ?
+            """,
+            [user_id, user_id],
+        ).fetchall()
+        cursor.close()
+
+        messages = self._get_chats_messages(chat_ids=[row[0] for row in rows])
+        return self._chats(rows, messages=messages)
 
-        for chat_id, username1, username2 in cursor.execute(
+    def get_messages(
+        self, chat_id: int, before: int | None, limit: int
+    ) -> list[Message]:
+        cursor = self.connection.cursor()
+        rows = cursor.execute(
             """
-            SELECT * FROM chat
-             WHERE username1 = ?
-                OR username2 = ?
+            SELECT id, sender_id, recipient_id, time, text
+              FROM message
+             WHERE chat_id = ?
+               AND id < ?
+             ORDER BY id DESC
+             LIMIT ?
             """,
-            [username, username],
-        ):
-            chat = Chat(
+            [chat_id, sys.maxsize if before is None else before, limit],
+        ).fetchall()
+        cursor.close()
+
+        messages = self._messages(rows)
+
+        # the page reaches back past the hot window
+        if len(messages) < limit and self.archive is not None:
+            oldest = messages[-1].message_id if messages else before
+            messages += self.archive.get_messages(
                 chat_id=chat_id,
-                username1=username1,
-                username2=username2,
-                message_list=self._get_chat_messages(chat_id=chat_id),
+                before=sys.maxsize if oldest is None else oldest,
+                limit=limit - len(messages),
             )
 
-            result.append(chat)
+        messages.reverse()
+        return messages
+
+    def get_undelivered(self, username: str, limit: int) -> list[Message]:
+        user_id = self.user_ids.id(username)
+        if user_id is None:
+            return []
 
+        cursor = self.connection.cursor()
+        rows = cursor.execute(
+            """
+            SELECT id, sender_id, recipient_id, time, text
+              FROM message
+             WHERE recipient_id = ?
+               AND id > COALESCE(
+                   (SELECT message_id FROM delivery_cursor WHERE user_id = ?), 0
+               )
+             ORDER BY id
+             LIMIT ?
+            """,
+            [user_id, user_id, limit],
+        ).fetchall()
         cursor.close()
-        return result
+
+        return self._messages(rows)
+
+    def acknowledge(self, username: str, message_id: int) -> None:
+        user_id = self.user_ids.id(username)
+        if user_id is None:
+            return
+
+        # acks can arrive out of order, the cursor only ever moves forward
+        self.writer.execute(
+            lambda connection: connection.execute(
+                """
+                INSERT INTO delivery_cursor (user_id, message_id)
+                VALUES (?, ?)
+                ON CONFLICT (user_id)
+                DO UPDATE SET message_id = MAX(message_id, excluded.message_id)
+                """,
+                [user_id, message_id],
+            ).close()
+        )
@@ -1,41 +1,50 @@
-from dataclasses import dataclass, field
+from dataclasses import dataclass
 from sqlite3 import Connection
+from typing import Any
 
 from app.core.models import Application, Company, Industry, OrganizationSize
 from app.core.repository.application import IApplicationRepository
 from app.core.repository.company import ICompanyRepository
+from app.infra.memory_store import MemoryStore
+from app.infra.repository import hydration
+from app.infra.writer import Writer
 
 
 @dataclass
 class InMemoryCompanyRepository(ICompanyRepository):
     application_repository: IApplicationRepository
-    companies: list[Company] = field(default_factory=list)
+    store: MemoryStore
 
-    def get_company(self, company_id: int) -> Company | None:
-        for company in self.companies:
-            if company.id == company_id:
-                company.applications = (
-                    self.application_repository.get_company_applications(
-                        company_id=company_id
-                    )
+    def _with_applications(self, company: Company) -> Company:
+        return company.copy(
+            update={
+                "applications": self.application_repository.get_company_applications(
+                    company_id=company.id
                 )
-                return company
+            }
+        )
 
-        return None
+    def get_company(self, company_id: int) -> Company | None:
+        company = self.store.companies.get(company_id)
+        return None if company is None else self._with_applications(company)
 
     def get_user_companies(self, username: str) -> list[Company]:
-        result = []
-
-        for company in self.companies:
-            if company.owner_username == username:
-                company.applications = (
-                    self.application_repository.get_company_applications(
-                        company_id=company.id
-                    )
-                )
-                result.append(company)
+        companies = self.store.companies.find("owner", username)
+        applications = self.application_repository.get_companies_applications(
+            company_ids=[company.id for company in companies]
+        )
+
+        return [
+            company.copy(update={"applications": applications[company.id]})
+            for company in companies
+        ]
 
-        return result
+    def has_company(self, company_id: int) -> bool:
+        return self.store.companies.get(company_id) is not None
+
+    def get_owner_username(self, company_id: int) -> str | None:
+        company = self.store.companies.get(company_id)
+        return None if company is None else company.owner_username
 
     def create_company(
         self,
@@ -47,19 +56,19 @@ class InMemoryCompanyRepository(ICompanyRepository):
         cover_image_uri: str,
         owner_username: str,
     ) -> Company | None:
-        self.companies.append(
-            Company(
-                id=len(self.companies),
-                name=name,
-                website=website,
-                industry=industry,
-                organization_size=organization_size,
-                image_uri=image_uri,
-                cover_image_uri=cover_image_uri,
-                owner_username=owner_username,
-            )
+        company = Company(
+            id=self.store.companies.next_id(),
+            name=name,
+            website=website,
+            industry=industry,
+            organization_size=organization_size,
+            image_uri=image_uri,
+            cover_image_uri=cover_image_uri,
+            owner_username=owner_username,
         )
-        return self.companies[-1]
+
+        self.store.put(self.store.companies, company)
+        return company.copy(update={"applications": []})
 
     def update_company(
         self,
@@ -71,105 +80,103 @@ class InMemoryCompanyRepository(ICompanyRepository):
         image_uri: str,
         cover_image_uri: str,
     ) -> Company | None:
-        for company in self.companies:
-            if company.id == company_id:
-                company.name = name
-                company.website = website
-                company.industry = industry
-                company.organization_size = organization_size
-                company.image_uri = image_uri
-                company.cover_image_uri = cover_image_uri
-                return company
-        return None
+        with self.store.lock:
+            company = self.store.companies.get(company_id)
+            if company is None:
+                return None
+
+            company = company.copy(
+                update={
+                    "name": name,
+                    "website": website,
+                    "industry": industry,
+                    "organization_size": organization_size,
+                    "image_uri": image_uri,
+                    "cover_image_uri": cover_image_uri,
+                }
+            )
+            self.store.put(self.store.companies, company)
+
+        return self._with_applications(company)
 
     def delete_company(self, company_id: int) -> bool:
-        company_to_delete = None
-        for company in self.companies:
-            if company.id == company_id:
-                company_to_delete = company
+        with self.store.lock:
+            if self.store.delete(self.store.companies, company_id) is None:
+                return False
 
-        if company_to_delete is not None:
-            self.companies.remove(company_to_delete)
-            return True
+            for application in self.store.applications.find("company", company_id):
+                self.store.delete(self.store.applications, application.id)
 
-        return False
+        return True
 
     def link_application(self, company_id: int, application: Application) -> bool:
-        for company in self.companies:
-            if company.id == company_id:
-                company.link_application(application)
-                return True
+        with self.store.lock:
+            if self.store.companies.get(company_id) is None:
+                return False
 
-        return False
+            self.store.put(
+                self.store.applications,
+                application.copy(update={"company_id": company_id}),
+            )
+
+        return True
 
 
 @dataclass
 class SqliteCompanyRepository(ICompanyRepository):
     application_repository: IApplicationRepository
     connection: Connection
+    writer: Writer
 
     def get_company(self, company_id: int) -> Company | None:
         cursor = self.connection.cursor()
-        for (
-            c_id,
-            name,
-            website,
-            industry,
-            organization_size,
-            image_uri,
-            cover_image_uri,
-            owner_username,
-        ) in cursor.execute("SELECT * FROM company WHERE id = ?", (company_id,)):
-            company = Company(
-                id=c_id,
-                name=name,
-                website=website,
-                industry=industry,
-                organization_size=organization_size,
-                image_uri=image_uri,
-                cover_image_uri=cover_image_uri,
-                owner_username=owner_username,
-            )
+        row = cursor.execute(
+            "SELECT * FROM company WHERE id = ?", (company_id,)
+        ).fetchone()
+        cursor.close()
 
-            company.applications = self.application_repository.get_company_applications(
-                company_id=c_id
-            )
-            return company
+        if row is None:
+            return None
 
-        return None
+        return hydration.company(
+            row,
+            applications=self.application_repository.get_company_applications(
+                company_id=company_id
+            ),
+        )
 
     def get_user_companies(self, username: str) -> list[Company]:
-        result = []
         cursor = self.connection.cursor()
-        for (
-            c_id,
-            name,
-            website,
-            industry,
-            organization_size,
-            image_uri,
-            cover_image_uri,
-            owner_username,
-        ) in cursor.execute(
+        rows = cursor.execute(
             "SELECT * FROM company WHERE owner_username = ?", (username,)
-        ):
-            company = Company(
-                id=c_id,
-                name=name,
-                website=website,
-                industry=industry,
-                organization_size=organization_size,
-                image_uri=image_uri,
-                cover_image_uri=cover_image_uri,
-                owner_username=owner_username,
-            )
+        ).fetchall()
+        cursor.close()
 
-            company.applications = self.application_repository.get_company_applications(
-                company_id=company.id
-            )
-            result.append(company)
+        applications = self.application_repository.get_companies_applications(
+            company_ids=[row[0] for row in rows]
+        )
+
+        return [
+            hydration.company(row, applications=applications[row[0]]) for row in rows
+        ]
+
+    def has_company(self, company_id: int) -> bool:
+        cursor = self.connection.cursor()
+        row = cursor.execute(
+            "SELECT EXISTS (SELECT 1 FROM company WHERE id = ?)", (company_id,)
+        ).fetchone()
+        cursor.close()
+
+        return bool(row[0])
 
-        return result
+    def get_owner_username(self, company_id: int) -> str | None:
+        cursor = self.connection.cursor()
+        row = cursor.execute(
+            "SELECT owner_username FROM company WHERE id = ?", (company_id,)
+        ).fetchone()
+        cursor.close()
+
+        return None if row is None else str(row[0])
 
     def create_company(
         self,
@@ -181,47 +188,32 @@ class SqliteCompanyRepository(ICompanyRepository):
         cover_image_uri: str,
         owner_username: str,
     ) -> Company | None:
-        company = None
-        cursor = self.connection.cursor()
-        cursor.execute(
-            "INSERT INTO company (company_name, website, industry, organization_size, "
-            "image_uri, cover_image_uri, owner_username) "
-            "VALUES (?, ?, ?, ?, ?, ?, ?)",
-            (
-                name,
-                website,
-                str(industry),
-                str(organization_size),
-                image_uri,
-                cover_image_uri,
-                owner_username,
-            ),
-        )
+        def insert(connection: Connection) -> Any:
+            cursor = connection.cursor()
+            row = cursor.execute(
+                "INSERT INTO company (company_name, website, industry, "
+                "organization_size, image_uri, cover_image_uri, owner_username) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "RETURNING *",
+                (
+                    name,
+                    website,
+                    str(industry),
+                    str(organization_size),
+                    image_uri,
+                    cover_image_uri,
+                    owner_username,
+                ),
+            ).fetchone()
+            cursor.close()
+            return row
 
-        for (
-            c_id,
-            name,
-            website,
-            industry,
-            organization_size,
-            image_uri,
-            cover_image_uri,
-            owner_username,
-        ) in cursor.execute("SELECT * FROM company ORDER BY id DESC LIMIT 1;"):
-            company = Company(
-                id=c_id,
-                name=name,
-                website=website,
-                industry=industry,
-                organization_size=organization_size,
-                image_uri=image_uri,
-                owner_username=owner_username,
-                cover_image_uri=cover_image_uri,
-            )
+        row = self.writer.execute(insert)
 
-        self.connection.commit()
-        cursor.close()
-        return company
+        if row is None:
+            return None
+
+        return hydration.company(row)
 
     def update_company(
         self,
@@ -233,34 +225,50 @@ class SqliteCompanyRepository(ICompanyRepository):
         image_uri: str,
         cover_image_uri: str,
     ) -> Company | None:
-        cursor = self.connection.cursor()
-        cursor.execute(
-            "UPDATE company SET company_name = ?, website = ?, industry = ?, "
-            "organization_size = ?, "
-            "image_uri = ?, cover_image_uri = ? "
-            "WHERE id = ?",
-            (
-                name,
-                website,
-                str(industry),
-                str(organization_size),
-                image_uri,
-                cover_image_uri,
-                company_id,
+        def update(connection: Connection) -> Any:
+            cursor = connection.cursor()
+            row = cursor.execute(
+                "UPDATE company SET company_name = ?, website = ?, industry = ?, "
+                "organization_size = ?, "
+                "image_uri = ?, cover_image_uri = ? "
+                "WHERE id = ? "
+                "RETURNING *",
+                (
+                    name,
+                    website,
+                    str(industry),
+                    str(organization_size),
+                    image_uri,
+                    cover_image_uri,
+                    company_id,
+                ),
+            ).fetchone()
+            cursor.close()
+            return row
+
+        row = self.writer.execute(update)
+
+        if row is None:
+            return None
+
+        return hydration.company(
+            row,
+            applications=self.application_repository.get_company_applications(
+                company_id=company_id
             ),
         )
 
-        self.connection.commit()
-        cursor.close()
-        return self.get_company(company_id)
-
     def delete_company(self, company_id: int) -> bool:
-        cursor = self.connection.cursor()
-        cursor.execute("PRAGMA foreign_keys = ON;")
-        cursor.execute("DELETE FROM company WHERE id = ?", [company_id])
-        self.connection.commit()
-        cursor.close()
-        return self.get_company(company_id) is None
+        # foreign_keys cannot be switched on inside the writer's transaction, so
+        # the cascade to the company's applications is spelled out
+        def delete(connection: Connection) -> int:
+            cursor = connection.cursor()
+            cursor.execute("DELETE FROM application WHERE company_id = ?", [company_id])
+            res = cursor.execute("DELETE FROM company WHERE id = ?", [company_id])
+            cursor.close()
+            return res.rowcount
+
+        return self.writer.execute(delete) != 0
 
     def link_application(self, company_id: int, application: Application) -> bool:
         # TODO: IMPLEMENT
@@ -0,0 +1,175 @@
+from enum import Enum
+from functools import cache
+from typing import Any, Mapping, TypeVar
+
+import orjson
+
+from app.core.models import (
+    Application,
+    Chat,
+    Company,
+    Education,
+    Experience,
+    ExperienceLevel,
+    Industry,
+    JobLocation,
+    JobType,
+    Message,
+    Notification,
+    OrganizationSize,
+    Preference,
+    Skill,
+    User,
+)
+
+# Rows read here come from our own database, which only ever receives values that
+# already passed model validation on the way in. Models are therefore built with
+# `construct`, skipping pydantic validation, and enum members are resolved through
+# cached lookup tables instead of calling the enum class for every value.
+
+E = TypeVar("E", bound=Enum)
+N = TypeVar("N", Education, Skill, Experience)
+
+
+@cache
+def _enum_members(enum_type: type[Enum]) -> Mapping[Any, Enum]:
+    return dict(enum_type._value2member_map_)
+
+
+def enum_member(enum_type: type[E], value: Any) -> E:
+    member = _enum_members(enum_type).get(value)
+    if member is None:
+        return enum_type(value)
+
+    return member  # type: ignore[return-value]
+
+
+def loads(data: str | bytes | None) -> Any:
+    return orjson.loads(data) if data else None
+
+
+def named_items(model: type[N], data: str | bytes | None) -> list[N]:
+    return [
+        model.construct(name=item["name"], description=item["description"])
+        for item in loads(data) or []
+    ]
+
+
+def preference(data: str | bytes | None) -> Preference:
+    raw = loads(data) or {}
+
+    return Preference.construct(
+        industry=[enum_member(Industry, i) for i in raw.get("industry", [])],
+        job_type=[enum_member(JobType, i) for i in raw.get("job_type", [])],
+        job_location=[enum_member(JobLocation, i) for i in raw.get("job_location", [])],
+        experience_level=[
+            enum_member(ExperienceLevel, i) for i in raw.get("experience_level", [])
+        ],
+    )
+
+
+def application(row: Any) -> Application:
+    (
+        id,
+        title,
+        location,
+        job_type,
+        experience_level,
+        description,
+        skills,
+        views,
+        company_id,
+    ) = row
+
+    return Application.construct(
+        id=id,
+        title=title,
+        location=enum_member(JobLocation, location),
+        job_type=enum_member(JobType, job_type),
+        experience_level=enum_member(ExperienceLevel, experience_level),
+        skills=skills.split(","),
+        description=description,
+        views=views,
+        company_id=company_id,
+    )
+
+
+def applications(rows: Any) -> list[Application]:
+    return [application(row) for row in rows]
+
+
+def company(row: Any, applications: list[Application] | None = None) -> Company:
+    (
+        id,
+        name,
+        website,
+        industry,
+        organization_size,
+        image_uri,
+        cover_image_uri,
+        owner_username,
+    ) = row
+
+    return Company.construct(
+        id=id,
+        name=name,
+        website=website,
+        industry=enum_member(Industry, industry),
+        organization_size=enum_member(OrganizationSize, organization_size),
+        image_uri=image_uri,
+        cover_image_uri=cover_image_uri,
+        owner_username=owner_username,
+        applications=[] if applications is None else applications,
+    )
+
+
+def user(
+    username: str,
+    image_uri: str = "",
+    cover_image_uri: str = "",
+    education: str | bytes | None = None,
+    skills: str | bytes | None = None,
+    experience: str | bytes | None = None,
+    preference_data: str | bytes | None = None,
+) -> User:
+    return User.construct(
+        username=username,
+        image_uri=image_uri,
+        cover_image_uri=cover_image_uri,
+        education=named_items(Education, education),
+        skills=named_items(Skill, skills),
+        experience=named_items(Experience, experience),
+        preference=preference(preference_data),
+    )
+
+
+def message(row: Any) -> Message:
+    id, sender_username, recipient_username, time, text = row
+
+    return Message.construct(
+        message_id=id,
+        sender_username=sender_username,
+        recipient_username=recipient_username,
+        time=time,
+        text=text,
+    )
+
+
+def chat(
+    row: Any, messages: list[Message] | None = None, older_before: int | None = None
+) -> Chat:
+    chat_id, username1, username2 = row
+
+    return Chat.construct(
+        chat_id=chat_id,
+        username1=username1,
+        username2=username2,
+        message_list=[] if messages is None else messages,
+        older_before=older_before,
+    )
+
+
+def notification(row: Any) -> Notification:
+    id, username, kind, data = row
+
+    return Notification.construct(id=id, username=username, kind=kind, data=loads(data))
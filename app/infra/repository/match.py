@@ -1,66 +1,149 @@
-import json
+import itertools
+import random
+import time
 from dataclasses import dataclass
 from sqlite3 import Connection
 
-from app.core.models import (
-    Application,
-    Education,
-    Experience,
-    Preference,
-    Skill,
-    SwipeDirection,
-    SwipeFor,
-    User,
-)
+from app.core.models import Application, Preference, SwipeDirection, SwipeFor, User
 from app.core.repository.match import IMatchRepository
+from app.infra.memory_store import MemoryStore, OutboxEvent, Swipe
+from app.infra.outbox import enqueue
+from app.infra.repository import hydration
+from app.infra.swipe_filter import IdFilter, SwipeFilters
+from app.infra.user_ids import UserIds
+from app.infra.writer import Writer
+
+
+@dataclass
+class InMemoryMatchRepository(IMatchRepository):
+    store: MemoryStore
+
+    def _liked(self, username: str, application_id: int, swipe_for: SwipeFor) -> bool:
+        swipe = self.store.swipes.get((username, application_id, swipe_for))
+        return swipe is not None and swipe.direction == SwipeDirection.RIGHT
+
+    def get_swipe_list_users(self, application_id: int, amount: int) -> list[User]:
+        users = self.store.users.scan()
+
+        # most users have not been liked for a given application, so filtering a
+        # random sample a little larger than needed usually does it
+        sample = random.sample(users, min(len(users), 2 * amount))
+        if len(sample) < len(users):
+            candidates = [
+                user
+                for user in sample
+                if not self._liked(user.username, application_id, SwipeFor.USER)
+            ]
+            if len(candidates) >= amount:
+                return candidates[:amount]
+
+        candidates = [
+            user
+            for user in users
+            if not self._liked(user.username, application_id, SwipeFor.USER)
+        ]
+
+        return random.sample(candidates, min(amount, len(candidates)))
+
+    def get_swipe_list_applications(
+        self, swiper_username: str, preference: Preference, amount: int
+    ) -> list[Application]:
+        applications = self.store.applications
+
+        # one index lookup per combination of the preferred filter values
+        candidates = [
+            application
+            for filters in itertools.product(
+                preference.job_location,
+                preference.job_type,
+                preference.experience_level,
+            )
+            for application in applications.find("filters", filters)
+            if not self._liked(swiper_username, application.id, SwipeFor.APPLICATION)
+        ]
+
+        return random.sample(candidates, min(amount, len(candidates)))
+
+    def swipe(
+        self,
+        username: str,
+        application_id: int,
+        direction: SwipeDirection,
+        swipe_for: SwipeFor,
+    ) -> bool:
+        with self.store.lock:
+            previous = self.store.swipes.get((username, application_id, swipe_for))
+            if previous is None or previous.direction != direction:
+                self.store.put(
+                    self.store.swipes,
+                    Swipe(
+                        username=username,
+                        application_id=application_id,
+                        swipe_for=swipe_for,
+                        direction=direction,
+                        swiped_at=time.time(),
+                    ),
+                )
+
+            matched = self.matched(username=username, application_id=application_id)
+            if matched and (previous is None or previous.direction != direction):
+                self.store.put(
+                    self.store.outbox,
+                    OutboxEvent(
+                        id=self.store.outbox.next_id(),
+                        kind="match",
+                        payload={
+                            "username": username,
+                            "application_id": application_id,
+                        },
+                    ),
+                )
+
+        return matched
+
+    def matched(self, username: str, application_id: int) -> bool:
+        return self._liked(username, application_id, SwipeFor.APPLICATION) and (
+            self._liked(username, application_id, SwipeFor.USER)
+        )
 
 
 @dataclass
 class SqliteMatchRepository(IMatchRepository):
     connection: Connection
+    writer: Writer
+    # the swipe table stores user ids, usernames are mapped here
+    user_ids: UserIds
+    # decks leave out what was already liked without reading the swipe table
+    filters: SwipeFilters
 
     def get_swipe_list_users(self, application_id: int, amount: int) -> list[User]:
+        liked = self.filters.liked_users(application_id)
         cursor = self.connection.cursor()
 
+        # the limit only covers the worst case, every liked user drawn first;
+        # rows are read until `amount` are left, so typically little past it
         res = cursor.execute(
             """
-            SELECT u.username, u.education, u.experience, u.skills
-              FROM user u
-              LEFT JOIN swipe s on u.username = s.username
-               AND s.application_id = ?
-             WHERE (s.swipe_for IS NULL AND s.direction IS NULL)
-            OR NOT (s.swipe_for == ? AND s.direction == ?)
+            SELECT id, username, education, experience, skills
+              FROM user
              ORDER BY random()
              LIMIT ?;
             """,
-            [application_id, SwipeFor.USER, SwipeDirection.RIGHT, amount],
+            [amount + len(liked)],
         )
 
-        result = []
-
-        for username, education, experience, skills in res.fetchall():
-            education_list = [
-                Education(name=edu["name"], description=edu["description"])
-                for edu in json.loads(education)
-            ]
-            skills_list = [
-                Skill(name=skill["name"], description=skill["description"])
-                for skill in json.loads(skills)
-            ]
-            experience_list = [
-                Experience(name=exp["name"], description=exp["description"])
-                for exp in json.loads(experience)
-            ]
-
-            # TODO: add preferences if needed :)
-            user = User(
+        # TODO: add preferences if needed :)
+        result = [
+            hydration.user(
                 username=username,
-                education=education_list,
-                experience=experience_list,
-                skills=skills_list,
+                education=education,
+                experience=experience,
+                skills=skills,
             )
-
-            result.append(user)
+            for user_id, username, education, experience, skills in itertools.islice(
+                (row for row in res if row[0] not in liked), amount
+            )
+        ]
 
         cursor.close()
         return result
@@ -68,6 +151,10 @@ class SqliteMatchRepository(IMatchRepository):
     def get_swipe_list_applications(
         self, swiper_username: str, preference: Preference, amount: int
     ) -> list[Application]:
+        user_id = self.user_ids.id(swiper_username)
+        liked = (
+            IdFilter() if user_id is None else self.filters.liked_applications(user_id)
+        )
         cursor = self.connection.cursor()
 
         location_mask = ",".join("?" * len(preference.job_location))
@@ -76,58 +163,27 @@ class SqliteMatchRepository(IMatchRepository):
 
         res = cursor.execute(
             f"""
-            SELECT a.id, a.title, a.location, a.job_type, a.experience_level,
-                   a.description, a.skills, a.views, a.company_id
-              FROM application a
-              LEFT JOIN swipe s on a.id = s.application_id
-               AND s.username = ?
-             WHERE (
-                    (s.swipe_for IS NULL AND s.direction IS NULL)
-                    OR NOT (s.swipe_for == ? AND s.direction == ?)
-                   )
-               AND a.location IN ({location_mask})
-               AND a.job_type IN ({job_type_mask})
-               AND a.experience_level IN ({experience_level_mask})
+            SELECT id, title, location, job_type, experience_level,
+                   description, skills, views, company_id
+              FROM application
+             WHERE location IN ({location_mask})
+               AND job_type IN ({job_type_mask})
+               AND experience_level IN ({experience_level_mask})
              ORDER BY random()
              LIMIT ?;
             """,
             [
-                swiper_username,
-                SwipeFor.APPLICATION,
-                SwipeDirection.RIGHT,
                 *preference.job_location,
                 *preference.job_type,
                 *preference.experience_level,
-                amount,
+                amount + len(liked),
             ],
         )
 
-        result = []
-
-        for (
-            id,
-            title,
-            location,
-            job_type,
-            experience_level,
-            description,
-            skills,
-            views,
-            company_id,
-        ) in res.fetchall():
-            application = Application(
-                id=id,
-                title=title,
-                location=location,
-                job_type=job_type,
-                experience_level=experience_level,
-                description=description,
-                skills=skills.split(","),
-                views=views,
-                company_id=company_id,
-            )
-
-            result.append(application)
+        # as for users, read only as far as the deck needs
+        result = hydration.applications(
+            list(itertools.islice((row for row in res if row[0] not in liked), amount))
+        )
 
         cursor.close()
         return result
@@ -138,70 +194,88 @@ class SqliteMatchRepository(IMatchRepository):
         application_id: int,
         direction: SwipeDirection,
         swipe_for: SwipeFor,
-    ) -> None:
-        cursor = self.connection.cursor()
+    ) -> bool:
+        user_id = self.user_ids.id(username)
+        if user_id is None:
+            return False
 
-        res = cursor.execute(
-            """
-            SELECT *
-              FROM swipe
-             WHERE username = ?
-               AND application_id = ?
-               AND swipe_for = ?;
-            """,
-            (username, application_id, swipe_for),
-        )
-
-        if res.fetchone() is None:
-            cursor.execute(
+        # the swipe, the match check and the match event share one transaction,
+        # so a match is recorded exactly when the swipe that completed it is
+        def upsert(connection: Connection) -> bool:
+            cursor = connection.cursor()
+            previous = cursor.execute(
                 """
-                INSERT INTO swipe (username, application_id, swipe_for, direction)
-                VALUES (?, ?, ?, ?);
+                SELECT direction FROM swipe
+                 WHERE user_id = ?
+                   AND application_id = ?
+                   AND swipe_for = ?;
                 """,
-                (username, application_id, swipe_for, direction),
-            )
-        else:
-            cursor.execute(
+                (user_id, application_id, swipe_for),
+            ).fetchone()
+
+            if previous is None:
+                cursor.execute(
+                    """
+                    INSERT INTO swipe
+                    (user_id, application_id, swipe_for, direction, swiped_at)
+                    VALUES (?, ?, ?, ?, ?);
+                    """,
+                    (user_id, application_id, swipe_for, direction, time.time()),
+                )
+            elif previous[0] != direction:
+                cursor.execute(
+                    """
+                    UPDATE swipe SET direction = ?, swiped_at = ?
+                     WHERE user_id = ?
+                       AND application_id = ?
+                       AND swipe_for = ?;
+                    """,
+                    (direction, time.time(), user_id, application_id, swipe_for),
+                )
+
+            (liked_by_both,) = cursor.execute(
                 """
-                UPDATE swipe SET direction = ?
-                 WHERE username = ?
+                SELECT COUNT(*) = 2 FROM swipe
+                 WHERE user_id = ?
                    AND application_id = ?
-                   AND swipe_for = ?;
+                   AND direction = ?;
                 """,
-                (direction, username, application_id, swipe_for),
-            )
+                (user_id, application_id, SwipeDirection.RIGHT),
+            ).fetchone()
+            cursor.close()
 
-        self.connection.commit()
-        cursor.close()
+            matched = bool(liked_by_both)
+            if matched and (previous is None or previous[0] != direction):
+                enqueue(
+                    connection,
+                    "match",
+                    {"username": username, "application_id": application_id},
+                )
 
-    def matched(self, username: str, application_id: int) -> bool:
-        cursor = self.connection.cursor()
+            return matched
 
-        res = cursor.execute(
-            """
-            SELECT * FROM swipe
-             WHERE username = ?
-               AND application_id = ?
-               AND direction = ?
-               AND swipe_for = ?;
-            """,
-            [username, application_id, SwipeDirection.RIGHT, SwipeFor.APPLICATION],
-        )
+        matched = self.writer.execute(upsert)
+        self.filters.record(user_id, application_id, swipe_for, direction)
 
-        user_liked_application = res.fetchone() is not None
+        return matched
 
-        res = cursor.execute(
+    def matched(self, username: str, application_id: int) -> bool:
+        user_id = self.user_ids.id(username)
+        if user_id is None:
+            return False
+
+        cursor = self.connection.cursor()
+
+        # both swipes sit next to each other under the primary key
+        (liked_by_both,) = cursor.execute(
             """
-            SELECT * FROM swipe
-             WHERE username = ?
+            SELECT COUNT(*) = 2 FROM swipe
+             WHERE user_id = ?
                AND application_id = ?
-               AND direction = ?
-               AND swipe_for = ?;
+               AND direction = ?;
             """,
-            [username, application_id, SwipeDirection.RIGHT, SwipeFor.USER],
-        )
-
-        application_liked_user = res.fetchone() is not None
+            [user_id, application_id, SwipeDirection.RIGHT],
+        ).fetchone()
 
         cursor.close()
-        return user_liked_application and application_liked_user
+        return bool(liked_by_both)
@@ -0,0 +1,116 @@
+from dataclasses import dataclass
+from sqlite3 import Connection
+from typing import Any
+
+import orjson
+
+from app.core.models import Notification
+from app.core.repository.notification import INotificationRepository
+from app.infra.memory_store import MemoryStore
+from app.infra.repository import hydration
+from app.infra.writer import Writer
+
+
+@dataclass
+class InMemoryNotificationRepository(INotificationRepository):
+    store: MemoryStore
+
+    def add_notification(
+        self, username: str, kind: str, data: dict[str, Any], key: str | None = None
+    ) -> Notification | None:
+        with self.store.lock:
+            if key is not None and self.store.notifications.find(
+                "key", (username, kind, key)
+            ):
+                return None
+
+            notification = Notification(
+                id=self.store.notifications.next_id(),
+                username=username,
+                kind=kind,
+                data=data,
+                key=key,
+            )
+            self.store.put(self.store.notifications, notification)
+
+        return notification
+
+    def get_notifications(self, username: str, limit: int) -> list[Notification]:
+        return self.store.notifications.find("user", username)[:limit]
+
+    def acknowledge(self, username: str, notification_id: int) -> None:
+        with self.store.lock:
+            for notification in self.store.notifications.find("user", username):
+                if notification.id > notification_id:
+                    break
+                if notification.key is None:
+                    self.store.delete(self.store.notifications, notification.id)
+                else:
+                    self.store.put(
+                        self.store.notifications,
+                        notification.copy(update={"data": {}, "acknowledged": True}),
+                    )
+
+
+@dataclass
+class SqliteNotificationRepository(INotificationRepository):
+    connection: Connection
+    writer: Writer
+
+    def add_notification(
+        self, username: str, kind: str, data: dict[str, Any], key: str | None = None
+    ) -> Notification | None:
+        def insert(connection: Connection) -> Any:
+            cursor = connection.cursor()
+            row = cursor.execute(
+                """
+                INSERT INTO notification (username, kind, key, data)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (username, kind, key) DO NOTHING
+                RETURNING id
+                """,
+                [username, kind, key, orjson.dumps(data).decode()],
+            ).fetchone()
+            cursor.close()
+            return row
+
+        row = self.writer.execute(insert)
+        if row is None:
+            return None
+
+        return Notification.construct(
+            id=row[0], username=username, kind=kind, data=data, key=key
+        )
+
+    def get_notifications(self, username: str, limit: int) -> list[Notification]:
+        cursor = self.connection.cursor()
+        rows = cursor.execute(
+            """
+            SELECT id, username, kind, data
+              FROM notification
+             WHERE username = ? AND acknowledged = 0
+             ORDER BY id
+             LIMIT ?
+            """,
+            [username, limit],
+        ).fetchall()
+        cursor.close()
+
+        return [hydration.notification(row) for row in rows]
+
+    def acknowledge(self, username: str, notification_id: int) -> None:
+        def acknowledge(connection: Connection) -> None:
+            cursor = connection.cursor()
+            cursor.execute(
+                "DELETE FROM notification "
+                "WHERE username = ? AND id <= ? AND key IS NULL",
+                [username, notification_id],
+            )
+            cursor.execute(
+                "UPDATE notification SET data = '{}', acknowledged = 1 "
+                "WHERE username = ? AND id <= ? AND acknowledged = 0",
+                [username, notification_id],
+            )
+            cursor.close()
+
+        self.writer.execute(acknowledge)
@@ -1,53 +1,75 @@
 import json
-from dataclasses import dataclass, field
+from dataclasses import dataclass
 from sqlite3 import Connection
+from typing import Any
 
-from app.core.models import (
-    Education,
-    Experience,
-    ExperienceLevel,
-    Industry,
-    JobLocation,
-    JobType,
-    Preference,
-    Skill,
-    User,
-)
+from app.core.models import Preference, User
 from app.core.repository.user import IUserRepository
+from app.infra.memory_store import MemoryStore
+from app.infra.repository import hydration
+from app.infra.writer import Writer
 
 
 @dataclass
 class InMemoryUserRepository(IUserRepository):
-    users: dict[str, User] = field(default_factory=dict)
+    store: MemoryStore
 
     def create_user(self, username: str) -> User | None:
-        self.users[username] = User(username=username)
-        return self.users[username]
+        user = User(username=username)
+        self.store.put(self.store.users, user)
+        return user
 
     def update_user(self, username: str, user: User) -> User | None:
-        if not self.has_user(username=username):
-            return None
-        self.users[username].update(
-            user.education, user.skills, user.experience, user.preference
-        )
+        with self.store.lock:
+            stored = self.store.users.get(username)
+            if stored is None:
+                return None
+
+            self.store.put(
+                self.store.users,
+                stored.copy(
+                    update={
+                        "education": user.education,
+                        "skills": user.skills,
+                        "experience": user.experience,
+                        "image_uri": user.image_uri,
+                        "cover_image_uri": user.cover_image_uri,
+                    }
+                ),
+            )
+
         return user
 
     def get_user(self, username: str) -> User | None:
-        return self.users.get(username)
+        return self.store.users.get(username)
+
+    def get_users(self, usernames: list[str]) -> dict[str, User]:
+        users = self.store.users
+        return {
+            username: user
+            for username in usernames
+            if (user := users.get(username)) is not None
+        }
 
     def has_user(self, username: str) -> bool:
-        return self.get_user(username=username) is not None
+        return self.store.users.get(username) is not None
 
     def update_preferences(self, username: str, preference: Preference) -> User | None:
-        if not self.has_user(username=username):
-            return None
-        self.users[username].preference = preference
-        return self.users[username]
+        with self.store.lock:
+            user = self.store.users.get(username)
+            if user is None:
+                return None
+
+            user = user.copy(update={"preference": preference})
+            self.store.put(self.store.users, user)
+
+        return user
 
 
 @dataclass
 class SqliteUserRepository(IUserRepository):
     connection: Connection
+    writer: Writer
 
     # def _deserialize_lists(self, user_data):
     #     user_data["education"] = json.loads(user_data["education"])
@@ -56,133 +78,146 @@ class SqliteUserRepository(IUserRepository):
     #     return user_data
 
     def create_user(self, username: str) -> User | None:
-        cursor = self.connection.cursor()
-        cursor.execute(
-            "INSERT INTO user (username, image_uri, cover_image_uri, "
-            "education, skills, experience, preference) "
-            "VALUES (?, ?, ?, ?, ?, ?, ?)",
-            (
-                username,
-                "",
-                "",
-                json.dumps([]),
-                json.dumps([]),
-                json.dumps([]),
-                json.dumps(
-                    {
-                        "industry": [],
-                        "job_type": [],
-                        "job_location": [],
-                        "experience_level": [],
-                    }
+        self.writer.execute(
+            lambda connection: connection.execute(
+                "INSERT INTO user (username, image_uri, cover_image_uri, "
+                "education, skills, experience, preference) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    username,
+                    "",
+                    "",
+                    json.dumps([]),
+                    json.dumps([]),
+                    json.dumps([]),
+                    json.dumps(
+                        {
+                            "industry": [],
+                            "job_type": [],
+                            "job_location": [],
+                            "experience_level": [],
+                        }
+                    ),
                 ),
-            ),
+            ).close()
         )
-        self.connection.commit()
         return User(username=username)
 
     def update_user(self, username: str, user: User) -> User | None:
-        cursor = self.connection.cursor()
-        cursor.execute(
-            "UPDATE user SET education = ?, skills = ?, "
-            "experience = ?, image_uri = ?, cover_image_uri = ? "
-            "WHERE username = ?",
-            (
-                json.dumps(
-                    [
-                        {"name": edu.name, "description": edu.description}
-                        for edu in user.education
-                    ]
-                ),
-                json.dumps(
-                    [
-                        {"name": skill.name, "description": skill.description}
-                        for skill in user.skills
-                    ]
-                ),
-                json.dumps(
-                    [
-                        {"name": exp.name, "description": exp.description}
-                        for exp in user.experience
-                    ]
-                ),
-                user.image_uri,
-                user.cover_image_uri,
-                username,
+        values = (
+            json.dumps(
+                [
+                    {"name": edu.name, "description": edu.description}
+                    for edu in user.education
+                ]
             ),
+            json.dumps(
+                [
+                    {"name": skill.name, "description": skill.description}
+                    for skill in user.skills
+                ]
+            ),
+            json.dumps(
+                [
+                    {"name": exp.name, "description": exp.description}
+                    for exp in user.experience
+                ]
+            ),
+            user.image_uri,
+            user.cover_image_uri,
+            username,
         )
-        self.connection.commit()
-        return user
-
-    def get_user(self, username: str) -> User | None:
-        cursor = self.connection.cursor()
-
-        cursor.execute("SELECT * FROM user WHERE username = ?", (username,))
-        user_data = cursor.fetchone()
-        username = user_data[1]
-        image_uri = user_data[2]
-        cover_image_uri = user_data[3]
-
-        educations = json.loads(user_data[4])
-        education_list = [
-            Education(name=edu["name"], description=edu["description"])
-            for edu in educations
-        ]
-
-        skills = json.loads(user_data[5])
-        skills_list = [
-            Skill(name=skill["name"], description=skill["description"])
-            for skill in skills
-        ]
-
-        experience = json.loads(user_data[6])
-        experience_list = [
-            Experience(name=exp["name"], description=exp["description"])
-            for exp in experience
-        ]
-
-        preference_dict = json.loads(user_data[7])
-        preference = Preference(
-            industry=[Industry(i) for i in preference_dict["industry"]],
-            job_type=[JobType(i) for i in preference_dict["job_type"]],
-            job_location=[JobLocation(i) for i in preference_dict["job_location"]],
-            experience_level=[
-                ExperienceLevel(i) for i in preference_dict["experience_level"]
-            ],
+        self.writer.execute(
+            lambda connection: connection.execute(
+                "UPDATE user SET education = ?, skills = ?, "
+                "experience = ?, image_uri = ?, cover_image_uri = ? "
+                "WHERE username = ?",
+                values,
+            ).close()
         )
-        print(preference.industry)
+        return user
 
-        return User(
+    @staticmethod
+    def _hydrate(row: tuple[Any, ...]) -> User:
+        (
+            _,
+            username,
+            image_uri,
+            cover_image_uri,
+            education,
+            skills,
+            experience,
+            preference,
+        ) = row
+
+        return hydration.user(
             username=username,
             image_uri=image_uri,
             cover_image_uri=cover_image_uri,
-            education=education_list,
-            skills=skills_list,
-            experience=experience_list,
-            preference=preference,
+            education=education,
+            skills=skills,
+            experience=experience,
+            preference_data=preference,
         )
 
+    def get_user(self, username: str) -> User | None:
+        cursor = self.connection.cursor()
+
+        row = cursor.execute(
+            "SELECT * FROM user WHERE username = ?", (username,)
+        ).fetchone()
+        cursor.close()
+
+        if row is None:
+            return None
+
+        return self._hydrate(row)
+
+    def get_users(self, usernames: list[str]) -> dict[str, User]:
+        if not usernames:
+            return {}
+
+        cursor = self.connection.cursor()
+        rows = cursor.execute(
+            f"SELECT * FROM user WHERE username IN ({','.join('?' * len(usernames))})",
+            usernames,
+        ).fetchall()
+        cursor.close()
+
+        users = [self._hydrate(row) for row in rows]
+        return {user.username: user for user in users}
+
     def has_user(self, username: str) -> bool:
         cursor = self.connection.cursor()
-        cursor.execute("SELECT COUNT(*) FROM user WHERE username = ?", (username,))
-        user_exists: bool = cursor.fetchone()[0] > 0
-        return user_exists
+        row = cursor.execute(
+            "SELECT EXISTS (SELECT 1 FROM user WHERE username = ?)", (username,)
+        ).fetchone()
+        cursor.close()
+
+        return bool(row[0])
 
     def update_preferences(self, username: str, preference: Preference) -> User | None:
-        cursor = self.connection.cursor()
-        cursor.execute(
-            "UPDATE user SET preference = ? WHERE username = ?",
-            (
-                json.dumps(
-                    {
-                        "industry": preference.industry,
-                        "job_type": preference.job_type,
-                        "job_location": preference.job_location,
-                        "experience_level": preference.experience_level,
-                    }
-                ),
-                username,
-            ),
+        encoded = json.dumps(
+            {
+                "industry": preference.industry,
+                "job_type": preference.job_type,
+                "job_location": preference.job_location,
+                "experience_level": preference.experience_level,
+            }
         )
-        self.connection.commit()
-        return self.get_user(username=username)
+
+        def update(connection: Connection) -> Any:
+            cursor = connection.cursor()
+            row = cursor.execute(
+                "UPDATE user SET preference = ? WHERE username = ? RETURNING *",
+                (encoded, username),
+            ).fetchone()
+            cursor.close()
+            return row
+
+        row = self.writer.execute(update)
+
+        if row is None:
+            return None
+
+        return self._hydrate(row)
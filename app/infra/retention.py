@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from sqlite3 import Connection
+from typing import Any, Iterator, Protocol
+
+from app.core.models import SwipeDirection
+from app.infra.memory_store import MemoryStore, Swipe
+from app.infra.metrics import MetricsRegistry
+from app.infra.writer import Writer
+
+logger = logging.getLogger(__name__)
+
+
+class SwipeRetention(Protocol):
+    def compact(
+        self, expire_before: float, batch_size: int
+    ) -> Iterator[tuple[int, int]]:
+        """
+        Deletes left swipes made before `expire_before` and swipes on
+        applications that no longer exist, `batch_size` rows looked at a time.
+        Yields how many expired and how many orphaned swipes each batch deleted.
+        """
+        pass
+
+    def vacuum(self, pages: int) -> int:
+        """Returns up to `pages` free pages to the filesystem, and how many."""
+        pass
+
+
+@dataclass
+class SqliteSwipeRetention(SwipeRetention):
+    connection: Connection
+    writer: Writer
+
+    def _batch_end(self, after: tuple[Any, ...], batch_size: int) -> Any:
+        cursor = self.connection.cursor()
+        row = cursor.execute(
+            """
+            SELECT user_id, application_id, swipe_for FROM swipe
+             WHERE (user_id, application_id, swipe_for) > (?, ?, ?)
+             ORDER BY user_id, application_id, swipe_for
+             LIMIT 1 OFFSET ?
+            """,
+            [*after, batch_size - 1],
+        ).fetchone()
+        cursor.close()
+
+        return row
+
+    def compact(
+        self, expire_before: float, batch_size: int
+    ) -> Iterator[tuple[int, int]]:
+        # walks the primary key in ranges, so each delete only touches one
+        # batch of rows and other writes go in between
+        after: tuple[Any, ...] = (0, 0, "")
+        while True:
+            end = self._batch_end(after, batch_size)
+            upto = ""
+            if end is not None:
+                upto = "AND (user_id, application_id, swipe_for) <= (?, ?, ?)"
+
+            sql = f"""
+                DELETE FROM swipe
+                 WHERE (user_id, application_id, swipe_for) > (?, ?, ?)
+                   {upto}
+                   AND (
+                       (direction = ? AND swiped_at < ?)
+                       OR application_id NOT IN (SELECT id FROM application)
+                   )
+                RETURNING direction, swiped_at
+                """
+            parameters = [*after, *(end or ()), SwipeDirection.LEFT, expire_before]
+
+            def delete(connection: Connection) -> list[Any]:
+                cursor = connection.cursor()
+                rows = cursor.execute(sql, parameters).fetchall()
+                cursor.close()
+                return rows
+
+            rows = self.writer.execute(delete)
+            expired = sum(
+                1
+                for direction, swiped_at in rows
+                if direction == SwipeDirection.LEFT and swiped_at < expire_before
+            )
+            yield expired, len(rows) - expired
+
+            if end is None:
+                return
+            after = tuple(end)
+
+    def vacuum(self, pages: int) -> int:
+        def incremental_vacuum(connection: Connection) -> int:
+            cursor = connection.cursor()
+            (before,) = cursor.execute("PRAGMA freelist_count").fetchone()
+            # the pragma frees a page per step, fetching runs it to the end
+            cursor.execute(f"PRAGMA incremental_vacuum({int(pages)})").fetchall()
+            (after,) = cursor.execute("PRAGMA freelist_count").fetchone()
+            cursor.close()
+            return int(before - after)
+
+        return self.writer.execute(incremental_vacuum)
+
+
+@dataclass
+class InMemorySwipeRetention(SwipeRetention):
+    store: MemoryStore
+
+    def _reclaimable(self, swipe: Swipe, expire_before: float) -> str | None:
+        if swipe.direction == SwipeDirection.LEFT and swipe.swiped_at < expire_before:
+            return "expired"
+        if self.store.applications.get(swipe.application_id) is None:
+            return "orphaned"
+        return None
+
+    def compact(
+        self, expire_before: float, batch_size: int
+    ) -> Iterator[tuple[int, int]]:
+        # the scan copies the rows under the lock like a snapshot does, the
+        # deletes then hold it for one batch at a time
+        swipes = self.store.swipes.scan()
+        for start in range(0, len(swipes), batch_size):
+            end = start + batch_size
+            reasons: list[str] = []
+            with self.store.lock:
+                for swipe in swipes[start:end]:
+                    key = (swipe.username, swipe.application_id, swipe.swipe_for)
+                    # it may have been swiped again since the scan
+                    current = self.store.swipes.get(key)
+                    reason = (
+                        None
+                        if current is None
+                        else self._reclaimable(current, expire_before)
+                    )
+                    if reason is not None:
+                        self.store.delete(self.store.swipes, key)
+                        reasons.append(reason)
+
+            yield reasons.count("expired"), reasons.count("orphaned")
+
+    def vacuum(self, pages: int) -> int:
+        return 0
+
+
+@dataclass
+class SwipeCompactor:
+    """
+    Every `interval` seconds, deletes left swipes older than `retention`
+    seconds and swipes left behind by deleted applications. Decks only leave
+    out right swipes, so neither kind changes what anyone is shown; this only
+    keeps the table from growing with every rejection. Rows are deleted
+    `batch_size` at a time, each batch in its own write, and the freed pages
+    are then released `vacuum_pages` at a time.
+    """
+
+    swipes: SwipeRetention
+    metrics: MetricsRegistry
+    retention: float = 90 * 24 * 60 * 60.0
+    batch_size: int = 500
+    vacuum_pages: int = 256
+    interval: float = 3600.0
+    _task: asyncio.Task[None] | None = None
+
+    def __post_init__(self) -> None:
+        self.reclaimed = self.metrics.counter(
+            "swipes_reclaimed_total",
+            "Swipes deleted by the retention job, by reason",
+            labels=("reason",),
+        )
+        self.vacuumed = self.metrics.counter(
+            "swipe_pages_vacuumed_total",
+            "Database pages released after compacting swipes",
+        )
+
+    def run_once(self) -> tuple[int, int]:
+        expired, orphaned = 0, 0
+        for batch_expired, batch_orphaned in self.swipes.compact(
+            expire_before=time.time() - self.retention, batch_size=self.batch_size
+        ):
+            expired += batch_expired
+            orphaned += batch_orphaned
+            self.reclaimed.inc(batch_expired, reason="expired")
+            self.reclaimed.inc(batch_orphaned, reason="orphaned")
+
+        pages = 0
+        while freed := self.swipes.vacuum(self.vacuum_pages):
+            pages += freed
+            self.vacuumed.inc(freed)
+
+        logger.info(
+            "reclaimed %d expired and %d orphaned swipes, %d pages",
+            expired,
+            orphaned,
+            pages,
+        )
+        return expired, orphaned
+
+    async def _run_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.run_once)
+            except Exception:
+                logger.exception("compacting swipes failed")
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run_periodically())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
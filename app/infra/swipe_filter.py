@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import threading
+from dataclasses import dataclass, field
+from sqlite3 import Connection
+from typing import Iterator
+
+from app.core.models import SwipeDirection, SwipeFor
+from app.infra.metrics import MetricsRegistry
+
+MASK = (1 << 64) - 1
+# under 0.1% false positives per full layer, so that a filter grown to many
+# layers still stays well below 1%
+BITS_PER_ID = 16
+HASHES = 7
+FIRST_LAYER_IDS = 32
+
+
+def _positions(item: int, bits: int) -> Iterator[int]:
+    # splitmix64, then double hashing over its two halves
+    h = (item + 0x9E3779B97F4A7C15) & MASK
+    h = ((h ^ (h >> 30)) * 0xBF58476D1CE4E5B9) & MASK
+    h = ((h ^ (h >> 27)) * 0x94D049BB133111EB) & MASK
+    h ^= h >> 31
+    h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+    for i in range(HASHES):
+        yield (h1 + i * h2) % bits
+
+
+@dataclass(slots=True)
+class IdFilter:
+    """
+    Bloom filter of integer ids. It starts out sized for FIRST_LAYER_IDS and
+    adds a layer twice as large whenever the newest one is full, so most
+    filters stay a few dozen bytes. A Bloom filter cannot forget, so removed
+    ids are kept aside in an exact set until they are added again.
+    """
+
+    layers: list[bytearray] = field(default_factory=list)
+    counts: list[int] = field(default_factory=list)
+    removed: set[int] | None = None
+    size: int = 0
+
+    def _in_layers(self, item: int) -> bool:
+        for layer in self.layers:
+            bits = len(layer) * 8
+            if all(layer[i >> 3] & (1 << (i & 7)) for i in _positions(item, bits)):
+                return True
+        return False
+
+    def __contains__(self, item: int) -> bool:
+        if self.removed is not None and item in self.removed:
+            return False
+        return self._in_layers(item)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def add(self, item: int) -> None:
+        if self.removed is not None and item in self.removed:
+            self.removed.discard(item)
+            self.size += 1
+            return
+        if self._in_layers(item):
+            return
+
+        if not self.layers or self.counts[-1] >= FIRST_LAYER_IDS << (
+            len(self.layers) - 1
+        ):
+            capacity = FIRST_LAYER_IDS << len(self.layers)
+            self.layers.append(bytearray(capacity * BITS_PER_ID // 8))
+            self.counts.append(0)
+
+        layer = self.layers[-1]
+        for i in _positions(item, len(layer) * 8):
+            layer[i >> 3] |= 1 << (i & 7)
+        self.counts[-1] += 1
+        self.size += 1
+
+    def discard(self, item: int) -> None:
+        if item in self:
+            if self.removed is None:
+                self.removed = set()
+            self.removed.add(item)
+            # a false positive was never counted in
+            self.size = max(0, self.size - 1)
+
+    def false_positive_rate(self) -> float:
+        """The chance that an id never added is reported as present."""
+        absent = 1.0
+        for layer, count in zip(self.layers, self.counts):
+            bits = len(layer) * 8
+            absent *= 1 - (1 - math.exp(-HASHES * count / bits)) ** HASHES
+        return 1 - absent
+
+
+@dataclass
+class SwipeFilters:
+    """
+    Per user, the applications they liked, and per application, the users liked
+    for it, so deck generation can leave them out without joining the swipe
+    table. Read from the table once, on start or first use, and from then on
+    updated by the match repository as each swipe commits.
+
+    Nothing polls the table after that: with several processes sharing the
+    database, a like made through another process is only seen here after a
+    restart. Until then it can show up again in a deck, and swiping it again
+    changes nothing, which is cheaper than reading the swipe table back on the
+    shared read connection every second.
+
+    Like the decks it feeds, only right swipes are kept. A false positive
+    leaves an unswiped candidate out of one deck, which is all it costs.
+    """
+
+    connection: Connection
+    metrics: MetricsRegistry
+    applications: dict[int, IdFilter] = field(default_factory=dict)
+    users: dict[int, IdFilter] = field(default_factory=dict)
+    _loaded: bool = False
+    _rate_sums: dict[SwipeFor, float] = field(
+        default_factory=lambda: {SwipeFor.APPLICATION: 0.0, SwipeFor.USER: 0.0}
+    )
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def __post_init__(self) -> None:
+        # gauges add up over processes, so the mean rate is exported as a sum
+        # and a count to divide it by
+        self.filters = self.metrics.gauge(
+            "swipe_filters", "Deck filters held in memory, by deck", labels=("deck",)
+        )
+        self.false_positives = self.metrics.gauge(
+            "swipe_filter_false_positive_rate_sum",
+            "Estimated false positive rates of the deck filters added up, by deck",
+            labels=("deck",),
+        )
+
+    def _record(
+        self,
+        user_id: int,
+        application_id: int,
+        swipe_for: SwipeFor,
+        direction: SwipeDirection,
+    ) -> None:
+        if swipe_for == SwipeFor.APPLICATION:
+            filters, key, item = self.applications, user_id, application_id
+        else:
+            filters, key, item = self.users, application_id, user_id
+
+        id_filter = filters.get(key)
+        if id_filter is None:
+            if direction != SwipeDirection.RIGHT:
+                return
+            id_filter = filters[key] = IdFilter()
+
+        before = id_filter.false_positive_rate()
+        if direction == SwipeDirection.RIGHT:
+            id_filter.add(item)
+        else:
+            id_filter.discard(item)
+        self._rate_sums[swipe_for] += id_filter.false_positive_rate() - before
+
+    def _report(self) -> None:
+        for swipe_for, filters in [
+            (SwipeFor.APPLICATION, self.applications),
+            (SwipeFor.USER, self.users),
+        ]:
+            self.filters.set(len(filters), deck=str(swipe_for))
+            self.false_positives.set(self._rate_sums[swipe_for], deck=str(swipe_for))
+
+    def load(self) -> None:
+        with self._lock:
+            if self._loaded:
+                return
+
+            cursor = self.connection.cursor()
+            rows = cursor.execute(
+                "SELECT user_id, application_id, swipe_for, direction "
+                "FROM swipe WHERE direction = ?",
+                [SwipeDirection.RIGHT],
+            )
+            for user_id, application_id, swipe_for, direction in rows:
+                self._record(user_id, application_id, swipe_for, direction)
+            cursor.close()
+
+            self._loaded = True
+            self._report()
+
+    def record(
+        self,
+        user_id: int,
+        application_id: int,
+        swipe_for: SwipeFor,
+        direction: SwipeDirection,
+    ) -> None:
+        """For swipes this process has just committed."""
+        with self._lock:
+            self._record(user_id, application_id, swipe_for, direction)
+            self._report()
+
+    def liked_applications(self, user_id: int) -> IdFilter:
+        self.load()
+        id_filter = self.applications.get(user_id)
+        return IdFilter() if id_filter is None else id_filter
+
+    def liked_users(self, application_id: int) -> IdFilter:
+        self.load()
+        id_filter = self.users.get(application_id)
+        return IdFilter() if id_filter is None else id_filter
+
+    async def start(self) -> None:
+        await asyncio.to_thread(self.load)
+
+    async def stop(self) -> None:
+        pass
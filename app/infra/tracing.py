@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import functools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Iterator, Protocol
+
+import orjson
+
+from app.core.constants import Status
+from app.core.responses import CoreResponse
+from app.infra.instrumentation import Method, wrap_methods
+
+_current: ContextVar[Span | None] = ContextVar("span", default=None)
+
+
+def _new_id() -> str:
+    return os.urandom(8).hex()
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str = field(default_factory=_new_id)
+    parent_id: str | None = None
+    start: float = field(default_factory=time.time)
+    duration_ms: float = 0.0
+    status: str = "ok"
+    attributes: dict[str, Any] = field(default_factory=dict)
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+
+class SpanExporter(Protocol):
+    def export(self, span: Span) -> None:
+        pass
+
+
+@dataclass
+class RingBufferExporter:
+    capacity: int = 1000
+    spans: deque[Span] = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.spans = deque(maxlen=self.capacity)
+
+    def export(self, span: Span) -> None:
+        self.spans.append(span)
+
+    def find(self, trace_id: str | None = None, limit: int = 100) -> list[Span]:
+        # other threads keep exporting, and a deque cannot be iterated while it
+        # changes; copying it is atomic
+        spans = list(self.spans)
+        if trace_id is not None:
+            spans = [s for s in spans if s.trace_id == trace_id]
+        return spans[-limit:]
+
+
+@dataclass
+class JsonlExporter:
+    path: Path
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def export(self, span: Span) -> None:
+        line = orjson.dumps(asdict(span), default=str) + b"\n"
+        with self._lock, self.path.open("ab") as file:
+            file.write(line)
+
+
+@dataclass
+class Tracer:
+    exporters: list[SpanExporter] = field(default_factory=list)
+
+    @staticmethod
+    def current() -> Span | None:
+        return _current.get()
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span]:
+        parent = _current.get()
+        span = Span(
+            name=name,
+            trace_id=parent.trace_id if parent is not None else _new_id(),
+            parent_id=parent.span_id if parent is not None else None,
+            attributes=attributes,
+        )
+
+        token = _current.set(span)
+        start = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.set(error=type(e).__name__)
+            raise
+        finally:
+            span.duration_ms = (time.perf_counter() - start) * 1000
+            _current.reset(token)
+            for exporter in self.exporters:
+                exporter.export(span)
+
+    def instrument(self, obj: Any, prefix: str | None = None) -> None:
+        """Wraps every public method of `obj` in a span named prefix.method."""
+        prefix = prefix or type(obj).__name__
+
+        def traced(name: str, method: Method) -> Method:
+            span_name = f"{prefix}.{name}"
+
+            @functools.wraps(method)
+            def wrapper(*args: Any, **kwargs: Any) -> Any:
+                with self.span(span_name) as span:
+                    result = method(*args, **kwargs)
+                    if isinstance(result, CoreResponse):
+                        span.set(status=result.status.name)
+                    elif isinstance(result, tuple) and result:
+                        # services return (Status, value)
+                        if isinstance(result[0], Status):
+                            span.set(status=result[0].name)
+                    return result
+
+            return wrapper
+
+        wrap_methods(obj, traced)
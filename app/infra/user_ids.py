@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass, field
+from sqlite3 import Connection
+from typing import Iterable
+
+
+@dataclass
+class UserIds:
+    """
+    Maps usernames to the integer ids the swipe, chat and message tables store
+    instead. A user's id never changes, so found pairs are cached until there
+    are `capacity` of them, then the oldest are dropped. Unknown usernames are
+    not cached, since the user may be created later.
+    """
+
+    connection: Connection
+    capacity: int = 100_000
+    _ids: dict[str, int] = field(default_factory=dict)
+    _usernames: dict[int, str] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def _remember(self, pairs: Iterable[tuple[str, int]]) -> None:
+        with self._lock:
+            for username, user_id in pairs:
+                self._ids[username] = user_id
+                self._usernames[user_id] = username
+
+            while len(self._ids) > self.capacity:
+                self._usernames.pop(self._ids.pop(next(iter(self._ids))), None)
+
+    def _load(self, column: str, values: list[object]) -> list[tuple[str, int]]:
+        values = list(dict.fromkeys(values))
+        cursor = self.connection.cursor()
+        rows = cursor.execute(
+            f"SELECT username, id FROM user "
+            f"WHERE {column} IN ({','.join('?' * len(values))})",
+            values,
+        ).fetchall()
+        cursor.close()
+
+        self._remember(rows)
+        return rows
+
+    def id(self, username: str) -> int | None:
+        return self.ids([username]).get(username)
+
+    def ids(self, usernames: Iterable[str]) -> dict[str, int]:
+        result: dict[str, int] = {}
+        missing: list[object] = []
+        for username in usernames:
+            user_id = self._ids.get(username)
+            if user_id is None:
+                missing.append(username)
+            else:
+                result[username] = user_id
+
+        if missing:
+            result.update(self._load("username", missing))
+        return result
+
+    def usernames(self, user_ids: Iterable[int]) -> dict[int, str]:
+        result: dict[int, str] = {}
+        missing: list[object] = []
+        for user_id in user_ids:
+            username = self._usernames.get(user_id)
+            if username is None:
+                missing.append(user_id)
+            else:
+                result[user_id] = username
+
+        if missing:
+            result.update(
+                (user_id, username) for username, user_id in self._load("id", missing)
+            )
+        return result
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from pathlib import Path
+from sqlite3 import Connection
+from typing import Any, Callable, Protocol, TypeVar, cast
+
+from app.infra.db_setup import connect
+from app.infra.metrics import Histogram, MetricsRegistry
+from app.infra.query_log import TracingConnection
+
+T = TypeVar("T")
+
+
+class Writer(Protocol):
+    def execute(self, operation: Callable[[Connection], T]) -> T:
+        pass
+
+
+@dataclass
+class _Job:
+    operation: Callable[[Connection], Any]
+    context: contextvars.Context
+    future: Future[Any]
+
+
+@dataclass
+class SqliteWriter:
+    """
+    The only connection that writes. Callers from any thread hand it operations
+    and block on a future. A background thread applies whatever has
+    queued up in one transaction, with one commit (and one fsync) per batch.
+    Each operation runs in its own savepoint so a failing one does not take the
+    rest of the batch down, and in its caller's context so query logs and
+    tracing spans still land on the right request.
+    """
+
+    path: Path | str
+    max_batch: int = 256
+    # how long to hold a batch open for more writes; 0 batches only what is
+    # already queued while the previous commit was in flight
+    max_delay: float = 0.0
+    metrics: MetricsRegistry | None = None
+    slow_query_seconds: float | None = None
+    _queue: queue.SimpleQueue[_Job | None] = field(default_factory=queue.SimpleQueue)
+    _thread: threading.Thread | None = None
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def __post_init__(self) -> None:
+        self._batch_size: Histogram | None = None
+        if self.metrics is not None:
+            self._batch_size = self.metrics.histogram(
+                "sqlite_write_batch_size",
+                "Writes committed together in one transaction",
+                buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+            )
+
+    def submit(self, operation: Callable[[Connection], T]) -> Future[T]:
+        self._ensure_running()
+
+        future: Future[T] = Future()
+        self._queue.put(_Job(operation, contextvars.copy_context(), future))
+        return future
+
+    def execute(self, operation: Callable[[Connection], T]) -> T:
+        return self.submit(operation).result()
+
+    def _ensure_running(self) -> None:
+        if self._thread is not None:
+            return
+
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="sqlite-writer", daemon=True
+                )
+                self._thread.start()
+
+    def _collect(self, first: _Job) -> tuple[list[_Job], bool]:
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+
+        while len(batch) < self.max_batch:
+            try:
+                remaining = deadline - time.monotonic()
+                if remaining > 0:
+                    job = self._queue.get(timeout=remaining)
+                else:
+                    job = self._queue.get_nowait()
+            except queue.Empty:
+                break
+
+            if job is None:
+                return batch, True
+            batch.append(job)
+
+        return batch, False
+
+    def _apply(self, connection: Connection, batch: list[_Job]) -> None:
+        results: list[tuple[Any, BaseException | None]] = []
+
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            for job in batch:
+                connection.execute("SAVEPOINT job")
+                try:
+                    value = job.context.run(job.operation, connection)
+                except Exception as e:
+                    connection.execute("ROLLBACK TO job")
+                    results.append((None, e))
+                else:
+                    results.append((value, None))
+                connection.execute("RELEASE job")
+            connection.execute("COMMIT")
+        except Exception as e:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            for job in batch:
+                job.future.set_exception(e)
+            return
+
+        if self._batch_size is not None:
+            self._batch_size.observe(len(batch))
+
+        # only hand out results once they are durable
+        for job, (value, error) in zip(batch, results):
+            if error is None:
+                job.future.set_result(value)
+            else:
+                job.future.set_exception(error)
+
+    def _run(self) -> None:
+        connection = cast(
+            TracingConnection, connect(self.path, factory=TracingConnection)
+        )
+        connection.slow_query_seconds = self.slow_query_seconds
+        connection.isolation_level = None
+        connection.execute("PRAGMA journal_mode=WAL")
+
+        try:
+            stopping = False
+            while not stopping:
+                first = self._queue.get()
+                if first is None:
+                    break
+
+                batch, stopping = self._collect(first)
+                self._apply(connection, batch)
+        finally:
+            connection.close()
+
+    def close(self) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+    async def start(self) -> None:
+        self._ensure_running()
+
+    async def stop(self) -> None:
+        await asyncio.to_thread(self.close)
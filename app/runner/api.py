@@ -1,11 +1,18 @@
+import hmac
 import json
-from typing import Annotated
+from contextlib import asynccontextmanager
+from dataclasses import asdict
+from typing import Annotated, Any, AsyncIterator
 
 import uvicorn
 from fastapi import (
+    APIRouter,
     Depends,
     FastAPI,
+    Header,
     HTTPException,
+    Query,
+    Request,
     Response,
     WebSocket,
     WebSocketDisconnect,
@@ -13,10 +20,15 @@ from fastapi import (
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordRequestForm
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import HTTPConnection
+from starlette.responses import PlainTextResponse
+from starlette.status import WS_1008_POLICY_VIOLATION
 
 from app.core.application_context import IApplicationContext
-from app.core.constants import STATUS_HTTP_MAPPING
+from app.core.constants import STATUS_HTTP_MAPPING, Status
 from app.core.core import Core
+from app.core.identity_map import identity_scope
 from app.core.models import (
     Account,
     Application,
@@ -29,6 +41,7 @@ from app.core.models import (
     JobType,
     Matched,
     Message,
+    MessagePage,
     OrganizationSize,
     Preference,
     Token,
@@ -49,96 +62,83 @@ from app.core.requests import (
     UpdatePreferencesRequest,
     UpdateUserRequest,
 )
-from app.core.responses import CoreResponse, SwipeListResponse
-from app.core.services.account import AccountService
-from app.core.services.application import ApplicationService
-from app.core.services.chat import ChatService
-from app.core.services.company import CompanyService
-from app.core.services.match import MatchService
-from app.core.services.user import UserService
-from app.infra.application_context import (
-    InMemoryApplicationContext,
-    InMemoryOauthApplicationContext,
+from app.core.responses import (
+    BulkApplicationsResponse,
+    CoreResponse,
+    SwipeListResponse,
 )
-from app.infra.auth_utils import oauth2_scheme, pwd_context
-from app.infra.db_setup import ConnectionProvider
-from app.infra.repository.account import SqliteAccountRepository
-from app.infra.repository.application import SqliteApplicationRepository
-from app.infra.repository.chat import SqliteChatRepository
-from app.infra.repository.company import SqliteCompanyRepository
-from app.infra.repository.match import SqliteMatchRepository
-from app.infra.repository.user import SqliteUserRepository
-
-app = FastAPI()
-
-
-origins = [
-    "http://localhost",
-    "http://localhost:8080",
-    "http://localhost:19006",
-]
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=origins,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+from app.infra.application_import import ApplicationImport, read_lines
+from app.infra.auth_utils import oauth2_scheme
+from app.infra.profiling import ProfileStore
+from app.runner.connections import ClientConnection, notification_payload
+from app.runner.container import Container
+from app.runner.middleware import (
+    IdentityMapMiddleware,
+    MetricsMiddleware,
+    ProfilingMiddleware,
+    QueryLogMiddleware,
+    TracingMiddleware,
 )
+from app.runner.settings import Settings
 
+router = APIRouter()
 
-if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
 
-match_repository = SqliteMatchRepository(connection=ConnectionProvider.get_connection())
-user_repository = SqliteUserRepository(connection=ConnectionProvider.get_connection())
-application_repository = SqliteApplicationRepository(
-    connection=ConnectionProvider.get_connection()
-)
-company_repository = SqliteCompanyRepository(
-    application_repository=application_repository,
-    connection=ConnectionProvider.get_connection(),
-)
-account_repository = SqliteAccountRepository(
-    company_repository=company_repository,
-    connection=ConnectionProvider.get_connection(),
-)
-chat_repository = SqliteChatRepository(connection=ConnectionProvider.get_connection())
+def create_app(settings: Settings) -> FastAPI:
+    @asynccontextmanager
+    async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+        container = Container.build(settings)
+        app.state.container = container
 
-in_memory_application_context = InMemoryApplicationContext(
-    account_repository=account_repository, hash_verifier=pwd_context.verify
-)
-in_memory_oauth_application_context = InMemoryOauthApplicationContext(
-    account_repository=account_repository, hash_verifier=pwd_context.verify
-)
-
-chat_service = ChatService(
-    user_repository=user_repository, chat_repository=chat_repository
-)
+        await container.start()
+        try:
+            yield
+        finally:
+            await container.stop()
 
+    app = FastAPI(lifespan=lifespan)
 
-def get_application_context() -> IApplicationContext:
-    return in_memory_oauth_application_context
-
-
-def get_core() -> Core:
-    return Core(
-        account_service=AccountService(
-            account_repository=account_repository,
-            hash_function=pwd_context.hash,
-        ),
-        application_service=ApplicationService(
-            application_repository=application_repository,
-        ),
-        user_service=UserService(
-            user_repository=user_repository,
-        ),
-        company_service=CompanyService(
-            company_repository=company_repository, account_repository=account_repository
-        ),
-        match_service=MatchService(match_repository=match_repository),
-        chat_service=chat_service,
+    app.add_middleware(IdentityMapMiddleware)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=settings.origins,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
     )
+    if settings.debug or settings.query_budget is not None:
+        app.add_middleware(
+            QueryLogMiddleware, debug=settings.debug, budget=settings.query_budget
+        )
+    if settings.profiling_enabled:
+        app.add_middleware(
+            ProfilingMiddleware,
+            token=settings.debug_token,
+            sample_rate=settings.profile_sample_rate,
+            interval=settings.profile_interval,
+        )
+    if settings.tracing:
+        app.add_middleware(TracingMiddleware)
+    # added last so it wraps everything else, CORS included
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(router)
+
+    return app
+
+
+def get_container(connection: HTTPConnection) -> Container:
+    container: Container = connection.app.state.container
+    return container
+
+
+def get_application_context(
+    container: Container = Depends(get_container),
+) -> IApplicationContext:
+    return container.application_context
+
+
+def get_core(container: Container = Depends(get_container)) -> Core:
+    return container.core
 
 
 def handle_response_status_code(
@@ -152,16 +152,75 @@ def handle_response_status_code(
         )
 
 
-@app.get("/users/me")
-async def read_users_me(
+@router.get("/metrics", include_in_schema=False)
+def metrics(container: Container = Depends(get_container)) -> PlainTextResponse:
+    return PlainTextResponse(
+        container.metrics.render(), media_type="text/plain; version=0.0.4"
+    )
+
+
+def get_debug_container(
+    x_debug_token: Annotated[str | None, Header()] = None,
+    container: Container = Depends(get_container),
+) -> Container:
+    token = container.settings.debug_token
+    if token is None:
+        raise HTTPException(status_code=404)
+    if x_debug_token is None or not hmac.compare_digest(x_debug_token, token):
+        raise HTTPException(status_code=401)
+
+    return container
+
+
+def get_profile_store(
+    container: Container = Depends(get_debug_container),
+) -> ProfileStore:
+    if container.profiles is None:
+        raise HTTPException(status_code=404)
+
+    return container.profiles
+
+
+@router.get("/debug/spans", include_in_schema=False)
+def list_spans(
+    trace_id: str | None = None,
+    limit: int = 200,
+    container: Container = Depends(get_debug_container),
+) -> list[dict[str, Any]]:
+    if container.spans is None:
+        raise HTTPException(status_code=404)
+
+    return [asdict(span) for span in container.spans.find(trace_id, limit)]
+
+
+@router.get("/debug/profiles", include_in_schema=False)
+def list_profiles(store: ProfileStore = Depends(get_profile_store)) -> list[str]:
+    return store.list()
+
+
+@router.get("/debug/profiles/{name}", include_in_schema=False)
+def download_profile(
+    name: str, store: ProfileStore = Depends(get_profile_store)
+) -> PlainTextResponse:
+    profile = store.read(name)
+    if profile is None:
+        raise HTTPException(status_code=404)
+
+    return PlainTextResponse(
+        profile, headers={"Content-Disposition": f'attachment; filename="{name}"'}
+    )
+
+
+@router.get("/users/me")
+def read_users_me(
     token: Annotated[str, Depends(oauth2_scheme)],
     application_context: IApplicationContext = Depends(get_application_context),
 ) -> Account:
     return application_context.get_current_user(token)
 
 
-@app.post("/token", response_model=Token)
-async def login_for_access_token(
+@router.post("/token", response_model=Token)
+def login_for_access_token(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
     application_context: IApplicationContext = Depends(get_application_context),
 ) -> BaseModel:
@@ -172,7 +231,7 @@ async def login_for_access_token(
 
 
 # TODO document response codes for other api methods
-@app.post(
+@router.post(
     "/register",
     responses={
         201: {},
@@ -197,7 +256,7 @@ def register(
     return account_response.response_content
 
 
-# @app.post("/logout")
+# @router.post("/logout")
 # def logout(response: Response, token: str, core: Core =
 # Depends(get_core)) -> BaseModel:
 #     logout_response = core.logout(LogoutRequest(token))
@@ -206,7 +265,7 @@ def register(
 
 
 # TODO: need to change url
-@app.get("/user/{username}", response_model=User)
+@router.get("/user/{username}", response_model=User)
 def get_user(
     response: Response,
     username: str,
@@ -218,8 +277,8 @@ def get_user(
     return get_user_response.response_content
 
 
-@app.put("/user/update", response_model=User)
-async def update_user(
+@router.put("/user/update", response_model=User)
+def update_user(
     response: Response,
     update_user_request: UpdateUserRequest,
     token: Annotated[str, Depends(oauth2_scheme)],
@@ -246,8 +305,8 @@ async def update_user(
     return setup_user_response.response_content
 
 
-@app.put("/preferences/update", response_model=User)
-async def update_preferences(
+@router.put("/preferences/update", response_model=User)
+def update_preferences(
     response: Response,
     update_preferences_request: UpdatePreferencesRequest,
     token: Annotated[str, Depends(oauth2_scheme)],
@@ -263,8 +322,8 @@ async def update_preferences(
     return update_preferences_response.response_content
 
 
-@app.post("/application", response_model=ApplicationId)
-async def create_application(
+@router.post("/application", response_model=ApplicationId)
+def create_application(
     response: Response,
     request: CreateApplicationRequest,
     token: Annotated[str, Depends(oauth2_scheme)],
@@ -285,8 +344,8 @@ async def create_application(
     return create_application_response.response_content
 
 
-@app.get("/application/{application_id}", response_model=Application)
-async def get_application(
+@router.get("/application/{application_id}", response_model=Application)
+def get_application(
     response: Response,
     application_id: int,
     token: Annotated[str, Depends(oauth2_scheme)],
@@ -306,8 +365,8 @@ async def get_application(
     return get_application_response.response_content
 
 
-@app.put("/application/{application_id}/update")
-async def update_application(
+@router.put("/application/{application_id}/update")
+def update_application(
     response: Response,
     application_id: int,
     request: UpdateApplicationRequest,
@@ -328,8 +387,8 @@ async def update_application(
     return update_application_response.response_content
 
 
-@app.put("/application/{application_id}/interaction")
-async def application_interaction(
+@router.put("/application/{application_id}/interaction")
+def application_interaction(
     response: Response,
     application_id: int,
     token: Annotated[str, Depends(oauth2_scheme)],
@@ -349,7 +408,7 @@ async def application_interaction(
     return application_interaction_response.response_content
 
 
-@app.get("/company/{company_id}/application")
+@router.get("/company/{company_id}/application")
 def get_company_applications(
     response: Response, company_id: int, core: Core = Depends(get_core)
 ) -> BaseModel:
@@ -359,8 +418,53 @@ def get_company_applications(
     return applications_response.response_content
 
 
-@app.delete("/application/{application_id}")
-async def delete_application(
+@router.post(
+    "/company/{company_id}/applications/bulk", response_model=BulkApplicationsResponse
+)
+async def import_applications(
+    request: Request,
+    response: Response,
+    company_id: int,
+    token: Annotated[str, Depends(oauth2_scheme)],
+    container: Container = Depends(get_container),
+    application_context: IApplicationContext = Depends(get_application_context),
+) -> BaseModel:
+    """
+    - Creates applications from a JSONL body, one application per line
+    - Validates rows as they stream in and inserts them in chunks
+    - Returns the ids created and the lines that failed, with why
+    - Fails without reading the body for a company the account does not own
+    - Should the company be deleted midway, returns what was created before,
+      with every row from then on failed
+    """
+    account = await run_in_threadpool(application_context.get_current_user, token)
+    importer = ApplicationImport(
+        core=container.core,
+        account=account,
+        company_id=company_id,
+        chunk_size=container.settings.import_chunk_size,
+    )
+    handle_response_status_code(response, await run_in_threadpool(importer.check))
+
+    # validating rows is CPU-bound, so lines are only collected on the loop and
+    # handed to the threadpool a chunk at a time
+    line = 0
+    lines: list[tuple[int, bytes | None]] = []
+    async for text in read_lines(request.stream()):
+        line += 1
+        lines.append((line, text))
+        if len(lines) >= importer.chunk_size:
+            await run_in_threadpool(importer.add_all, lines)
+            lines = []
+
+    await run_in_threadpool(importer.add_all, lines)
+    await run_in_threadpool(importer.flush)
+
+    return importer.result
+
+
+@router.delete("/application/{application_id}")
+def delete_application(
     response: Response,
     application_id: int,
     token: Annotated[str, Depends(oauth2_scheme)],
@@ -379,37 +483,37 @@ async def delete_application(
     return delete_application_response.response_content
 
 
-@app.get("/industry", responses={200: {}})
+@router.get("/industry", responses={200: {}})
 def get_industries() -> list[str]:
     return [e for e in Industry]
 
 
-@app.get("/job_location", responses={200: {}})
+@router.get("/job_location", responses={200: {}})
 def get_job_locations() -> list[str]:
     return [j for j in JobLocation]
 
 
-@app.get("/job_type", responses={200: {}})
+@router.get("/job_type", responses={200: {}})
 def get_job_types() -> list[str]:
     return [j for j in JobType]
 
 
-@app.get("/experience_level", responses={200: {}})
+@router.get("/experience_level", responses={200: {}})
 def get_experience_level() -> list[str]:
     return [e for e in ExperienceLevel]
 
 
-@app.get("/organization-size", responses={200: {}})
+@router.get("/organization-size", responses={200: {}})
 def get_organization_sizes() -> list[str]:
     return [e for e in OrganizationSize]
 
 
-@app.get("/experience-level", responses={200: {}})
+@router.get("/experience-level", responses={200: {}})
 def get_experience_levels() -> list[str]:
     return [e for e in ExperienceLevel]
 
 
-@app.post(
+@router.post(
     "/company",
     responses={
         200: {},
@@ -443,7 +547,7 @@ def create_company(
     return company_response.response_content
 
 
-@app.get(
+@router.get(
     "/company/{company_id}",
     responses={
         200: {},
@@ -462,7 +566,7 @@ def get_company(
     return company_response.response_content
 
 
-@app.put(
+@router.put(
     "/company/{company_id}",
     responses={
         200: {},
@@ -496,7 +600,7 @@ def update_company(
     return company_response.response_content
 
 
-@app.delete(
+@router.delete(
     "/company/{company_id}",
     responses={200: {}, 404: {}, 500: {}},
 )
@@ -512,7 +616,7 @@ def delete_company(
     handle_response_status_code(response, delete_response)
 
 
-@app.get(
+@router.get(
     "/swipe/list/users", responses={200: {}, 404: {}}, response_model=SwipeListResponse
 )
 def swipe_list_users(
@@ -531,7 +635,7 @@ def swipe_list_users(
     return swipe_response.response_content
 
 
-@app.get(
+@router.get(
     "/swipe/list/applications",
     responses={200: {}, 404: {}},
     response_model=SwipeListResponse,
@@ -549,7 +653,7 @@ def swipe_list_applications(
     return swipe_response.response_content
 
 
-@app.put("/swipe/application", response_model=Matched)
+@router.put("/swipe/application", response_model=Matched)
 def swipe_application(
     response: Response,
     request: SwipeApplicationRequest,
@@ -567,7 +671,7 @@ def swipe_application(
     return swipe_response.response_content
 
 
-@app.put("/swipe/user", response_model=Matched)
+@router.put("/swipe/user", response_model=Matched)
 def swipe_user(
     response: Response,
     request: SwipeUserRequest,
@@ -585,7 +689,7 @@ def swipe_user(
     return swipe_response.response_content
 
 
-@app.get(
+@router.get(
     "/chat/{recipient_username}",
     responses={200: {}, 404: {}, 500: {}},
     response_model=Chat,
@@ -597,6 +701,10 @@ def get_messages(
     application_context: IApplicationContext = Depends(get_application_context),
     core: Core = Depends(get_core),
 ) -> BaseModel:
+    """
+    - Returns the chat with its newest messages only once older ones have been
+      archived; older_before is then set, see /chat/{recipient_username}/messages
+    """
     account = application_context.get_current_user(token)
 
     get_messages_response = core.get_messages(
@@ -606,48 +714,222 @@ def get_messages(
     return get_messages_response.response_content
 
 
-@app.get("/chats", responses={200: {}, 404: {}, 500: {}}, response_model=UserChats)
+@router.get(
+    "/chat/{recipient_username}/messages",
+    responses={200: {}, 404: {}, 500: {}},
+    response_model=MessagePage,
+)
+def get_message_history(
+    response: Response,
+    recipient_username: str,
+    token: Annotated[str, Depends(oauth2_scheme)],
+    before: int | None = None,
+    limit: int = Query(default=50, ge=1, le=200),
+    application_context: IApplicationContext = Depends(get_application_context),
+    core: Core = Depends(get_core),
+) -> BaseModel:
+    """
+    - Pages backwards through a chat, newest messages first, reading archived
+      history as needed
+    - Pass the returned next_before as before to get the previous page
+    """
+    account = application_context.get_current_user(token)
+
+    history_response = core.get_message_history(
+        account=account,
+        recipient_username=recipient_username,
+        before=before,
+        limit=limit,
+    )
+    handle_response_status_code(response, history_response)
+    return history_response.response_content
+
+
+@router.get("/chats", responses={200: {}, 404: {}, 500: {}}, response_model=UserChats)
 def get_user_chats(
     response: Response,
     token: Annotated[str, Depends(oauth2_scheme)],
     application_context: IApplicationContext = Depends(get_application_context),
     core: Core = Depends(get_core),
 ) -> BaseModel:
+    """
+    - Returns every chat of the user, like /chat/{recipient_username} each with
+      only its newest messages and older_before set when there are older ones
+    """
     account = application_context.get_current_user(token)
     user_chats_response = core.get_user_chats(account=account)
     handle_response_status_code(response, user_chats_response)
     return user_chats_response.response_content
 
 
-class UserConnectionManager:
-    def __init__(self) -> None:
-        self.active_connections: dict[str, WebSocket] = {}
+def message_payload(message: Message) -> dict[str, Any]:
+    return {
+        "id": message.message_id,
+        "user": message.sender_username,
+        "time": message.time,
+        "text": message.text,
+    }
+
+
+def websocket_token(websocket: WebSocket) -> str | None:
+    token = websocket.query_params.get("token")
+    if token:
+        return token
+
+    scheme, _, credentials = websocket.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and credentials:
+        return credentials
+
+    return None
+
+
+async def authenticate_websocket(
+    websocket: WebSocket, application_context: IApplicationContext, username: str
+) -> bool:
+    token = websocket_token(websocket)
+    if token is None:
+        return False
 
-    async def connect(self, username: str, websocket: WebSocket) -> None:
-        await websocket.accept()
-        if not self.active_connections.keys().__contains__(username):
-            self.active_connections[username] = websocket
+    try:
+        account = await run_in_threadpool(application_context.get_current_user, token)
+    except HTTPException:
+        return False
+
+    return account.username == username
 
-    def disconnect(self, username: str) -> None:
-        self.active_connections.pop(username)
 
-    async def send_personal_message(self, username: str, message: dict) -> None:
-        if username in self.active_connections:
-            websocket = self.active_connections[username]
-            await websocket.send_json(message)
+def ack_id(message_data: dict[str, Any], key: str, sent: int) -> int | None:
+    """The id acknowledged, or None unless it is one sent to this connection."""
+    try:
+        acked = int(message_data[key])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+    return acked if 0 < acked <= sent else None
 
 
-manager = UserConnectionManager()
+@router.websocket("/register/ws/{username}")
+async def websocket_endpoint(
+    websocket: WebSocket, container: Container = Depends(get_container)
+) -> None:
+    """
+    Only opens for `username` itself: the client passes its access token as
+    ?token=... or in an "Authorization: Bearer ..." header.
+
+    Chat messages come with an id, which the client acknowledges with
+    {"type": "ack", "message_id": id} once it has them. Everything not
+    acknowledged yet is pushed again on the next connect, oldest first and in
+    {"type": "messages", "messages": [...]} batches, so clients have to
+    tolerate seeing a message twice.
+
+    Notifications, e.g. {"type": "match", "notification_id": id, "data": {...}},
+    work the same way: acknowledged with {"type": "ack", "notification_id": id}
+    and pushed again in {"type": "notifications", ...} batches until they are.
+    Acks for ids this connection was never sent are answered with an error.
+    """
+    manager = container.connection_manager
+    chat_service = container.core.chat_service
+    notification_service = container.core.notification_service
+    batch_size = container.settings.offline_batch_size
+    username: str = websocket.path_params["username"]
+
+    if not await authenticate_websocket(
+        websocket, container.application_context, username
+    ):
+        await websocket.close(code=WS_1008_POLICY_VIOLATION)
+        return
+
+    connection: ClientConnection = await manager.connect(username, websocket)
+
+    async def flush() -> int | None:
+        """Sends a batch of the backlog; returns its last id if more may follow."""
+        _, messages = await run_in_threadpool(
+            chat_service.get_undelivered, username, batch_size
+        )
+        if messages:
+            manager.send(
+                connection,
+                {
+                    "type": "messages",
+                    "messages": [message_payload(message) for message in messages],
+                },
+            )
+
+        return messages[-1].message_id if len(messages) == batch_size else None
+
+    async def flush_notifications() -> int | None:
+        _, notifications = await run_in_threadpool(
+            notification_service.get_notifications, username, batch_size
+        )
+        if notifications:
+            manager.send(
+                connection,
+                {
+                    "type": "notifications",
+                    "notifications": [
+                        notification_payload(notification)
+                        for notification in notifications
+                    ],
+                },
+            )
 
+        return notifications[-1].id if len(notifications) == batch_size else None
 
-@app.websocket("/register/ws/{username}")
-async def websocket_endpoint(websocket: WebSocket):
-    username = websocket.path_params.get("username")
-    await manager.connect(username, websocket)
     try:
+        backlog = await flush()
+        notification_backlog = await flush_notifications()
         while True:
             data = await websocket.receive_text()
-            message_data = json.loads(data)
+            connection.touch()
+            try:
+                parsed = json.loads(data)
+            except ValueError:
+                parsed = None
+            if not isinstance(parsed, dict):
+                manager.send(connection, {"error": "expected a JSON object"})
+                continue
+
+            message_data: Any = parsed
+
+            if message_data.get("type") == "pong":
+                continue
+
+            if message_data.get("type") == "ack" and "notification_id" in message_data:
+                acked = ack_id(
+                    message_data, "notification_id", connection.sent_notification_id
+                )
+                if acked is None:
+                    manager.send(connection, {"error": "invalid ack"})
+                    continue
+
+                notification_id = acked
+                if notification_backlog is not None:
+                    notification_id = min(notification_id, notification_backlog)
+
+                await run_in_threadpool(
+                    notification_service.acknowledge, username, notification_id
+                )
+                if notification_id == notification_backlog:
+                    notification_backlog = await flush_notifications()
+                continue
+
+            if message_data.get("type") == "ack":
+                acked = ack_id(message_data, "message_id", connection.sent_message_id)
+                if acked is None:
+                    manager.send(connection, {"error": "invalid ack"})
+                    continue
+
+                message_id = acked
+                if backlog is not None:
+                    # a live message can overtake the backlog, whose rest the
+                    # cursor must not skip; it is simply pushed again later
+                    message_id = min(message_id, backlog)
+
+                await run_in_threadpool(chat_service.acknowledge, username, message_id)
+                if message_id == backlog:
+                    backlog = await flush()
+                continue
+
             user = message_data.get("user")
             time = message_data.get("time")
             text = message_data.get("text")
@@ -658,19 +940,30 @@ async def websocket_endpoint(websocket: WebSocket):
                 text=text,
             )
 
-            if chat_service.send_message(message=message):
+            def send() -> tuple[Status, Message | None]:
+                with identity_scope():
+                    return chat_service.send_message(message=message)
+
+            # storing the message waits on the database, keep that off the loop
+            status, stored = await run_in_threadpool(send)
+
+            if status == Status.OK and stored is not None:
                 await manager.send_personal_message(
-                    username=user,
-                    message={
-                        "user": websocket.base_url.username,
-                        "time": time,
-                        "text": text,
-                    },
+                    username=user, message=message_payload(stored)
                 )
 
             else:
-                await websocket.send_json({"error": "error sending message"})
+                manager.send(connection, {"error": "error sending message"})
     except WebSocketDisconnect:
-        manager.disconnect(username)
+        pass
+    finally:
+        manager.disconnect(connection)
         # message = {"time": current_time, "clientId": client_id, "message": "Offline"}
         # await manager.broadcast(json.dumps(message))
+
+
+app = create_app(Settings.from_env())
+
+
+if __name__ == "__main__":
+    uvicorn.run(app, host="0.0.0.0", port=8000)
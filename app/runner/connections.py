@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+from fastapi import WebSocket, WebSocketDisconnect, status
+
+from app.core.models import Notification
+from app.infra.metrics import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+PING: dict[str, Any] = {"type": "ping"}
+
+
+def notification_payload(notification: Notification) -> dict[str, Any]:
+    return {
+        "type": notification.kind,
+        "notification_id": notification.id,
+        "data": notification.data,
+    }
+
+
+@dataclass(eq=False)
+class ClientConnection:
+    username: str
+    websocket: WebSocket
+    queue: asyncio.Queue[dict[str, Any]]
+    last_seen: float = field(default_factory=time.monotonic)
+    writer: asyncio.Task[None] | None = None
+    # the newest ids queued to this connection, which acks may not go past
+    sent_message_id: int = 0
+    sent_notification_id: int = 0
+
+    def touch(self) -> None:
+        self.last_seen = time.monotonic()
+
+    def track(self, message: dict[str, Any]) -> None:
+        kind = message.get("type")
+        if kind == "messages":
+            for item in message["messages"]:
+                self.sent_message_id = max(self.sent_message_id, item["id"])
+        elif kind == "notifications":
+            for item in message["notifications"]:
+                self.sent_notification_id = max(
+                    self.sent_notification_id, item["notification_id"]
+                )
+        elif "notification_id" in message:
+            self.sent_notification_id = max(
+                self.sent_notification_id, message["notification_id"]
+            )
+        elif "id" in message:
+            # a live chat message
+            self.sent_message_id = max(self.sent_message_id, message["id"])
+
+
+class UserConnectionManager:
+    """
+    Every open chat WebSocket, any number per user. Nothing is sent inline:
+    each connection has a bounded queue drained by a writer task of its own, so
+    a slow client only ever holds up itself. A client whose queue fills up, or
+    that takes longer than send_timeout to accept a message, is disconnected;
+    it can catch up on the missed messages from the chat history.
+
+    Clients are pinged with {"type": "ping"} every ping_interval and
+    disconnected once nothing (a pong or anything else) has come from them for
+    idle_timeout, which also clears out sockets that died without a close.
+    """
+
+    def __init__(
+        self,
+        queue_size: int = 64,
+        send_timeout: float = 5.0,
+        ping_interval: float = 20.0,
+        idle_timeout: float = 90.0,
+        metrics: MetricsRegistry | None = None,
+    ) -> None:
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self.ping_interval = ping_interval
+        self.idle_timeout = idle_timeout
+        self.active_connections: dict[str, set[ClientConnection]] = {}
+        self._closing: set[asyncio.Task[None]] = set()
+        self._heartbeat: asyncio.Task[None] | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+        metrics = metrics or MetricsRegistry()
+        self.connected = metrics.gauge("ws_connections", "Open chat WebSockets")
+        self.evicted = metrics.counter(
+            "ws_evictions_total",
+            "Chat WebSockets closed by the server",
+            labels=("reason",),
+        )
+
+    async def connect(self, username: str, websocket: WebSocket) -> ClientConnection:
+        await websocket.accept()
+
+        connection = ClientConnection(
+            username=username,
+            websocket=websocket,
+            queue=asyncio.Queue(maxsize=self.queue_size),
+        )
+        connection.writer = asyncio.create_task(self._write(connection))
+        self.active_connections.setdefault(username, set()).add(connection)
+        self.connected.inc()
+
+        return connection
+
+    def disconnect(self, connection: ClientConnection) -> None:
+        connections = self.active_connections.get(connection.username)
+        if connections is None or connection not in connections:
+            return
+
+        connections.discard(connection)
+        if not connections:
+            del self.active_connections[connection.username]
+        self.connected.dec()
+
+        writer = connection.writer
+        if writer is not None and writer is not asyncio.current_task():
+            writer.cancel()
+
+    def _evict(self, connection: ClientConnection, reason: str, code: int) -> None:
+        self.disconnect(connection)
+        self.evicted.inc(reason=reason)
+
+        task = asyncio.create_task(self._close(connection.websocket, code))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def _close(self, websocket: WebSocket, code: int) -> None:
+        try:
+            await asyncio.wait_for(websocket.close(code=code), self.send_timeout)
+        except (RuntimeError, OSError, asyncio.TimeoutError):
+            # the client went away before we got to it
+            pass
+
+    def _offer(self, connection: ClientConnection, message: dict[str, Any]) -> bool:
+        try:
+            connection.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self._evict(connection, "slow", status.WS_1013_TRY_AGAIN_LATER)
+            return False
+
+        connection.track(message)
+        return True
+
+    async def _write(self, connection: ClientConnection) -> None:
+        while True:
+            message = await connection.queue.get()
+            try:
+                # unlike wait_for, timeout() never swallows a cancellation that
+                # arrives as the send completes, which would leave this running
+                async with asyncio.timeout(self.send_timeout):
+                    await connection.websocket.send_json(message)
+            except TimeoutError:
+                self._evict(connection, "slow", status.WS_1013_TRY_AGAIN_LATER)
+                return
+            except (RuntimeError, OSError, WebSocketDisconnect):
+                self.disconnect(connection)
+                return
+
+    def send(self, connection: ClientConnection, message: dict[str, Any]) -> bool:
+        """Queues `message` for this one device of its user."""
+        return self._offer(connection, message)
+
+    def _fan_out(self, username: str, message: dict[str, Any]) -> int:
+        delivered = 0
+        for connection in list(self.active_connections.get(username, ())):
+            delivered += self._offer(connection, message)
+
+        return delivered
+
+    async def send_personal_message(
+        self, username: str, message: dict[str, Any]
+    ) -> int:
+        """Queues `message` for every device of `username`; returns how many."""
+        return self._fan_out(username, message)
+
+    def publish(self, notification: Notification) -> None:
+        """Pushes a stored notification to its user; callable from any thread."""
+        if self._loop is None:
+            return
+
+        self._loop.call_soon_threadsafe(
+            self._fan_out, notification.username, notification_payload(notification)
+        )
+
+    async def _ping(self) -> None:
+        while True:
+            await asyncio.sleep(self.ping_interval)
+
+            now = time.monotonic()
+            for connections in list(self.active_connections.values()):
+                for connection in list(connections):
+                    if now - connection.last_seen > self.idle_timeout:
+                        self._evict(connection, "idle", status.WS_1001_GOING_AWAY)
+                    else:
+                        self._offer(connection, PING)
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._heartbeat = asyncio.create_task(self._ping())
+
+    async def stop(self) -> None:
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            await asyncio.gather(self._heartbeat, return_exceptions=True)
+            self._heartbeat = None
+
+        self._loop = None
+        await self.close_all()
+
+    async def close_all(self, code: int = status.WS_1001_GOING_AWAY) -> None:
+        connections = [
+            connection
+            for connections in self.active_connections.values()
+            for connection in connections
+        ]
+        for connection in connections:
+            self.disconnect(connection)
+
+        await asyncio.gather(
+            *(self._close(connection.websocket, code) for connection in connections),
+            *self._closing,
+            return_exceptions=True,
+        )
@@ -0,0 +1,368 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from sqlite3 import Connection
+from typing import Protocol, cast
+
+from app.core.application_context import IApplicationContext
+from app.core.core import Core
+from app.core.repository.account import IAccountRepository
+from app.core.repository.application import IApplicationRepository
+from app.core.repository.chat import IChatRepository
+from app.core.repository.company import ICompanyRepository
+from app.core.repository.match import IMatchRepository
+from app.core.repository.notification import INotificationRepository
+from app.core.repository.user import IUserRepository
+from app.core.services.account import AccountService
+from app.core.services.application import ApplicationService
+from app.core.services.chat import ChatService
+from app.core.services.company import CompanyService
+from app.core.services.match import MatchService
+from app.core.services.notification import NotificationService
+from app.core.services.user import UserService
+from app.infra.application_context import InMemoryOauthApplicationContext
+from app.infra.archive import MessageArchive, MessageArchiver
+from app.infra.auth_utils import pwd_context
+from app.infra.db_setup import connect
+from app.infra.instrumentation import instrument_core
+from app.infra.loop_monitor import LoopMonitor
+from app.infra.memory_store import MemoryStore
+from app.infra.metrics import HttpMetrics, MetricsFlusher, MetricsRegistry
+from app.infra.outbox import InMemoryOutbox, Outbox, OutboxWorker, SqliteOutbox
+from app.infra.profiling import ProfileStore, profile_core
+from app.infra.query_log import ThreadLocalConnection, TracingConnection
+from app.infra.repository.account import (
+    InMemoryAccountRepository,
+    SqliteAccountRepository,
+)
+from app.infra.repository.application import (
+    InMemoryApplicationRepository,
+    SqliteApplicationRepository,
+)
+from app.infra.repository.chat import (
+    InMemoryChatRepository,
+    SqliteChatRepository,
+)
+from app.infra.repository.company import (
+    InMemoryCompanyRepository,
+    SqliteCompanyRepository,
+)
+from app.infra.repository.match import (
+    InMemoryMatchRepository,
+    SqliteMatchRepository,
+)
+from app.infra.repository.notification import (
+    InMemoryNotificationRepository,
+    SqliteNotificationRepository,
+)
+from app.infra.repository.user import (
+    InMemoryUserRepository,
+    SqliteUserRepository,
+)
+from app.infra.retention import (
+    InMemorySwipeRetention,
+    SqliteSwipeRetention,
+    SwipeCompactor,
+    SwipeRetention,
+)
+from app.infra.swipe_filter import SwipeFilters
+from app.infra.tracing import JsonlExporter, RingBufferExporter, Tracer
+from app.infra.user_ids import UserIds
+from app.infra.writer import SqliteWriter
+from app.runner.connections import UserConnectionManager
+from app.runner.settings import Settings
+
+
+class BackgroundWorker(Protocol):
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+
+@dataclass
+class Container:
+    settings: Settings
+    account_repository: IAccountRepository
+    application_repository: IApplicationRepository
+    chat_repository: IChatRepository
+    company_repository: ICompanyRepository
+    match_repository: IMatchRepository
+    notification_repository: INotificationRepository
+    user_repository: IUserRepository
+    core: Core
+    application_context: IApplicationContext
+    metrics: MetricsRegistry
+    http_metrics: HttpMetrics
+    profiles: ProfileStore | None = None
+    tracer: Tracer | None = None
+    spans: RingBufferExporter | None = None
+    # only one storage backend is set up: SQLite read connections (one per
+    # thread) and its writer, or an in-memory store
+    connection: Connection | None = None
+    writer: SqliteWriter | None = None
+    store: MemoryStore | None = None
+    archive: MessageArchive | None = None
+    outbox: Outbox | None = None
+    connection_manager: UserConnectionManager = field(
+        default_factory=UserConnectionManager
+    )
+    workers: list[BackgroundWorker] = field(default_factory=list)
+
+    @classmethod
+    def build(cls, settings: Settings) -> Container:
+        metrics = MetricsRegistry(directory=settings.metrics_dir)
+        workers: list[BackgroundWorker] = [
+            MetricsFlusher(metrics, settings.metrics_flush_interval),
+            LoopMonitor(
+                metrics,
+                interval=settings.loop_monitor_interval,
+                threshold=settings.loop_block_threshold,
+            ),
+        ]
+
+        connection, writer, store, archive = None, None, None, None
+        account_repository: IAccountRepository
+        application_repository: IApplicationRepository
+        chat_repository: IChatRepository
+        company_repository: ICompanyRepository
+        match_repository: IMatchRepository
+        notification_repository: INotificationRepository
+        user_repository: IUserRepository
+        outbox: Outbox
+        swipe_retention: SwipeRetention
+
+        if settings.storage == "memory":
+            store = MemoryStore(
+                settings.memory_dir, snapshot_interval=settings.snapshot_interval
+            )
+            store.open()
+            workers.append(store)
+
+            match_repository = InMemoryMatchRepository(store=store)
+            user_repository = InMemoryUserRepository(store=store)
+            application_repository = InMemoryApplicationRepository(store=store)
+            company_repository = InMemoryCompanyRepository(
+                application_repository=application_repository, store=store
+            )
+            account_repository = InMemoryAccountRepository(
+                company_repository=company_repository, store=store
+            )
+            chat_repository = InMemoryChatRepository(store=store)
+            notification_repository = InMemoryNotificationRepository(store=store)
+            outbox = InMemoryOutbox(store=store)
+            swipe_retention = InMemorySwipeRetention(store=store)
+        else:
+            slow_query_seconds = None
+            if settings.slow_query_ms is not None:
+                slow_query_seconds = settings.slow_query_ms / 1000
+
+            def connect_reader() -> TracingConnection:
+                reader = cast(
+                    TracingConnection,
+                    connect(settings.db_path, factory=TracingConnection),
+                )
+                reader.slow_query_seconds = slow_query_seconds
+                return reader
+
+            # repositories only read through it, so it stands in for a
+            # Connection while handing each thread its own
+            connection = cast(Connection, ThreadLocalConnection(connect_reader))
+
+            writer = SqliteWriter(
+                settings.db_path,
+                max_batch=settings.write_batch_size,
+                max_delay=settings.write_batch_delay,
+                metrics=metrics,
+                slow_query_seconds=slow_query_seconds,
+            )
+            workers.append(writer)
+
+            user_ids = UserIds(connection)
+            swipe_filters = SwipeFilters(connection, metrics)
+            workers.append(swipe_filters)
+            match_repository = SqliteMatchRepository(
+                connection=connection,
+                writer=writer,
+                user_ids=user_ids,
+                filters=swipe_filters,
+            )
+            user_repository = SqliteUserRepository(connection=connection, writer=writer)
+            application_repository = SqliteApplicationRepository(
+                connection=connection, writer=writer
+            )
+            company_repository = SqliteCompanyRepository(
+                application_repository=application_repository,
+                connection=connection,
+                writer=writer,
+            )
+            account_repository = SqliteAccountRepository(
+                company_repository=company_repository,
+                connection=connection,
+                writer=writer,
+            )
+            if settings.archive_path is not None:
+                archive = MessageArchive(settings.archive_path)
+                workers.append(
+                    MessageArchiver(
+                        connection,
+                        writer,
+                        archive,
+                        metrics,
+                        hot_messages=settings.hot_messages,
+                        block_size=settings.archive_block_size,
+                        interval=settings.archive_interval,
+                    )
+                )
+
+            chat_repository = SqliteChatRepository(
+                connection=connection,
+                writer=writer,
+                user_ids=user_ids,
+                archive=archive,
+            )
+            notification_repository = SqliteNotificationRepository(
+                connection=connection, writer=writer
+            )
+            outbox = SqliteOutbox(connection=connection, writer=writer)
+            swipe_retention = SqliteSwipeRetention(connection=connection, writer=writer)
+
+        connection_manager = UserConnectionManager(
+            queue_size=settings.ws_queue_size,
+            send_timeout=settings.ws_send_timeout,
+            ping_interval=settings.ws_ping_interval,
+            idle_timeout=settings.ws_idle_timeout,
+            metrics=metrics,
+        )
+
+        core = Core(
+            account_service=AccountService(
+                account_repository=account_repository,
+                hash_function=pwd_context.hash,
+            ),
+            application_service=ApplicationService(
+                application_repository=application_repository,
+            ),
+            user_service=UserService(
+                user_repository=user_repository,
+            ),
+            company_service=CompanyService(
+                company_repository=company_repository,
+                account_repository=account_repository,
+            ),
+            match_service=MatchService(match_repository=match_repository),
+            chat_service=ChatService(
+                user_repository=user_repository, chat_repository=chat_repository
+            ),
+            notification_service=NotificationService(
+                notification_repository=notification_repository,
+                publisher=connection_manager,
+            ),
+        )
+
+        tracer, spans = None, None
+        if settings.tracing:
+            spans = RingBufferExporter(capacity=settings.trace_buffer_size)
+            tracer = Tracer(exporters=[spans])
+            if settings.trace_file is not None:
+                tracer.exporters.append(JsonlExporter(settings.trace_file))
+
+            for layer in [
+                account_repository,
+                application_repository,
+                chat_repository,
+                company_repository,
+                match_repository,
+                notification_repository,
+                user_repository,
+                core.account_service,
+                core.application_service,
+                core.user_service,
+                core.company_service,
+                core.match_service,
+                core.chat_service,
+                core.notification_service,
+                core,
+            ]:
+                tracer.instrument(layer)
+
+        instrument_core(core, metrics)
+
+        workers.append(
+            SwipeCompactor(
+                swipe_retention,
+                metrics,
+                retention=settings.swipe_retention,
+                batch_size=settings.retention_batch_size,
+                interval=settings.retention_interval,
+            )
+        )
+        workers.append(
+            OutboxWorker(
+                outbox,
+                handlers={"match": lambda payload: core.handle_match(**payload)},
+                metrics=metrics,
+                concurrency=settings.outbox_workers,
+                interval=settings.outbox_interval,
+            )
+        )
+        # last, so its sockets are the first thing closed on shutdown
+        workers.append(connection_manager)
+
+        profiles = None
+        if settings.profiling_enabled:
+            profiles = ProfileStore(settings.profile_dir)
+            profile_core(core)
+
+        return cls(
+            settings=settings,
+            account_repository=account_repository,
+            application_repository=application_repository,
+            chat_repository=chat_repository,
+            company_repository=company_repository,
+            match_repository=match_repository,
+            notification_repository=notification_repository,
+            user_repository=user_repository,
+            core=core,
+            application_context=InMemoryOauthApplicationContext(
+                account_repository=account_repository,
+                hash_verifier=pwd_context.verify,
+            ),
+            metrics=metrics,
+            http_metrics=HttpMetrics.register(metrics),
+            profiles=profiles,
+            tracer=tracer,
+            spans=spans,
+            connection=connection,
+            writer=writer,
+            store=store,
+            archive=archive,
+            outbox=outbox,
+            connection_manager=connection_manager,
+            workers=workers,
+        )
+
+    async def start(self) -> None:
+        for worker in self.workers:
+            await worker.start()
+
+    async def stop(self) -> None:
+        for worker in reversed(self.workers):
+            await worker.stop()
+
+        if self.connection is not None:
+            self.connection.close()
+        if self.archive is not None:
+            self.archive.close()
+
+    def close(self) -> None:
+        """For scripts that build a Container without starting its workers."""
+        if self.writer is not None:
+            self.writer.close()
+        if self.connection is not None:
+            self.connection.close()
+        if self.store is not None:
+            self.store.close()
+        if self.archive is not None:
+            self.archive.close()
@@ -0,0 +1,67 @@
+"""
+Imports applications from JSONL into a company, as its owner.
+
+The same importer serves POST /company/{company_id}/applications/bulk, this
+runs it against the configured storage directly:
+
+    python -m app.runner.import_applications --company-id 3 --owner alice jobs.jsonl
+
+Each line holds one application as accepted by POST /application, company_id
+may be left out. Prints the created ids and the lines that failed as JSON.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+
+from app.core.constants import Status
+from app.core.identity_map import identity_scope
+from app.infra.application_import import ApplicationImport, read_file_lines
+from app.runner.container import Container
+from app.runner.settings import Settings
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "file", type=argparse.FileType("rb"), help="JSONL to import, - for stdin"
+    )
+    parser.add_argument("--company-id", type=int, required=True)
+    parser.add_argument("--owner", required=True, help="username owning the company")
+    args = parser.parse_args(argv)
+
+    settings = Settings.from_env()
+    container = Container.build(settings)
+    try:
+        account = container.account_repository.get_account(args.owner)
+        if account is None:
+            print(f"no account {args.owner}", file=sys.stderr)
+            return 1
+
+        importer = ApplicationImport(
+            core=container.core,
+            account=account,
+            company_id=args.company_id,
+            chunk_size=settings.import_chunk_size,
+        )
+        with identity_scope(), args.file:
+            response = importer.check()
+            if response.status != Status.OK:
+                print(response.status.value, file=sys.stderr)
+                return 1
+
+            # a line is never read past MAX_LINE_LENGTH, however long it is
+            for line, text in enumerate(read_file_lines(args.file), start=1):
+                if importer.add(line, text):
+                    importer.flush()
+            importer.flush()
+    finally:
+        container.close()
+
+    print(importer.result.json())
+    return 1 if importer.result.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+import asyncio
+import hmac
+import logging
+import random
+import re
+import time
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.identity_map import identity_scope
+from app.infra import query_log
+from app.infra.metrics import HttpMetrics
+from app.infra.profiling import ProfileStore, profiled
+from app.infra.tracing import Tracer
+
+logger = logging.getLogger(__name__)
+
+
+def route_label(scope: Scope) -> str:
+    # the route template keeps label cardinality bounded, unlike the raw path
+    route = scope.get("route")
+    return getattr(route, "path", "unmatched")
+
+
+class IdentityMapMiddleware:
+    """Gives every HTTP request its own identity map."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with identity_scope():
+            await self.app(scope, receive, send)
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metrics: HttpMetrics = scope["app"].state.container.http_metrics
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        metrics.in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.in_flight.dec()
+
+            labels = {
+                "method": scope["method"],
+                "route": route_label(scope),
+                "status": str(status),
+            }
+            metrics.duration.observe(elapsed, **labels)
+            metrics.responses.inc(**labels)
+
+
+class QueryLogMiddleware:
+    """
+    Captures the SQL issued while serving each request. In debug mode the count
+    and total time are returned as X-Query-Count/X-Query-Time headers; requests
+    over `budget` queries are logged with their repeated statements.
+    """
+
+    def __init__(
+        self, app: ASGIApp, debug: bool = False, budget: int | None = None
+    ) -> None:
+        self.app = app
+        self.debug = debug
+        self.budget = budget
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with query_log.capture() as log:
+
+            async def send_wrapper(message: Message) -> None:
+                if self.debug and message["type"] == "http.response.start":
+                    headers = MutableHeaders(scope=message)
+                    headers["X-Query-Count"] = str(log.count)
+                    headers["X-Query-Time"] = f"{log.duration * 1000:.3f}ms"
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+        if self.budget is not None and log.count > self.budget:
+            logger.warning(
+                "%s %s exceeded query budget of %d: %s",
+                scope["method"],
+                route_label(scope),
+                self.budget,
+                log.summary(),
+            )
+
+
+class ProfilingMiddleware:
+    """
+    Samples the stacks of requests that either carry "X-Profile: <token>" or are
+    picked at `sample_rate`, and stores them as collapsed stacks (the input
+    format of flamegraph.pl and speedscope). Only installed when profiling is
+    enabled, so it costs nothing otherwise.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        token: str | None = None,
+        sample_rate: float = 0.0,
+        interval: float = 0.005,
+    ) -> None:
+        self.app = app
+        self.token = token
+        self.sample_rate = sample_rate
+        self.interval = interval
+
+    def _wanted(self, scope: Scope) -> bool:
+        if self.token is not None:
+            header = Headers(scope=scope).get("x-profile")
+            if header is not None and hmac.compare_digest(header, self.token):
+                return True
+
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self._wanted(scope):
+            await self.app(scope, receive, send)
+            return
+
+        store: ProfileStore = scope["app"].state.container.profiles
+        label = re.sub(r"[^A-Za-z0-9]+", "_", f"{scope['method']}{scope['path']}")
+
+        with profiled(label.strip("_"), self.interval) as profile:
+
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    headers = MutableHeaders(scope=message)
+                    headers["X-Profile-Id"] = f"{profile.name}.folded"
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+        await asyncio.to_thread(store.save, profile)
+
+
+class TracingMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        tracer: Tracer = scope["app"].state.container.tracer
+
+        with tracer.span(scope["method"], path=scope["path"]) as span:
+
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    span.set(status_code=message["status"])
+                    MutableHeaders(scope=message)["X-Trace-Id"] = span.trace_id
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                span.name = f"{scope['method']} {route_label(scope)}"
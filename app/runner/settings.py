@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import os
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from app.infra.db_setup import DB_PATH
+
+DEFAULT_ORIGINS = [
+    "http://localhost",
+    "http://localhost:8080",
+    "http://localhost:19006",
+]
+
+
+@dataclass
+class Settings:
+    # "sqlite", or "memory" for the indexed in-memory backend, which persists to
+    # memory_dir when one is set
+    storage: str = "sqlite"
+    db_path: Path | str = DB_PATH
+    memory_dir: Path | None = None
+    snapshot_interval: float = 60.0
+    origins: list[str] = field(default_factory=lambda: list(DEFAULT_ORIGINS))
+    # shared by all workers of one deployment so /metrics can aggregate them
+    metrics_dir: Path | None = None
+    metrics_flush_interval: float = 5.0
+    # adds X-Query-Count/X-Query-Time headers to every response
+    debug: bool = False
+    slow_query_ms: float | None = None
+    # requests issuing more queries than this get logged with their statements
+    query_budget: int | None = None
+    # required as X-Debug-Token by the /debug endpoints, which are off without it
+    debug_token: str | None = None
+    # requests carrying "X-Profile: <debug_token>" are profiled, as is a random
+    # profile_sample_rate fraction of all requests
+    profile_sample_rate: float = 0.0
+    profile_interval: float = 0.005
+    profile_dir: Path = Path(tempfile.gettempdir()).joinpath("linkr-profiles")
+    tracing: bool = False
+    trace_file: Path | None = None
+    trace_buffer_size: int = 2000
+    loop_monitor_interval: float = 0.1
+    # loop stalls longer than this are logged with the blocking stack
+    loop_block_threshold: float = 0.1
+    # writes queued while a batch commits go out together in the next one; a
+    # delay holds each batch open a little longer to gather more of them
+    write_batch_size: int = 256
+    write_batch_delay: float = 0.0
+    # with an archive, all but the newest hot_messages of each chat are moved
+    # there every archive_interval seconds, archive_block_size at a time
+    archive_path: Path | None = None
+    hot_messages: int = 200
+    archive_block_size: int = 100
+    archive_interval: float = 300.0
+    # each chat WebSocket buffers up to ws_queue_size messages before the client
+    # is dropped as too slow; clients answer pings with {"type": "pong"} and are
+    # dropped after ws_idle_timeout seconds without any frame from them
+    ws_queue_size: int = 64
+    ws_send_timeout: float = 5.0
+    ws_ping_interval: float = 20.0
+    ws_idle_timeout: float = 90.0
+    # messages received while offline are pushed on connect in batches this
+    # large, each after the client acknowledged the one before
+    offline_batch_size: int = 100
+    # tasks carrying out outbox events such as opening the chat for a match;
+    # idle ones look for new events every outbox_interval seconds
+    outbox_workers: int = 4
+    outbox_interval: float = 0.05
+    # every retention_interval seconds, left swipes older than swipe_retention
+    # seconds and swipes on deleted applications are deleted in batches of
+    # retention_batch_size; no deck reads either, this only bounds the table
+    swipe_retention: float = 90 * 24 * 60 * 60.0
+    retention_batch_size: int = 500
+    retention_interval: float = 3600.0
+    # bulk application imports insert this many rows per transaction
+    import_chunk_size: int = 500
+
+    @property
+    def profiling_enabled(self) -> bool:
+        return self.debug_token is not None or self.profile_sample_rate > 0
+
+    @classmethod
+    def from_env(cls) -> Settings:
+        settings = cls()
+
+        if "LINKR_STORAGE" in os.environ:
+            settings.storage = os.environ["LINKR_STORAGE"]
+        if "LINKR_MEMORY_DIR" in os.environ:
+            settings.memory_dir = Path(os.environ["LINKR_MEMORY_DIR"])
+        if "LINKR_SNAPSHOT_INTERVAL" in os.environ:
+            settings.snapshot_interval = float(os.environ["LINKR_SNAPSHOT_INTERVAL"])
+        if "LINKR_DB_PATH" in os.environ:
+            settings.db_path = os.environ["LINKR_DB_PATH"]
+        if "LINKR_ORIGINS" in os.environ:
+            settings.origins = os.environ["LINKR_ORIGINS"].split(",")
+        if "LINKR_METRICS_DIR" in os.environ:
+            settings.metrics_dir = Path(os.environ["LINKR_METRICS_DIR"])
+        if "LINKR_DEBUG" in os.environ:
+            settings.debug = os.environ["LINKR_DEBUG"].lower() in ("1", "true")
+        if "LINKR_SLOW_QUERY_MS" in os.environ:
+            settings.slow_query_ms = float(os.environ["LINKR_SLOW_QUERY_MS"])
+        if "LINKR_QUERY_BUDGET" in os.environ:
+            settings.query_budget = int(os.environ["LINKR_QUERY_BUDGET"])
+        if "LINKR_DEBUG_TOKEN" in os.environ:
+            settings.debug_token = os.environ["LINKR_DEBUG_TOKEN"]
+        if "LINKR_PROFILE_SAMPLE_RATE" in os.environ:
+            settings.profile_sample_rate = float(
+                os.environ["LINKR_PROFILE_SAMPLE_RATE"]
+            )
+        if "LINKR_PROFILE_DIR" in os.environ:
+            settings.profile_dir = Path(os.environ["LINKR_PROFILE_DIR"])
+        if "LINKR_TRACING" in os.environ:
+            settings.tracing = os.environ["LINKR_TRACING"].lower() in ("1", "true")
+        if "LINKR_TRACE_FILE" in os.environ:
+            settings.tracing = True
+            settings.trace_file = Path(os.environ["LINKR_TRACE_FILE"])
+        if "LINKR_LOOP_BLOCK_THRESHOLD_MS" in os.environ:
+            settings.loop_block_threshold = (
+                float(os.environ["LINKR_LOOP_BLOCK_THRESHOLD_MS"]) / 1000
+            )
+
+        if "LINKR_WRITE_BATCH_SIZE" in os.environ:
+            settings.write_batch_size = int(os.environ["LINKR_WRITE_BATCH_SIZE"])
+        if "LINKR_WRITE_BATCH_DELAY_MS" in os.environ:
+            settings.write_batch_delay = (
+                float(os.environ["LINKR_WRITE_BATCH_DELAY_MS"]) / 1000
+            )
+
+        if "LINKR_ARCHIVE_PATH" in os.environ:
+            settings.archive_path = Path(os.environ["LINKR_ARCHIVE_PATH"])
+        if "LINKR_HOT_MESSAGES" in os.environ:
+            settings.hot_messages = int(os.environ["LINKR_HOT_MESSAGES"])
+
+        if "LINKR_WS_QUEUE_SIZE" in os.environ:
+            settings.ws_queue_size = int(os.environ["LINKR_WS_QUEUE_SIZE"])
+        if "LINKR_WS_PING_INTERVAL" in os.environ:
+            settings.ws_ping_interval = float(os.environ["LINKR_WS_PING_INTERVAL"])
+        if "LINKR_WS_IDLE_TIMEOUT" in os.environ:
+            settings.ws_idle_timeout = float(os.environ["LINKR_WS_IDLE_TIMEOUT"])
+        if "LINKR_OFFLINE_BATCH_SIZE" in os.environ:
+            settings.offline_batch_size = int(os.environ["LINKR_OFFLINE_BATCH_SIZE"])
+
+        if "LINKR_OUTBOX_WORKERS" in os.environ:
+            settings.outbox_workers = int(os.environ["LINKR_OUTBOX_WORKERS"])
+        if "LINKR_OUTBOX_INTERVAL_MS" in os.environ:
+            settings.outbox_interval = (
+                float(os.environ["LINKR_OUTBOX_INTERVAL_MS"]) / 1000
+            )
+
+        if "LINKR_SWIPE_RETENTION_DAYS" in os.environ:
+            settings.swipe_retention = (
+                float(os.environ["LINKR_SWIPE_RETENTION_DAYS"]) * 24 * 60 * 60
+            )
+        if "LINKR_RETENTION_BATCH_SIZE" in os.environ:
+            settings.retention_batch_size = int(
+                os.environ["LINKR_RETENTION_BATCH_SIZE"]
+            )
+        if "LINKR_RETENTION_INTERVAL" in os.environ:
+            settings.retention_interval = float(os.environ["LINKR_RETENTION_INTERVAL"])
+
+        if "LINKR_IMPORT_CHUNK_SIZE" in os.environ:
+            settings.import_chunk_size = int(os.environ["LINKR_IMPORT_CHUNK_SIZE"])
+
+        return settings
@@ -0,0 +1,195 @@
+"""
+Minimal in-process ASGI driver: talks to the application object directly, with
+no sockets and no HTTP client library in between.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Coroutine, MutableMapping
+from urllib.parse import urlencode
+
+Message = MutableMapping[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+ASGIApp = Callable[[MutableMapping[str, Any], Receive, Send], Coroutine[Any, Any, None]]
+
+
+@dataclass
+class Response:
+    status: int
+    headers: list[tuple[bytes, bytes]] = field(default_factory=list)
+    body: bytes = b""
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+    def header(self, name: str) -> str | None:
+        key = name.lower().encode()
+        for header, value in self.headers:
+            if header == key:
+                return value.decode()
+        return None
+
+
+def _scope(
+    type: str, path: str, headers: dict[str, str] | None
+) -> MutableMapping[str, Any]:
+    path, _, query = path.partition("?")
+
+    return {
+        "type": type,
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "scheme": "http" if type == "http" else "ws",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [
+            (key.lower().encode(), value.encode())
+            for key, value in (headers or {}).items()
+        ],
+        "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80),
+    }
+
+
+class WebSocketClosed(Exception):
+    def __init__(self, code: int) -> None:
+        super().__init__(f"websocket closed with code {code}")
+        self.code = code
+
+
+class WebSocketSession:
+    def __init__(
+        self, app: ASGIApp, path: str, headers: dict[str, str] | None = None
+    ) -> None:
+        self.app = app
+        self.scope = _scope("websocket", path, headers)
+        self.to_app: asyncio.Queue[Message] = asyncio.Queue()
+        self.from_app: asyncio.Queue[Message] = asyncio.Queue()
+        self.task: asyncio.Task[None] | None = None
+
+    async def connect(self) -> None:
+        self.task = asyncio.create_task(
+            self.app(self.scope, self.to_app.get, self.from_app.put)
+        )
+        await self.to_app.put({"type": "websocket.connect"})
+
+        message = await self.from_app.get()
+        if message["type"] != "websocket.accept":
+            await self.close()
+            raise WebSocketClosed(message.get("code", 1000))
+
+    async def send_text(self, text: str) -> None:
+        await self.to_app.put({"type": "websocket.receive", "text": text})
+
+    async def send_json(self, data: Any) -> None:
+        await self.send_text(json.dumps(data))
+
+    async def receive_json(self) -> Any:
+        message = await self.from_app.get()
+        if message["type"] == "websocket.close":
+            raise WebSocketClosed(message.get("code", 1000))
+
+        return json.loads(message.get("text") or message.get("bytes") or b"null")
+
+    async def close(self, code: int = 1000) -> None:
+        await self.to_app.put({"type": "websocket.disconnect", "code": code})
+        if self.task is not None:
+            await asyncio.gather(self.task, return_exceptions=True)
+
+        # wake up anyone still waiting on receive_json()
+        await self.from_app.put({"type": "websocket.close", "code": code})
+
+
+class ASGIClient:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    @asynccontextmanager
+    async def websocket(
+        self, path: str, headers: dict[str, str] | None = None
+    ) -> AsyncIterator[WebSocketSession]:
+        session = WebSocketSession(self.app, path, headers)
+        await session.connect()
+        try:
+            yield session
+        finally:
+            await session.close()
+
+    @asynccontextmanager
+    async def lifespan(self) -> AsyncIterator[None]:
+        incoming: asyncio.Queue[Message] = asyncio.Queue()
+        outgoing: asyncio.Queue[Message] = asyncio.Queue()
+
+        task = asyncio.create_task(
+            self.app(
+                {"type": "lifespan", "asgi": {"version": "3.0"}, "state": {}},
+                incoming.get,
+                outgoing.put,
+            )
+        )
+
+        await incoming.put({"type": "lifespan.startup"})
+        message = await outgoing.get()
+        if message["type"] != "lifespan.startup.complete":
+            raise RuntimeError(f"lifespan startup failed: {message}")
+
+        try:
+            yield
+        finally:
+            await incoming.put({"type": "lifespan.shutdown"})
+            await outgoing.get()
+            await task
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        headers: dict[str, str] | None = None,
+        json_body: Any = None,
+        form: dict[str, str] | None = None,
+    ) -> Response:
+        headers = dict(headers or {})
+        body = b""
+
+        if json_body is not None:
+            body = json.dumps(json_body).encode()
+            headers["content-type"] = "application/json"
+        elif form is not None:
+            body = urlencode(form).encode()
+            headers["content-type"] = "application/x-www-form-urlencoded"
+        headers["content-length"] = str(len(body))
+
+        scope = _scope("http", path, headers)
+        scope["method"] = method
+        response = Response(status=500)
+        request_sent = False
+        response_done = asyncio.Event()
+
+        async def receive() -> Message:
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+
+            await response_done.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                response.status = message["status"]
+                response.headers = list(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                response.body += message.get("body", b"")
+                if not message.get("more_body", False):
+                    response_done.set()
+
+        await self.app(scope, receive, send)
+        response_done.set()
+        return response
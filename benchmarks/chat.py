@@ -0,0 +1,276 @@
+"""
+Opens thousands of chat WebSockets against the in-process app and measures
+message delivery latency, memory per connection and event-loop lag.
+
+    python -m benchmarks.chat --connections 1000,2000,5000 --duration 10
+    python -m benchmarks.chat --connections 2000 --save chat.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+from app.core.application_context import IApplicationContext
+from app.core.models import Account
+from app.runner.api import create_app
+from app.runner.container import Container
+from app.runner.settings import Settings
+from benchmarks import report
+from benchmarks.asgi import ASGIClient, WebSocketClosed, WebSocketSession
+from benchmarks.dataset import Dataset, Scale, seed
+
+
+@dataclass
+class Pair:
+    sender: str
+    recipient: str
+
+
+@dataclass
+class ChatRecorder:
+    sent: int = 0
+    delivered: list[int] = field(default_factory=list)
+    errors: int = 0
+    lag: list[int] = field(default_factory=list)
+
+
+def pairs_for(dataset: Dataset, count: int) -> list[Pair]:
+    usernames = dataset.usernames[: count * 2]
+    return [Pair(usernames[i], usernames[i + 1]) for i in range(0, len(usernames), 2)]
+
+
+def create_chats(dataset: Dataset, pairs: list[Pair]) -> None:
+    # go through the repository so the harness follows schema changes
+    container = Container.build(Settings(db_path=dataset.path))
+    try:
+        for pair in pairs:
+            if not container.chat_repository.has_chat(pair.sender, pair.recipient):
+                container.chat_repository.create_chat(pair.sender, pair.recipient)
+    finally:
+        container.close()
+
+
+async def monitor_lag(
+    recorder: ChatRecorder, interval: float, stop: asyncio.Event
+) -> None:
+    while not stop.is_set():
+        expected = time.perf_counter_ns() + int(interval * 1e9)
+        await asyncio.sleep(interval)
+        recorder.lag.append(max(0, time.perf_counter_ns() - expected))
+
+
+async def read(session: WebSocketSession, recorder: ChatRecorder) -> None:
+    while True:
+        try:
+            message = await session.receive_json()
+        except WebSocketClosed:
+            return
+
+        if message.get("type") == "ping":
+            await session.send_json({"type": "pong"})
+        elif "type" in message:
+            # the seeded history pushed on connect, notifications
+            continue
+        elif "error" in message:
+            recorder.errors += 1
+        else:
+            recorder.delivered.append(time.perf_counter_ns() - int(message["time"]))
+
+
+async def write(
+    session: WebSocketSession,
+    pair: Pair,
+    recorder: ChatRecorder,
+    rate: float,
+    deadline: float,
+) -> None:
+    # spread the first messages out so pairs do not fire in lockstep
+    await asyncio.sleep(random.random() / rate)
+
+    while time.perf_counter() < deadline:
+        recorder.sent += 1
+        await session.send_json(
+            {
+                "user": pair.recipient,
+                "time": str(time.perf_counter_ns()),
+                "text": "benchmark",
+            }
+        )
+        await asyncio.sleep(1 / rate)
+
+
+async def connect_all(
+    client: ASGIClient,
+    context: IApplicationContext,
+    usernames: list[str],
+    batch: int,
+) -> list[WebSocketSession]:
+    # sockets only open with their user's token; issuing one needs no password
+    sessions: list[WebSocketSession] = []
+
+    for start in range(0, len(usernames), batch):
+        end = start + batch
+        chunk = [
+            WebSocketSession(
+                client.app,
+                f"/register/ws/{username}?token="
+                + context.create_access_token(Account(username=username, password="")),
+            )
+            for username in usernames[start:end]
+        ]
+        await asyncio.gather(*(session.connect() for session in chunk))
+        sessions.extend(chunk)
+
+    return sessions
+
+
+async def run_level(
+    dataset: Dataset,
+    pairs: list[Pair],
+    rate: float,
+    duration: float,
+    batch: int,
+) -> dict[str, dict[str, Any]]:
+    app = create_app(Settings(db_path=dataset.path))
+    client = ASGIClient(app)
+    recorder = ChatRecorder()
+    usernames = [
+        username for pair in pairs for username in (pair.sender, pair.recipient)
+    ]
+
+    async with client.lifespan():
+        tracemalloc.start()
+        before, _ = tracemalloc.get_traced_memory()
+        started = time.perf_counter()
+        context = app.state.container.application_context
+        sessions = await connect_all(client, context, usernames, batch)
+        connect_s = time.perf_counter() - started
+        after, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        by_username = dict(zip(usernames, sessions))
+        stop = asyncio.Event()
+        monitor = asyncio.create_task(monitor_lag(recorder, 0.01, stop))
+        readers = [asyncio.create_task(read(s, recorder)) for s in sessions]
+
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(
+            *(
+                write(by_username[pair.sender], pair, recorder, rate, deadline)
+                for pair in pairs
+            )
+        )
+        # give in-flight messages a moment to land before tearing down
+        await asyncio.sleep(0.5)
+        stop.set()
+        await monitor
+
+        await asyncio.gather(*(session.close() for session in sessions))
+        await asyncio.gather(*readers)
+
+    delivered = len(recorder.delivered)
+    return {
+        "connections": {
+            "count": len(sessions),
+            "connect_s": connect_s,
+            "kb_per_connection": (after - before) / len(sessions) / 1024,
+            "messages_sent": recorder.sent,
+            "messages_delivered": delivered,
+            "delivery_ratio": delivered / recorder.sent if recorder.sent else 0.0,
+            "errors": recorder.errors,
+            "throughput_msg_s": delivered / duration,
+        },
+        "delivery": asdict(report.Stats.from_samples(recorder.delivered or [0])),
+        "loop_lag": asdict(report.Stats.from_samples(recorder.lag or [0])),
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--connections",
+        default="1000,2000",
+        help="comma separated connection counts to ramp through",
+    )
+    parser.add_argument(
+        "--rate", type=float, default=1.0, help="messages per second per pair"
+    )
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument(
+        "--batch", type=int, default=200, help="connections opened concurrently"
+    )
+    parser.add_argument(
+        "--slo-ms",
+        type=float,
+        default=100.0,
+        help="p99 delivery latency above which a level counts as degraded",
+    )
+    parser.add_argument("--save", type=Path, default=None)
+    parser.add_argument("--compare", type=Path, default=None)
+    parser.add_argument("--metric", default="p99_ms")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    levels = [int(float(level)) for level in args.connections.split(",")]
+    results: dict[str, dict[str, Any]] = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        scale = Scale.for_users(max(levels))
+        dataset = seed(Path(tmp).joinpath("chat.db"), scale)
+        all_pairs = pairs_for(dataset, max(levels) // 2)
+        create_chats(dataset, all_pairs)
+
+        for level in levels:
+            result = asyncio.run(
+                run_level(
+                    dataset,
+                    all_pairs[: level // 2],
+                    args.rate,
+                    args.duration,
+                    args.batch,
+                )
+            )
+            results[str(level)] = result
+
+            degraded = result["delivery"]["p99_ms"] > args.slo_ms
+            print(
+                f"{level} connections: delivery p99 "
+                f"{result['delivery']['p99_ms']:.1f}ms, loop lag p99 "
+                f"{result['loop_lag']['p99_ms']:.1f}ms, "
+                f"{result['connections']['kb_per_connection']:.1f}KiB/connection"
+                + (" (DEGRADED)" if degraded else ""),
+                flush=True,
+            )
+
+    report.print_table(
+        {
+            level: {k: v for k, v in cases.items() if k != "connections"}
+            for level, cases in results.items()
+        },
+        ["p50_ms", "p95_ms", "p99_ms", "max_ms"],
+    )
+
+    if args.save is not None:
+        report.save(args.save, results, rate=args.rate, duration=args.duration)
+
+    if args.compare is not None:
+        regressions = report.compare(
+            report.load(args.compare), results, args.metric, args.threshold
+        )
+        report.print_regressions(regressions)
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
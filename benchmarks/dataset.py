@@ -0,0 +1,296 @@
+from __future__ import annotations
+
+import json
+import random
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from sqlite3 import Connection
+from typing import Iterator
+
+from app.core.models import (
+    ExperienceLevel,
+    Industry,
+    JobLocation,
+    JobType,
+    OrganizationSize,
+    SwipeDirection,
+    SwipeFor,
+)
+from app.infra.auth_utils import pwd_context
+from app.infra.db_setup import connect, create_tables
+
+PASSWORD = "benchmark"
+BATCH_SIZE = 10_000
+DAY = 24 * 60 * 60
+
+
+@dataclass
+class Scale:
+    users: int
+    companies: int
+    applications: int
+    swipes_per_user: int
+    chats: int
+    messages_per_chat: int
+    notifications_per_user: int
+
+    @classmethod
+    def for_users(cls, users: int) -> Scale:
+        return cls(
+            users=users,
+            companies=max(1, users // 50),
+            applications=max(1, users // 5),
+            swipes_per_user=5,
+            chats=max(1, users // 10),
+            messages_per_chat=10,
+            notifications_per_user=3,
+        )
+
+
+@dataclass
+class Dataset:
+    path: Path
+    scale: Scale
+    usernames: list[str] = field(default_factory=list)
+    owners: dict[int, str] = field(default_factory=dict)
+    applications: dict[int, int] = field(default_factory=dict)
+    chats: list[tuple[str, str]] = field(default_factory=list)
+    notifications: list[tuple[str, int]] = field(default_factory=list)
+
+    @property
+    def company_ids(self) -> list[int]:
+        return list(self.owners)
+
+    @property
+    def application_ids(self) -> list[int]:
+        return list(self.applications)
+
+
+def _batched(rows: Iterator[tuple[object, ...]]) -> Iterator[list[tuple[object, ...]]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
+
+
+def _insert(
+    connection: Connection, sql: str, rows: Iterator[tuple[object, ...]]
+) -> None:
+    for batch in _batched(rows):
+        connection.executemany(sql, batch)
+    connection.commit()
+
+
+def _profile_items(rng: random.Random, kind: str) -> str:
+    return json.dumps(
+        [
+            {"name": f"{kind} {i}", "description": f"{kind} description {i}"}
+            for i in range(rng.randint(0, 3))
+        ]
+    )
+
+
+def _preference(rng: random.Random) -> str:
+    return json.dumps(
+        {
+            "industry": [str(Industry.SOFTWARE_ENGINEERING)],
+            "job_type": rng.sample([str(e) for e in JobType], k=rng.randint(1, 2)),
+            "job_location": rng.sample(
+                [str(e) for e in JobLocation], k=rng.randint(1, 3)
+            ),
+            "experience_level": rng.sample(
+                [str(e) for e in ExperienceLevel], k=rng.randint(1, 5)
+            ),
+        }
+    )
+
+
+def seed(path: Path, scale: Scale, seed: int = 0) -> Dataset:
+    """
+    Creates a fresh database at `path` filled with synthetic data. Rows are
+    written straight through SQL so that seeding large scales stays fast.
+    Every account uses PASSWORD as its password.
+    """
+    rng = random.Random(seed)
+    dataset = Dataset(path=path, scale=scale)
+    connection = connect(path)
+    create_tables(connection.cursor(), connection)
+
+    # bcrypt is deliberately slow, hash once and share it between accounts
+    password_hash = pwd_context.hash(PASSWORD)
+    dataset.usernames = [f"user{i}" for i in range(scale.users)]
+
+    _insert(
+        connection,
+        "INSERT INTO account (username, password) VALUES (?, ?)",
+        ((username, password_hash) for username in dataset.usernames),
+    )
+    _insert(
+        connection,
+        "INSERT INTO user (username, image_uri, cover_image_uri, "
+        "education, skills, experience, preference) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (
+            (
+                username,
+                "",
+                "",
+                _profile_items(rng, "education"),
+                _profile_items(rng, "skill"),
+                _profile_items(rng, "experience"),
+                _preference(rng),
+            )
+            for username in dataset.usernames
+        ),
+    )
+
+    user_ids = dict(connection.execute("SELECT username, id FROM user").fetchall())
+
+    dataset.owners = {
+        company_id: dataset.usernames[(company_id - 1) % scale.users]
+        for company_id in range(1, scale.companies + 1)
+    }
+    _insert(
+        connection,
+        "INSERT INTO company (id, company_name, website, industry, "
+        "organization_size, image_uri, cover_image_uri, owner_username) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (
+            (
+                company_id,
+                f"Company {company_id}",
+                f"https://company{company_id}.example",
+                str(Industry.SOFTWARE_ENGINEERING),
+                str(OrganizationSize.SMALL),
+                "",
+                "",
+                owner,
+            )
+            for company_id, owner in dataset.owners.items()
+        ),
+    )
+
+    dataset.applications = {
+        application_id: rng.randint(1, scale.companies)
+        for application_id in range(1, scale.applications + 1)
+    }
+    _insert(
+        connection,
+        "INSERT INTO application (id, title, location, job_type, "
+        "experience_level, description, skills, views, company_id) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (
+            (
+                application_id,
+                f"Position {application_id}",
+                str(rng.choice(list(JobLocation))),
+                str(rng.choice(list(JobType))),
+                str(rng.choice(list(ExperienceLevel))),
+                "Synthetic application used for benchmarking",
+                "python,sql,fastapi",
+                rng.randint(0, 1000),
+                company_id,
+            )
+            for application_id, company_id in dataset.applications.items()
+        ),
+    )
+
+    # swipe ages come from a stream of their own and leave the rest unchanged
+    ages, now = random.Random(seed), time.time()
+
+    def swipes() -> Iterator[tuple[object, ...]]:
+        for username in dataset.usernames:
+            for application_id in rng.sample(
+                range(1, scale.applications + 1),
+                k=min(scale.swipes_per_user, scale.applications),
+            ):
+                direction = rng.choice(list(SwipeDirection))
+                # spread over the last half year, some past the retention window
+                swiped_at = now - ages.uniform(0, 180 * DAY)
+                yield user_ids[username], application_id, str(
+                    SwipeFor.APPLICATION
+                ), str(direction), swiped_at
+                if direction == SwipeDirection.RIGHT and rng.random() < 0.3:
+                    yield user_ids[username], application_id, str(SwipeFor.USER), str(
+                        SwipeDirection.RIGHT
+                    ), swiped_at
+
+    _insert(
+        connection,
+        "INSERT INTO swipe "
+        "(user_id, application_id, swipe_for, direction, swiped_at) "
+        "VALUES (?, ?, ?, ?, ?)",
+        swipes(),
+    )
+
+    owners = sorted(set(dataset.owners.values()))
+    pairs: set[tuple[str, str]] = set()
+    for _ in range(scale.chats * 4):
+        if len(pairs) == scale.chats:
+            break
+
+        username, owner = rng.choice(dataset.usernames), rng.choice(owners)
+        if username != owner:
+            # chats are stored with the participants in id order
+            pairs.add(
+                (username, owner)
+                if user_ids[username] < user_ids[owner]
+                else (owner, username)
+            )
+    dataset.chats = sorted(pairs)
+
+    _insert(
+        connection,
+        "INSERT INTO chat (id, user_id1, user_id2) VALUES (?, ?, ?)",
+        (
+            (chat_id, user_ids[username1], user_ids[username2])
+            for chat_id, (username1, username2) in enumerate(dataset.chats, start=1)
+        ),
+    )
+    _insert(
+        connection,
+        "INSERT INTO message "
+        "(sender_id, recipient_id, time, text, chat_id) "
+        "VALUES (?, ?, ?, ?, ?)",
+        (
+            (
+                *(user_ids[name] for name in (pair if i % 2 == 0 else pair[::-1])),
+                f"2023-05-01T10:{i // 60 % 60:02d}:{i % 60:02d}",
+                f"message {i}",
+                chat_id,
+            )
+            for chat_id, pair in enumerate(dataset.chats, start=1)
+            for i in range(scale.messages_per_chat)
+        ),
+    )
+
+    # unacknowledged, as a user who has been away would find them
+    dataset.notifications = [
+        (username, i)
+        for i, username in enumerate(
+            (
+                username
+                for username in dataset.usernames
+                for _ in range(scale.notifications_per_user)
+            ),
+            start=1,
+        )
+    ]
+    _insert(
+        connection,
+        "INSERT INTO notification (id, username, kind, key, data) "
+        "VALUES (?, ?, ?, ?, ?)",
+        (
+            (id, username, "match", str(id), json.dumps({"chat_id": id}))
+            for username, id in dataset.notifications
+        ),
+    )
+
+    connection.close()
+    return dataset
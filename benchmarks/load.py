@@ -0,0 +1,307 @@
+"""
+Drives a realistic request mix through the whole application in-process.
+
+    python -m benchmarks.load --users 10000 --concurrency 32 --duration 20
+    python -m benchmarks.load --users 10000 --save load.json
+    python -m benchmarks.load --users 10000 --compare load.json --metric p95_ms
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+from app.core.models import SwipeDirection
+from app.runner.api import create_app
+from app.runner.settings import Settings
+from benchmarks import report
+from benchmarks.asgi import ASGIClient, Response
+from benchmarks.dataset import PASSWORD, Dataset, Scale, seed
+
+
+@dataclass
+class Session:
+    username: str
+    token: str
+    recipient: str
+
+    @property
+    def headers(self) -> dict[str, str]:
+        return {"authorization": f"Bearer {self.token}"}
+
+
+@dataclass
+class LoadContext:
+    client: ASGIClient
+    dataset: Dataset
+    sessions: list[Session]
+    rng: random.Random
+
+
+Operation = Callable[[LoadContext, Session], Awaitable[Response]]
+
+
+async def token(context: LoadContext, session: Session) -> Response:
+    return await context.client.request(
+        "POST", "/token", form={"username": session.username, "password": PASSWORD}
+    )
+
+
+async def swipe_list_applications(context: LoadContext, session: Session) -> Response:
+    return await context.client.request(
+        "GET", "/swipe/list/applications?amount=20", headers=session.headers
+    )
+
+
+async def swipe_list_users(context: LoadContext, session: Session) -> Response:
+    application_id = context.rng.choice(context.dataset.application_ids)
+    return await context.client.request(
+        "GET",
+        f"/swipe/list/users?swiper_application_id={application_id}&amount=20",
+        headers=session.headers,
+    )
+
+
+async def swipe_application(context: LoadContext, session: Session) -> Response:
+    return await context.client.request(
+        "PUT",
+        "/swipe/application",
+        headers=session.headers,
+        json_body={
+            "application_id": context.rng.choice(context.dataset.application_ids),
+            "direction": context.rng.choice(list(SwipeDirection)),
+        },
+    )
+
+
+async def swipe_user(context: LoadContext, session: Session) -> Response:
+    return await context.client.request(
+        "PUT",
+        "/swipe/user",
+        headers=session.headers,
+        json_body={
+            "application_id": context.rng.choice(context.dataset.application_ids),
+            "swiped_username": context.rng.choice(context.dataset.usernames),
+            "direction": context.rng.choice(list(SwipeDirection)),
+        },
+    )
+
+
+async def chat(context: LoadContext, session: Session) -> Response:
+    return await context.client.request(
+        "GET", f"/chat/{session.recipient}", headers=session.headers
+    )
+
+
+async def chats(context: LoadContext, session: Session) -> Response:
+    return await context.client.request("GET", "/chats", headers=session.headers)
+
+
+OPERATIONS: dict[str, tuple[str, Operation]] = {
+    "token": ("POST /token", token),
+    "swipe_list_applications": (
+        "GET /swipe/list/applications",
+        swipe_list_applications,
+    ),
+    "swipe_list_users": ("GET /swipe/list/users", swipe_list_users),
+    "swipe_application": ("PUT /swipe/application", swipe_application),
+    "swipe_user": ("PUT /swipe/user", swipe_user),
+    "chat": ("GET /chat/{recipient_username}", chat),
+    "chats": ("GET /chats", chats),
+}
+
+DEFAULT_MIX = {
+    "token": 1,
+    "swipe_list_applications": 20,
+    "swipe_list_users": 10,
+    "swipe_application": 25,
+    "swipe_user": 10,
+    "chat": 14,
+    "chats": 20,
+}
+
+
+@dataclass
+class Recorder:
+    samples: dict[str, list[int]] = field(default_factory=lambda: defaultdict(list))
+    statuses: dict[str, Counter[int]] = field(
+        default_factory=lambda: defaultdict(Counter)
+    )
+
+    def record(self, route: str, elapsed_ns: int, status: int) -> None:
+        self.samples[route].append(elapsed_ns)
+        self.statuses[route][status] += 1
+
+    def results(self, elapsed_s: float) -> dict[str, dict[str, Any]]:
+        results: dict[str, dict[str, Any]] = {}
+        everything: list[int] = []
+
+        for route, samples in self.samples.items():
+            everything.extend(samples)
+            results[route] = {
+                **asdict(report.Stats.from_samples(samples)),
+                "rps": len(samples) / elapsed_s,
+                "errors": sum(
+                    count
+                    for status, count in self.statuses[route].items()
+                    if status >= 500
+                ),
+                "statuses": {str(k): v for k, v in self.statuses[route].items()},
+            }
+
+        if everything:
+            results["ALL"] = {
+                **asdict(report.Stats.from_samples(everything)),
+                "rps": len(everything) / elapsed_s,
+            }
+
+        return results
+
+
+async def login(client: ASGIClient, dataset: Dataset, count: int) -> list[Session]:
+    sessions = []
+
+    for username, recipient in dataset.chats[:count]:
+        response = await client.request(
+            "POST", "/token", form={"username": username, "password": PASSWORD}
+        )
+        if response.status != 200:
+            raise RuntimeError(f"login failed for {username}: {response.body!r}")
+
+        sessions.append(Session(username, response.json()["access_token"], recipient))
+
+    return sessions
+
+
+async def worker(
+    context: LoadContext,
+    mix: dict[str, int],
+    recorder: Recorder,
+    deadline: float,
+    budget: list[int],
+) -> None:
+    names = list(mix)
+    weights = [mix[name] for name in names]
+
+    while time.perf_counter() < deadline and budget[0] > 0:
+        budget[0] -= 1
+        route, operation = OPERATIONS[context.rng.choices(names, weights)[0]]
+        session = context.rng.choice(context.sessions)
+
+        start = time.perf_counter_ns()
+        response = await operation(context, session)
+        recorder.record(route, time.perf_counter_ns() - start, response.status)
+
+
+async def run(
+    dataset: Dataset,
+    concurrency: int,
+    duration: float,
+    requests: int,
+    sessions: int,
+    mix: dict[str, int],
+) -> dict[str, dict[str, Any]]:
+    client = ASGIClient(create_app(Settings(db_path=dataset.path)))
+    recorder = Recorder()
+
+    async with client.lifespan():
+        context = LoadContext(
+            client=client,
+            dataset=dataset,
+            sessions=await login(client, dataset, sessions),
+            rng=random.Random(0),
+        )
+
+        budget = [requests]
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(
+                worker(context, mix, recorder, started + duration, budget)
+                for _ in range(concurrency)
+            )
+        )
+        elapsed = time.perf_counter() - started
+
+    return recorder.results(elapsed)
+
+
+def parse_mix(value: str) -> dict[str, int]:
+    mix = dict(DEFAULT_MIX)
+    for item in filter(None, value.split(",")):
+        name, _, weight = item.partition("=")
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"unknown operation {name!r}")
+        mix[name] = int(weight)
+
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument(
+        "--requests", type=int, default=sys.maxsize, help="stop after this many"
+    )
+    parser.add_argument(
+        "--sessions", type=int, default=20, help="users logged in before the run"
+    )
+    parser.add_argument(
+        "--mix",
+        type=parse_mix,
+        default=dict(DEFAULT_MIX),
+        help="weights overriding the default mix, e.g. token=0,chats=50",
+    )
+    parser.add_argument("--save", type=Path, default=None)
+    parser.add_argument("--compare", type=Path, default=None)
+    parser.add_argument("--metric", default="p95_ms")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dataset = seed(Path(tmp).joinpath("load.db"), Scale.for_users(args.users))
+        results = {
+            f"{args.users}x{args.concurrency}": asyncio.run(
+                run(
+                    dataset,
+                    args.concurrency,
+                    args.duration,
+                    args.requests,
+                    args.sessions,
+                    args.mix,
+                )
+            )
+        }
+
+    report.print_table(results, ["rps", "p50_ms", "p95_ms", "p99_ms", "errors"])
+
+    if args.save is not None:
+        report.save(
+            args.save,
+            results,
+            concurrency=args.concurrency,
+            duration=args.duration,
+            mix=args.mix,
+        )
+
+    if args.compare is not None:
+        regressions = report.compare(
+            report.load(args.compare), results, args.metric, args.threshold
+        )
+        report.print_regressions(regressions)
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
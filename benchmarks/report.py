@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import json
+import platform
+import sqlite3
+import subprocess
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+
+@dataclass
+class Stats:
+    calls: int
+    mean_ms: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    min_ms: float
+    max_ms: float
+
+    @classmethod
+    def from_samples(cls, samples_ns: list[int]) -> Stats:
+        samples = sorted(sample / 1_000_000 for sample in samples_ns)
+
+        return cls(
+            calls=len(samples),
+            mean_ms=sum(samples) / len(samples),
+            p50_ms=percentile(samples, 50),
+            p95_ms=percentile(samples, 95),
+            p99_ms=percentile(samples, 99),
+            min_ms=samples[0],
+            max_ms=samples[-1],
+        )
+
+
+@dataclass
+class Regression:
+    scale: str
+    name: str
+    metric: str
+    baseline: float
+    current: float
+
+    @property
+    def ratio(self) -> float:
+        return self.current / self.baseline if self.baseline else float("inf")
+
+
+def percentile(sorted_samples: list[float], q: float) -> float:
+    if not sorted_samples:
+        return 0.0
+
+    index = round(q / 100 * (len(sorted_samples) - 1))
+    return sorted_samples[index]
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def metadata() -> dict[str, Any]:
+    return {
+        "revision": _git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "machine": platform.machine(),
+    }
+
+
+def asdict_cases(cases: dict[str, Stats]) -> dict[str, Any]:
+    return {name: asdict(stats) for name, stats in cases.items()}
+
+
+def save(path: Path, results: dict[str, dict[str, Any]], **meta: Any) -> None:
+    """
+    Results are keyed by scale (e.g. "1000" users) and then by benchmark name.
+    """
+    document = {"meta": {**metadata(), **meta}, "results": results}
+    path.write_text(json.dumps(document, indent=2, sort_keys=True))
+
+
+def load(path: Path) -> dict[str, dict[str, dict[str, float]]]:
+    results: dict[str, dict[str, dict[str, float]]] = json.loads(path.read_text())[
+        "results"
+    ]
+    return results
+
+
+def compare(
+    baseline: dict[str, dict[str, dict[str, float]]],
+    current: dict[str, dict[str, dict[str, float]]],
+    metric: str = "p50_ms",
+    threshold: float = 0.2,
+) -> list[Regression]:
+    """
+    Returns every benchmark present in both runs whose metric grew by more than
+    `threshold` (0.2 means 20% slower than the baseline).
+    """
+    regressions = []
+
+    for scale, cases in current.items():
+        for name, values in cases.items():
+            previous = baseline.get(scale, {}).get(name)
+            if previous is None or metric not in previous or metric not in values:
+                continue
+
+            if values[metric] > previous[metric] * (1 + threshold):
+                regressions.append(
+                    Regression(
+                        scale=scale,
+                        name=name,
+                        metric=metric,
+                        baseline=previous[metric],
+                        current=values[metric],
+                    )
+                )
+
+    return regressions
+
+
+def print_table(
+    results: dict[str, dict[str, dict[str, Any]]], columns: list[str]
+) -> None:
+    width = max((len(name) for cases in results.values() for name in cases), default=10)
+
+    for scale, cases in results.items():
+        print(f"\n== {scale} ==")
+        print(f"{'benchmark':<{width}}  " + "  ".join(f"{c:>10}" for c in columns))
+        for name, values in sorted(cases.items()):
+            row = "  ".join(f"{values.get(c, 0.0):>10.3f}" for c in columns)
+            print(f"{name:<{width}}  {row}")
+
+
+def print_regressions(regressions: list[Regression]) -> None:
+    if not regressions:
+        print("\nNo regressions")
+        return
+
+    print(f"\n{len(regressions)} regression(s):")
+    for regression in regressions:
+        print(
+            f"  [{regression.scale}] {regression.name}: {regression.metric} "
+            f"{regression.baseline:.3f} -> {regression.current:.3f} "
+            f"({regression.ratio:.2f}x)"
+        )
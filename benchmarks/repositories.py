@@ -0,0 +1,451 @@
+"""
+Times every repository method against a synthetic dataset.
+
+    python -m benchmarks.repositories --sizes 1000,10000 --save baseline.json
+    python -m benchmarks.repositories --sizes 1000,10000 --compare baseline.json
+    python -m benchmarks.repositories --sizes 1000,10000 --storage memory
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import random
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable
+
+from app.core.models import (
+    Application,
+    Education,
+    ExperienceLevel,
+    Industry,
+    JobLocation,
+    JobType,
+    Message,
+    OrganizationSize,
+    Preference,
+    Skill,
+    SwipeDirection,
+    SwipeFor,
+    User,
+)
+from app.infra.db_setup import connect
+from app.runner.container import Container
+from app.runner.settings import Settings
+from benchmarks import report
+from benchmarks.dataset import Dataset, Scale, seed
+
+
+@dataclass
+class Case:
+    name: str
+    run: Callable[[], Any]
+
+
+def _preference(rng: random.Random) -> Preference:
+    return Preference(
+        industry=[Industry.SOFTWARE_ENGINEERING],
+        job_location=rng.sample(list(JobLocation), k=2),
+        job_type=list(JobType),
+        experience_level=rng.sample(list(ExperienceLevel), k=3),
+    )
+
+
+def read_cases(
+    container: Container, dataset: Dataset, rng: random.Random
+) -> list[Case]:
+    accounts = container.account_repository
+    applications = container.application_repository
+    companies = container.company_repository
+    users = container.user_repository
+    matches = container.match_repository
+    chats = container.chat_repository
+    notifications = container.notification_repository
+
+    def username() -> str:
+        return rng.choice(dataset.usernames)
+
+    def application_id() -> int:
+        return rng.choice(dataset.application_ids)
+
+    def company_id() -> int:
+        return rng.choice(dataset.company_ids)
+
+    def owner() -> str:
+        return dataset.owners[company_id()]
+
+    def chat() -> tuple[str, str]:
+        return rng.choice(dataset.chats)
+
+    def some_usernames() -> list[str]:
+        return rng.sample(dataset.usernames, k=min(20, len(dataset.usernames)))
+
+    def some_company_ids() -> list[int]:
+        return rng.sample(dataset.company_ids, k=min(20, len(dataset.company_ids)))
+
+    return [
+        Case("account.get_account", lambda: accounts.get_account(owner())),
+        Case("account.has_account", lambda: accounts.has_account(username())),
+        Case("account.is_valid", lambda: accounts.is_valid(username(), "hash")),
+        Case(
+            "application.get_application",
+            lambda: applications.get_application(application_id()),
+        ),
+        Case(
+            "application.get_company_applications",
+            lambda: applications.get_company_applications(company_id()),
+        ),
+        Case(
+            "application.has_application",
+            lambda: applications.has_application(application_id()),
+        ),
+        Case(
+            "application.get_companies_applications",
+            lambda: applications.get_companies_applications(some_company_ids()),
+        ),
+        Case(
+            "application.get_company_id",
+            lambda: applications.get_company_id(application_id()),
+        ),
+        Case("company.get_company", lambda: companies.get_company(company_id())),
+        Case(
+            "company.get_user_companies",
+            lambda: companies.get_user_companies(owner()),
+        ),
+        Case("company.has_company", lambda: companies.has_company(company_id())),
+        Case(
+            "company.get_owner_username",
+            lambda: companies.get_owner_username(company_id()),
+        ),
+        Case("user.get_user", lambda: users.get_user(username())),
+        Case("user.get_users", lambda: users.get_users(some_usernames())),
+        Case("user.has_user", lambda: users.has_user(username())),
+        Case(
+            "match.get_swipe_list_users",
+            lambda: matches.get_swipe_list_users(application_id(), amount=20),
+        ),
+        Case(
+            "match.get_swipe_list_applications",
+            lambda: matches.get_swipe_list_applications(
+                username(), _preference(rng), amount=20
+            ),
+        ),
+        Case("match.matched", lambda: matches.matched(username(), application_id())),
+        Case("chat.get_chat", lambda: chats.get_chat(*chat())),
+        Case("chat.has_chat", lambda: chats.has_chat(*chat())),
+        Case("chat.get_chat_id", lambda: chats.get_chat_id(*chat())),
+        Case("chat.get_user_chats", lambda: chats.get_user_chats(chat()[1])),
+        Case(
+            "chat.get_messages",
+            lambda: chats.get_messages(
+                chat_id=rng.randint(1, len(dataset.chats)), before=None, limit=50
+            ),
+        ),
+        Case(
+            "chat.get_undelivered",
+            lambda: chats.get_undelivered(chat()[1], limit=100),
+        ),
+        Case(
+            "notification.get_notifications",
+            lambda: notifications.get_notifications(username(), limit=50),
+        ),
+    ]
+
+
+def write_cases(
+    container: Container, dataset: Dataset, rng: random.Random
+) -> list[Case]:
+    accounts = container.account_repository
+    applications = container.application_repository
+    companies = container.company_repository
+    users = container.user_repository
+    matches = container.match_repository
+    chats = container.chat_repository
+    notifications = container.notification_repository
+    counter = itertools.count()
+    created_applications: list[int] = []
+    created_companies: list[int] = []
+
+    def create_account() -> Any:
+        return accounts.create_account(f"bench-account-{next(counter)}", "hash")
+
+    def create_user() -> Any:
+        return users.create_user(f"bench-user-{next(counter)}")
+
+    def create_application() -> Any:
+        application = applications.create_application(
+            title="Benchmark",
+            experience_level=ExperienceLevel.JUNIOR,
+            location=JobLocation.REMOTE,
+            job_type=JobType.FULL_TIME,
+            skills=["python"],
+            description="",
+            company_id=rng.choice(dataset.company_ids),
+        )
+        if application is not None:
+            created_applications.append(application.id)
+        return application
+
+    def create_applications() -> Any:
+        company_id = rng.choice(dataset.company_ids)
+        created = applications.create_applications(
+            [
+                Application(
+                    id=0,
+                    title=f"Benchmark {i}",
+                    location=JobLocation.REMOTE,
+                    job_type=JobType.FULL_TIME,
+                    experience_level=ExperienceLevel.JUNIOR,
+                    skills=["python"],
+                    description="",
+                    company_id=company_id,
+                )
+                for i in range(20)
+            ]
+        )
+        created_applications.extend(application.id for application in created)
+        return created
+
+    def update_application() -> Any:
+        return applications.update_application(
+            id=rng.choice(dataset.application_ids),
+            title="Updated",
+            location=JobLocation.HYBRID,
+            job_type=JobType.PART_TIME,
+            experience_level=ExperienceLevel.MIDDLE,
+            skills=["python", "rust"],
+            description="updated",
+        )
+
+    def delete_application() -> Any:
+        if created_applications:
+            return applications.delete_application(created_applications.pop())
+
+    def create_company() -> Any:
+        company = companies.create_company(
+            name="Benchmark",
+            website="",
+            industry=Industry.SOFTWARE_ENGINEERING,
+            organization_size=OrganizationSize.SMALL,
+            image_uri="",
+            cover_image_uri="",
+            owner_username=rng.choice(dataset.usernames),
+        )
+        if company is not None:
+            created_companies.append(company.id)
+        return company
+
+    def update_company() -> Any:
+        return companies.update_company(
+            company_id=rng.choice(dataset.company_ids),
+            name="Updated",
+            website="",
+            industry=Industry.SOFTWARE_ENGINEERING,
+            organization_size=OrganizationSize.SMALL,
+            image_uri="",
+            cover_image_uri="",
+        )
+
+    def delete_company() -> Any:
+        if created_companies:
+            return companies.delete_company(created_companies.pop())
+
+    def update_user() -> Any:
+        username = rng.choice(dataset.usernames)
+        return users.update_user(
+            username,
+            User(
+                username=username,
+                education=[Education(name="school", description="")],
+                skills=[Skill(name="python", description="")],
+            ),
+        )
+
+    def add_message() -> Any:
+        sender, recipient = rng.choice(dataset.chats)
+        return chats.add_message(
+            Message(
+                sender_username=sender,
+                recipient_username=recipient,
+                time="2023-06-01T12:00:00",
+                text="benchmark",
+            )
+        )
+
+    def add_notification() -> Any:
+        return notifications.add_notification(
+            rng.choice(dataset.usernames),
+            "match",
+            {"chat_id": 1},
+            key=f"bench-{next(counter)}",
+        )
+
+    pending_notifications = list(dataset.notifications)
+    rng.shuffle(pending_notifications)
+
+    def acknowledge_notification() -> Any:
+        if pending_notifications:
+            return notifications.acknowledge(*pending_notifications.pop())
+
+    return [
+        Case("account.create_account", create_account),
+        Case("user.create_user", create_user),
+        Case("user.update_user", update_user),
+        Case(
+            "user.update_preferences",
+            lambda: users.update_preferences(
+                rng.choice(dataset.usernames), _preference(rng)
+            ),
+        ),
+        Case("application.create_application", create_application),
+        Case("application.create_applications", create_applications),
+        Case("application.update_application", update_application),
+        Case(
+            "application.application_interaction",
+            lambda: applications.application_interaction(
+                rng.choice(dataset.application_ids)
+            ),
+        ),
+        Case("application.delete_application", delete_application),
+        Case("company.create_company", create_company),
+        Case("company.update_company", update_company),
+        Case(
+            "match.swipe",
+            lambda: matches.swipe(
+                rng.choice(dataset.usernames),
+                rng.choice(dataset.application_ids),
+                rng.choice(list(SwipeDirection)),
+                rng.choice(list(SwipeFor)),
+            ),
+        ),
+        Case(
+            "chat.create_chat",
+            lambda: chats.create_chat(
+                rng.choice(dataset.usernames), rng.choice(dataset.usernames)
+            ),
+        ),
+        Case("chat.add_message", add_message),
+        Case(
+            "chat.acknowledge",
+            lambda: chats.acknowledge(
+                rng.choice(dataset.usernames), rng.randint(1, 1_000_000)
+            ),
+        ),
+        Case("notification.add_notification", add_notification),
+        Case("notification.acknowledge", acknowledge_notification),
+        # delete_company takes applications away from the other cases, so it has
+        # to run last
+        Case("company.delete_company", delete_company),
+    ]
+
+
+def measure(case: Case, iterations: int, warmup: int) -> report.Stats:
+    for _ in range(warmup):
+        case.run()
+
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter_ns()
+        case.run()
+        samples.append(time.perf_counter_ns() - start)
+
+    return report.Stats.from_samples(samples)
+
+
+def run_scale(
+    users: int,
+    directory: Path,
+    iterations: int,
+    warmup: int,
+    pattern: str,
+    storage: str = "sqlite",
+) -> dict[str, report.Stats]:
+    path = directory.joinpath(f"bench-{users}.db")
+    path.unlink(missing_ok=True)
+
+    started = time.perf_counter()
+    dataset = seed(path, Scale.for_users(users))
+    print(f"seeded {users} users in {time.perf_counter() - started:.1f}s", flush=True)
+
+    container = Container.build(Settings(storage=storage, db_path=path))
+    if container.store is not None:
+        connection = connect(path)
+        container.store.load_sqlite(connection)
+        connection.close()
+    rng = random.Random(users)
+    results = {}
+
+    try:
+        # reads first so that they see exactly the seeded dataset
+        for case in read_cases(container, dataset, rng) + write_cases(
+            container, dataset, rng
+        ):
+            if pattern in case.name:
+                results[case.name] = measure(case, iterations, warmup)
+    finally:
+        container.close()
+
+    return results
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--sizes",
+        default="1000,10000",
+        help="comma separated user counts to seed, e.g. 1000,10000,100000",
+    )
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("-k", dest="pattern", default="", help="only run matching")
+    parser.add_argument("--db-dir", type=Path, default=None)
+    parser.add_argument("--storage", choices=["sqlite", "memory"], default="sqlite")
+    parser.add_argument("--save", type=Path, default=None)
+    parser.add_argument("--compare", type=Path, default=None)
+    parser.add_argument("--metric", default="p50_ms")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="relative slowdown that counts as a regression",
+    )
+    args = parser.parse_args(argv)
+
+    sizes = [int(float(size)) for size in args.sizes.split(",")]
+    results: dict[str, dict[str, Any]] = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = args.db_dir or Path(tmp)
+        for users in sizes:
+            results[str(users)] = report.asdict_cases(
+                run_scale(
+                    users,
+                    directory,
+                    args.iterations,
+                    args.warmup,
+                    args.pattern,
+                    args.storage,
+                )
+            )
+
+    report.print_table(results, ["mean_ms", "p50_ms", "p95_ms", "p99_ms"])
+
+    if args.save is not None:
+        report.save(args.save, results, iterations=args.iterations)
+
+    if args.compare is not None:
+        regressions = report.compare(
+            report.load(args.compare), results, args.metric, args.threshold
+        )
+        report.print_regressions(regressions)
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
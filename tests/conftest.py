@@ -0,0 +1,62 @@
+import sqlite3
+from dataclasses import replace
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.infra.db_setup import create_tables
+from app.runner.api import create_app
+from app.runner.container import Container
+from app.runner.settings import Settings
+
+
+@pytest.fixture
+def settings(tmp_path: Path, request: pytest.FixtureRequest) -> Settings:
+    """Settings over a fresh database; parametrize indirectly to override some."""
+    db_path = tmp_path / "linkr.db"
+    connection = sqlite3.connect(db_path)
+    create_tables(connection.cursor(), connection)
+    connection.close()
+
+    settings = Settings(db_path=db_path, metrics_dir=None, outbox_interval=0.01)
+    return replace(settings, **getattr(request, "param", {}))
+
+
+@pytest.fixture
+def app(settings: Settings) -> FastAPI:
+    return create_app(settings)
+
+
+@pytest.fixture
+def client(app: FastAPI) -> Iterator[TestClient]:
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def container(app: FastAPI, client: TestClient) -> Container:
+    """The container of the running app, so only once `client` started it."""
+    container: Container = app.state.container
+    return container
+
+
+@pytest.fixture
+def built_container(settings: Settings) -> Iterator[Container]:
+    """
+    A container that was built but not started, so no workers run in the
+    background. Tests needing other settings override `settings`.
+    """
+    container = Container.build(settings)
+    yield container
+    container.close()
+
+
+def register(client: TestClient, username: str) -> dict[str, str]:
+    """Registers `username` and returns the headers to act as them."""
+    form = {"username": username, "password": "secret"}
+    assert client.post("/register", data=form).status_code == 200
+    token = client.post("/token", data=form).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
@@ -0,0 +1,156 @@
+import asyncio
+import io
+from typing import AsyncIterator
+
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+
+from app.infra.application_import import (
+    ApplicationImport,
+    read_file_lines,
+    read_lines,
+)
+from app.runner.container import Container
+from tests.conftest import register
+
+
+def lines(chunks: list[bytes], max_length: int) -> list[bytes | None]:
+    async def stream() -> AsyncIterator[bytes]:
+        for chunk in chunks:
+            yield chunk
+
+    async def collect() -> list[bytes | None]:
+        return [line async for line in read_lines(stream(), max_length)]
+
+    return asyncio.run(collect())
+
+
+def test_lines_are_joined_across_chunks() -> None:
+    assert lines([b"ab", b"c\nde", b"f\n\ng"], max_length=10) == [
+        b"abc",
+        b"def",
+        b"",
+        b"g",
+    ]
+
+
+def test_overlong_lines_are_skipped_without_buffering() -> None:
+    assert lines([b"12345", b"678\nok\n", b"1234567"], max_length=4) == [
+        None,
+        b"ok",
+        None,
+    ]
+    assert lines([b"12345\nok"], max_length=4) == [None, b"ok"]
+
+
+class TrackedFile(io.BytesIO):
+    """Remembers the most bytes a single read handed out."""
+
+    largest_read = 0
+
+    def readline(self, size: int | None = -1) -> bytes:
+        line = super().readline(size)
+        self.largest_read = max(self.largest_read, len(line))
+        return line
+
+
+def test_file_lines_are_read_a_bounded_amount_at_a_time() -> None:
+    file = TrackedFile(b"ab\n" + b"x" * 100 + b"\n\n1234\n12345\nlast")
+
+    assert list(read_file_lines(file, max_length=4)) == [
+        b"ab",
+        None,
+        b"",
+        b"1234",
+        None,
+        b"last",
+    ]
+    assert file.largest_read <= 5
+
+
+@pytest.fixture
+def owner(client: TestClient) -> dict[str, str]:
+    headers = register(client, "carol")
+    response = client.post("/company", json={"name": "Acme"}, headers=headers)
+    assert response.status_code == 200
+    return headers
+
+
+def row(title: str) -> bytes:
+    return orjson.dumps({"title": title})
+
+
+def test_rows_are_created_a_chunk_at_a_time(
+    container: Container, owner: dict[str, str]
+) -> None:
+    account = container.account_repository.get_account("carol")
+    assert account is not None
+    importer = ApplicationImport(
+        core=container.core, account=account, company_id=1, chunk_size=2
+    )
+
+    created = []
+    for line in range(1, 6):
+        if importer.add(line, row(f"job {line}")):
+            importer.flush()
+        created.append(len(importer.result.application_ids))
+    importer.flush()
+
+    assert created == [0, 2, 2, 4, 4]
+    assert len(importer.result.application_ids) == 5
+
+
+def test_bulk_import_reports_failed_lines(
+    client: TestClient, container: Container, owner: dict[str, str]
+) -> None:
+    container.settings.import_chunk_size = 2
+    body = b"\n".join(
+        [
+            row("first"),
+            b"{not json",
+            orjson.dumps({"title": "wrong", "company_id": 99}),
+            b"[]",
+            row("second"),
+            b"",
+            b"x" * (70 * 1024),
+            row("third"),
+        ]
+    )
+
+    response = client.post("/company/1/applications/bulk", content=body, headers=owner)
+
+    assert response.status_code == 200
+    result = response.json()
+    assert len(result["application_ids"]) == 3
+    assert [error["line"] for error in result["errors"]] == [2, 3, 4, 7]
+
+
+def test_bulk_import_into_another_company_is_refused(
+    client: TestClient, owner: dict[str, str]
+) -> None:
+    stranger = register(client, "mallory")
+
+    response = client.post(
+        "/company/1/applications/bulk", content=row("job"), headers=stranger
+    )
+
+    assert response.status_code == 400
+
+
+def test_rows_after_the_company_is_deleted_fail(
+    container: Container, owner: dict[str, str]
+) -> None:
+    account = container.account_repository.get_account("carol")
+    assert account is not None
+    importer = ApplicationImport(
+        core=container.core, account=account, company_id=1, chunk_size=2
+    )
+
+    importer.add_all([(1, row("first")), (2, row("second"))])
+    container.core.delete_company(account=account, company_id=1)
+    importer.add_all([(3, row("third")), (4, row("fourth")), (5, b""), (6, row("x"))])
+    importer.flush()
+
+    assert len(importer.result.application_ids) == 2
+    assert [error.line for error in importer.result.errors] == [3, 4, 6]
@@ -0,0 +1,92 @@
+from dataclasses import replace
+from pathlib import Path
+
+import pytest
+
+from app.core.models import Message
+from app.core.requests import RegisterRequest
+from app.infra.archive import MessageArchiver
+from app.runner.container import Container
+from app.runner.settings import Settings
+
+
+@pytest.fixture
+def settings(settings: Settings, tmp_path: Path) -> Settings:
+    return replace(
+        settings,
+        archive_path=tmp_path / "archive.db",
+        hot_messages=3,
+        archive_block_size=2,
+    )
+
+
+def archive_chat(container: Container, messages: int) -> tuple[int, list[int]]:
+    """Sends `messages` to bob, who reads them, and archives the chat."""
+    for username in ["alice", "bob"]:
+        container.core.register(RegisterRequest(username, "secret"))
+
+    chats = container.chat_repository
+    chat = chats.create_chat("alice", "bob")
+    assert chat is not None
+
+    ids = []
+    for i in range(messages):
+        stored = chats.add_message(
+            Message(
+                sender_username="alice",
+                recipient_username="bob",
+                time=str(i),
+                text=f"message {i}",
+            )
+        )
+        assert stored is not None
+        ids.append(stored.message_id)
+    chats.acknowledge("bob", ids[-1])
+
+    [archiver] = [w for w in container.workers if isinstance(w, MessageArchiver)]
+    archiver.run_once()
+    return chat.chat_id, ids
+
+
+def test_history_pages_from_hot_messages_into_the_archive(
+    built_container: Container,
+) -> None:
+    chat_id, ids = archive_chat(built_container, 9)
+    chats = built_container.chat_repository
+
+    newest = chats.get_messages(chat_id=chat_id, before=None, limit=5)
+    assert [m.message_id for m in newest] == ids[4:]
+
+    older = chats.get_messages(chat_id=chat_id, before=ids[4], limit=10)
+    assert [m.message_id for m in older] == ids[:4]
+    assert [m.text for m in older] == [f"message {i}" for i in range(4)]
+
+
+def test_chats_say_where_their_archived_history_starts(
+    built_container: Container,
+) -> None:
+    chat_id, ids = archive_chat(built_container, 9)
+    chats = built_container.chat_repository
+
+    chat = chats.get_chat("alice", "bob")
+    assert chat is not None
+    # 6 of 9 are cold, whole blocks of 2 at a time
+    assert [m.message_id for m in chat.message_list] == ids[6:]
+    assert chat.older_before == ids[6]
+
+    [user_chat] = chats.get_user_chats("bob")
+    assert user_chat.older_before == ids[6]
+
+    archived = chats.get_messages(chat_id=chat_id, before=chat.older_before, limit=100)
+    assert [m.message_id for m in archived] == ids[:6]
+
+
+def test_chats_without_archived_history_are_complete(
+    built_container: Container,
+) -> None:
+    archive_chat(built_container, 2)
+
+    chat = built_container.chat_repository.get_chat("alice", "bob")
+    assert chat is not None
+    assert len(chat.message_list) == 2
+    assert chat.older_before is None
@@ -0,0 +1,78 @@
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from app.runner.container import Container
+from tests.conftest import register
+
+
+def token(headers: dict[str, str]) -> str:
+    return headers["Authorization"].removeprefix("Bearer ")
+
+
+@pytest.fixture
+def chat(client: TestClient, container: Container) -> dict[str, dict[str, str]]:
+    users = {username: register(client, username) for username in ["alice", "bob"]}
+    container.chat_repository.create_chat("alice", "bob")
+    return users
+
+
+def send_from_alice(client: TestClient, users: dict[str, dict[str, str]]) -> None:
+    with client.websocket_connect(
+        f"/register/ws/alice?token={token(users['alice'])}"
+    ) as websocket:
+        websocket.send_json({"user": "bob", "time": "1", "text": "hi"})
+        # a rejected ack is answered, so once this arrives the message is stored
+        websocket.send_json({"type": "ack", "message_id": 1})
+        assert websocket.receive_json() == {"error": "invalid ack"}
+
+
+def test_socket_without_a_token_is_refused(
+    client: TestClient, chat: dict[str, dict[str, str]]
+) -> None:
+    with pytest.raises(WebSocketDisconnect) as refused:
+        with client.websocket_connect("/register/ws/bob"):
+            pass
+
+    assert refused.value.code == 1008
+
+
+def test_socket_for_another_user_is_refused(
+    client: TestClient, chat: dict[str, dict[str, str]]
+) -> None:
+    with pytest.raises(WebSocketDisconnect):
+        with client.websocket_connect("/register/ws/bob", headers=chat["alice"]):
+            pass
+
+
+def test_backlog_is_pushed_and_acks_are_checked(
+    client: TestClient, chat: dict[str, dict[str, str]]
+) -> None:
+    send_from_alice(client, chat)
+
+    with client.websocket_connect("/register/ws/bob", headers=chat["bob"]) as ws:
+        backlog: dict[str, Any] = ws.receive_json()
+        assert backlog["type"] == "messages"
+        [message] = backlog["messages"]
+        assert message["text"] == "hi"
+
+        for ack in [
+            {"type": "ack"},
+            {"type": "ack", "message_id": "x"},
+            {"type": "ack", "message_id": message["id"] + 1},
+            {"type": "ack", "notification_id": 1},
+        ]:
+            ws.send_json(ack)
+            assert ws.receive_json() == {"error": "invalid ack"}
+
+        ws.send_text("not json")
+        assert ws.receive_json() == {"error": "expected a JSON object"}
+
+        ws.send_json({"type": "ack", "message_id": message["id"]})
+
+    with client.websocket_connect("/register/ws/bob", headers=chat["bob"]) as ws:
+        # nothing is pending any more, so the first frame is the error
+        ws.send_json({"type": "ack", "message_id": message["id"]})
+        assert ws.receive_json() == {"error": "invalid ack"}
@@ -0,0 +1,100 @@
+import asyncio
+from typing import Any, cast
+
+from fastapi import WebSocket
+
+from app.infra.metrics import MetricsRegistry
+from app.runner.connections import UserConnectionManager
+
+
+class FakeWebSocket:
+    """Records what is sent; `stalled` keeps every send from completing."""
+
+    def __init__(self, stalled: bool = False) -> None:
+        self.stalled = stalled
+        self.sent: list[dict[str, Any]] = []
+        self.closed_with: int | None = None
+
+    async def accept(self) -> None:
+        pass
+
+    async def send_json(self, message: dict[str, Any]) -> None:
+        if self.stalled:
+            await asyncio.Event().wait()
+        self.sent.append(message)
+
+    async def close(self, code: int = 1000) -> None:
+        self.closed_with = code
+
+
+def socket(fake: FakeWebSocket) -> WebSocket:
+    return cast(WebSocket, fake)
+
+
+def test_a_consumer_that_falls_behind_is_closed() -> None:
+    async def run() -> None:
+        manager = UserConnectionManager(queue_size=2, metrics=MetricsRegistry())
+        slow = FakeWebSocket(stalled=True)
+        connection = await manager.connect("alice", socket(slow))
+
+        # the writer takes the first message and blocks sending it, two more
+        # fill the queue and the one after that does not fit
+        assert manager.send(connection, {"n": 0})
+        await asyncio.sleep(0)
+        assert manager.send(connection, {"n": 1})
+        assert manager.send(connection, {"n": 2})
+        assert not manager.send(connection, {"n": 3})
+
+        await manager.close_all()
+        assert slow.closed_with == 1013
+        assert "alice" not in manager.active_connections
+
+    asyncio.run(run())
+
+
+def test_idle_connections_are_evicted() -> None:
+    async def run() -> None:
+        manager = UserConnectionManager(
+            ping_interval=0.01, idle_timeout=0.05, metrics=MetricsRegistry()
+        )
+        await manager.start()
+        idle, busy = FakeWebSocket(), FakeWebSocket()
+        await manager.connect("alice", socket(idle))
+        active = await manager.connect("bob", socket(busy))
+
+        for _ in range(10):
+            await asyncio.sleep(0.01)
+            active.touch()
+
+        assert list(manager.active_connections) == ["bob"]
+        await manager.stop()
+        assert idle.closed_with == 1001
+        # pinged while it was connected
+        assert {"type": "ping"} in busy.sent
+
+    asyncio.run(run())
+
+
+def test_personal_messages_reach_every_device() -> None:
+    async def run() -> None:
+        manager = UserConnectionManager(metrics=MetricsRegistry())
+        phone, laptop, other = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+        for username, websocket in [
+            ("alice", phone),
+            ("alice", laptop),
+            ("bob", other),
+        ]:
+            await manager.connect(username, socket(websocket))
+
+        message = {"id": 1, "user": "bob", "time": "1", "text": "hi"}
+        assert await manager.send_personal_message("alice", message) == 2
+        # let the writers get the message and send it
+        for _ in range(3):
+            await asyncio.sleep(0)
+
+        assert phone.sent == [message]
+        assert laptop.sent == [message]
+        assert other.sent == []
+        await manager.close_all()
+
+    asyncio.run(run())
@@ -0,0 +1,61 @@
+import asyncio
+import time
+
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from app.infra.loop_monitor import assert_no_blocking
+from app.runner.container import Container
+from tests.conftest import register
+
+# well above the stalls other threads holding the GIL cause, still below a
+# password hash or a chunk of inserts run on the loop
+THRESHOLD = 0.25
+
+
+def test_blocking_calls_are_caught() -> None:
+    async def block() -> None:
+        async with assert_no_blocking(THRESHOLD):
+            time.sleep(THRESHOLD * 3)
+
+    with pytest.raises(AssertionError, match="event loop blocked"):
+        asyncio.run(block())
+
+
+def test_routes_leave_the_event_loop_free(
+    client: TestClient, container: Container
+) -> None:
+    # one chunk of 6000 rows takes far longer than THRESHOLD to validate and
+    # insert, should either happen on the loop
+    container.settings.import_chunk_size = 6000
+    owner = register(client, "carol")
+    assert (
+        client.post("/company", json={"name": "Acme"}, headers=owner).status_code == 200
+    )
+    body = b"\n".join(
+        orjson.dumps({"title": f"job {i}", "skills": ["python"] * 20})
+        for i in range(6000)
+    )
+
+    assert client.portal is not None
+    # the client's requests are served on its own loop, which is the one watched
+    with client.portal.wrap_async_context_manager(assert_no_blocking(THRESHOLD)):
+        # password hashing and queries in sync routes run in the threadpool
+        bob = register(client, "bob")
+        container.chat_repository.create_chat("bob", "carol")
+
+        response = client.post(
+            "/company/1/applications/bulk", content=body, headers=owner
+        )
+        assert response.status_code == 200
+        assert len(response.json()["application_ids"]) == 6000
+
+        with pytest.raises(WebSocketDisconnect):
+            with client.websocket_connect("/register/ws/carol", headers=bob):
+                pass
+        with client.websocket_connect("/register/ws/bob", headers=bob) as ws:
+            ws.send_json({"user": "carol", "time": "1", "text": "hi"})
+            ws.send_json({"type": "ack", "message_id": 1})
+            assert ws.receive_json() == {"error": "invalid ack"}
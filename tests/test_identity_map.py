@@ -0,0 +1,143 @@
+import asyncio
+
+from app.core import identity_map
+from app.core.identity_map import identity_scope
+from app.core.models import Account, Industry, OrganizationSize
+from app.core.requests import (
+    CreateApplicationRequest,
+    RegisterRequest,
+    UpdateApplicationRequest,
+)
+from app.runner.container import Container
+
+
+class Loader:
+    """Looks names up in `rows`, counting the keys it was asked for."""
+
+    def __init__(self, rows: dict[int, str]) -> None:
+        self.rows = rows
+        self.calls: list[list[int]] = []
+
+    def one(self, key: int) -> str | None:
+        self.calls.append([key])
+        return self.rows.get(key)
+
+    def many(self, keys: list[int]) -> dict[int, str]:
+        self.calls.append(keys)
+        return {key: self.rows[key] for key in keys if key in self.rows}
+
+
+def test_without_a_scope_nothing_is_cached() -> None:
+    loader = Loader({1: "a"})
+    identity_map.store("name", 1, "stale")
+
+    assert identity_map.load("name", 1, loader.one) == "a"
+    assert identity_map.load("name", 1, loader.one) == "a"
+    assert loader.calls == [[1], [1]]
+
+
+def test_hits_and_misses_are_loaded_once_per_scope() -> None:
+    loader = Loader({1: "a"})
+
+    with identity_scope():
+        for _ in range(2):
+            assert identity_map.load("name", 1, loader.one) == "a"
+            assert identity_map.load("name", 2, loader.one) is None
+        # the same key of another kind is another entity
+        assert identity_map.load("other", 1, loader.one) == "a"
+
+    assert loader.calls == [[1], [2], [1]]
+
+
+def test_load_many_fetches_only_what_the_scope_has_not_seen() -> None:
+    loader = Loader({1: "a", 2: "b", 3: "c"})
+
+    with identity_scope():
+        identity_map.load("name", 1, loader.one)
+        found = identity_map.load_many("name", [1, 2, 2, 4], loader.many)
+        assert found == {1: "a", 2: "b", 4: None}
+        assert identity_map.load_many("name", [2, 3, 4], loader.many) == {
+            2: "b",
+            3: "c",
+            4: None,
+        }
+
+    assert loader.calls == [[1], [2, 4], [3]]
+
+
+def test_writes_store_or_evict() -> None:
+    loader = Loader({1: "a"})
+
+    with identity_scope():
+        identity_map.load("name", 1, loader.one)
+        loader.rows[1] = "b"
+        identity_map.store("name", 1, "b")
+        assert identity_map.load("name", 1, loader.one) == "b"
+
+        loader.rows[1] = "c"
+        identity_map.evict("name", 1)
+        identity_map.evict("name", 99)
+        assert identity_map.load("name", 1, loader.one) == "c"
+
+    assert loader.calls == [[1], [1]]
+
+
+def test_nested_scopes_share_the_outer_map() -> None:
+    loader = Loader({1: "a"})
+
+    with identity_scope() as outer:
+        with identity_scope() as inner:
+            assert inner is outer
+            identity_map.load("name", 1, loader.one)
+        # leaving the inner scope does not end the unit of work
+        identity_map.load("name", 1, loader.one)
+
+    assert loader.calls == [[1]]
+
+
+def test_concurrent_requests_have_their_own_maps() -> None:
+    loader = Loader({1: "a"})
+
+    async def request(name: str) -> str | None:
+        with identity_scope():
+            identity_map.store("name", 1, name)
+            await asyncio.sleep(0.01)
+            return identity_map.load("name", 1, loader.one)
+
+    async def both() -> list[str | None]:
+        return list(await asyncio.gather(request("first"), request("second")))
+
+    assert asyncio.run(both()) == ["first", "second"]
+    assert loader.calls == []
+
+
+def test_updating_an_application_refreshes_its_company(
+    built_container: Container,
+) -> None:
+    core = built_container.core
+    core.register(RegisterRequest("carol", "secret"))
+    owner = Account(username="carol", password="")
+    core.create_company(
+        account=owner,
+        name="Acme",
+        website="",
+        industry=Industry.SOFTWARE_ENGINEERING,
+        organization_size=OrganizationSize.SMALL,
+        image_uri="",
+        cover_image_uri="",
+    )
+    core.create_application(
+        account=owner, request=CreateApplicationRequest(title="old", company_id=1)
+    )
+
+    with identity_scope():
+        company = core.company_service.get_company(1)
+        assert company is not None
+        assert [a.title for a in company.applications] == ["old"]
+
+        core.update_application(
+            account=owner, request=UpdateApplicationRequest(id=1, title="new")
+        )
+        company = core.company_service.get_company(1)
+        assert company is not None
+        assert [a.title for a in company.applications] == ["new"]
@@ -0,0 +1,91 @@
+from pathlib import Path
+
+from app.core.models import (
+    Account,
+    Company,
+    Industry,
+    OrganizationSize,
+    SwipeDirection,
+    SwipeFor,
+)
+from app.infra.memory_store import MemoryStore, Swipe
+
+
+def company(company_id: int, owner: str) -> Company:
+    return Company(
+        id=company_id,
+        name=f"company {company_id}",
+        website="",
+        industry=Industry.SOFTWARE_ENGINEERING,
+        organization_size=OrganizationSize.SMALL,
+        image_uri="",
+        cover_image_uri="",
+        owner_username=owner,
+    )
+
+
+def swipe(username: str, application_id: int) -> Swipe:
+    return Swipe(
+        username=username,
+        application_id=application_id,
+        swipe_for=SwipeFor.APPLICATION,
+        direction=SwipeDirection.RIGHT,
+    )
+
+
+def reopen(directory: Path) -> MemoryStore:
+    store = MemoryStore(directory)
+    store.open()
+    return store
+
+
+def test_restart_replays_the_journal_on_top_of_the_snapshot(tmp_path: Path) -> None:
+    store = reopen(tmp_path)
+    store.put(store.accounts, Account(username="alice", password="old"))
+    store.put(store.companies, company(1, "alice"))
+    store.put(store.swipes, swipe("alice", 1))
+    store.snapshot()
+
+    store.put(store.accounts, Account(username="alice", password="new"))
+    store.put(store.companies, company(2, "alice"))
+    store.delete(store.companies, 1)
+    store.put(store.swipes, swipe("alice", 2))
+    store.delete(store.swipes, ("alice", 1, SwipeFor.APPLICATION))
+    # not closed, as if the process died: only the journal has the changes
+
+    [snapshot] = tmp_path.glob("snapshot-*.json")
+    [journal] = tmp_path.glob("journal-*.log")
+    assert len(journal.read_bytes().splitlines()) == 5
+
+    restarted = reopen(tmp_path)
+    account = restarted.accounts.get("alice")
+    assert account is not None and account.password == "new"
+    assert [c.id for c in restarted.companies.find("owner", "alice")] == [2]
+    assert [s.application_id for s in restarted.swipes.scan()] == [2]
+    assert restarted.companies.next_id() == 3
+
+
+def test_a_torn_last_record_is_ignored(tmp_path: Path) -> None:
+    store = reopen(tmp_path)
+    store.put(store.accounts, Account(username="alice", password="secret"))
+    store.put(store.accounts, Account(username="bob", password="secret"))
+    [journal] = tmp_path.glob("journal-*.log")
+    journal.write_bytes(journal.read_bytes()[:-10])
+
+    restarted = reopen(tmp_path)
+    assert [a.username for a in restarted.accounts.scan()] == ["alice"]
+
+
+def test_snapshots_replace_older_generations(tmp_path: Path) -> None:
+    store = reopen(tmp_path)
+    for password in ["one", "two"]:
+        store.put(store.accounts, Account(username="alice", password=password))
+        store.snapshot()
+    store.close()
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "journal-00000002.log",
+        "snapshot-00000002.json",
+    ]
+    account = reopen(tmp_path).accounts.get("alice")
+    assert account is not None and account.password == "two"
@@ -0,0 +1,85 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from app.infra.metrics import MetricsRegistry
+
+
+def register(registry: MetricsRegistry) -> None:
+    registry.counter("requests_total", "Requests", labels=("route",))
+    registry.gauge("in_flight", "Requests being served")
+    registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+
+
+def worker(directory: Path, pid: int, requests: float, in_flight: float) -> None:
+    """Writes the snapshot another process with `pid` would have flushed."""
+    registry = MetricsRegistry()
+    register(registry)
+    registry.counter("requests_total", "", labels=("route",)).inc(requests, route="/a")
+    registry.gauge("in_flight", "").set(in_flight)
+    registry.histogram("latency_seconds", "").observe(2.0)
+
+    path = directory.joinpath(f"metrics-{pid}.json")
+    path.write_text(json.dumps(registry.snapshot()))
+
+
+def dead_pid() -> int:
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def samples(rendered: str) -> dict[str, float]:
+    return {
+        name: float(value)
+        for name, value in (
+            line.rsplit(" ", 1)
+            for line in rendered.splitlines()
+            if not line.startswith("#")
+        )
+    }
+
+
+def test_processes_are_aggregated(tmp_path: Path) -> None:
+    worker(tmp_path, os.getppid(), requests=2, in_flight=3)
+    worker(tmp_path, dead_pid(), requests=5, in_flight=100)
+
+    registry = MetricsRegistry(directory=tmp_path)
+    register(registry)
+    registry.counter("requests_total", "", labels=("route",)).inc(route="/a")
+    registry.counter("requests_total", "", labels=("route",)).inc(route="/b")
+    registry.gauge("in_flight", "").set(1)
+    latency = registry.histogram("latency_seconds", "")
+    latency.observe(0.05)
+    latency.observe(0.5)
+
+    # sums depend on the order the files are read in
+    assert samples(registry.render()) == pytest.approx(
+        {
+            # counters and histograms count every process that ever reported
+            'requests_total{route="/a"}': 1 + 2 + 5,
+            'requests_total{route="/b"}': 1,
+            # gauges only those still running
+            "in_flight": 1 + 3,
+            # buckets are cumulative, +Inf holds every observation
+            'latency_seconds_bucket{le="0.1"}': 1,
+            'latency_seconds_bucket{le="1.0"}': 2,
+            'latency_seconds_bucket{le="+Inf"}': 4,
+            "latency_seconds_sum": 0.05 + 0.5 + 2.0 + 2.0,
+            "latency_seconds_count": 4,
+        }
+    )
+
+
+def test_render_without_a_directory_is_process_local() -> None:
+    registry = MetricsRegistry()
+    register(registry)
+    registry.gauge("in_flight", "").inc()
+
+    rendered = registry.render()
+    assert "# TYPE latency_seconds histogram" in rendered
+    assert samples(rendered) == {"in_flight": 1}
@@ -0,0 +1,124 @@
+import time
+from typing import Any, cast
+
+import pytest
+
+from app.core.models import (
+    Account,
+    ApplicationId,
+    Company,
+    Industry,
+    OrganizationSize,
+)
+from app.core.requests import CreateApplicationRequest, RegisterRequest
+from app.infra.metrics import MetricsRegistry
+from app.infra.outbox import OutboxWorker, enqueue
+from app.runner.container import Container
+
+
+def add_event(container: Container, payload: dict[str, Any]) -> None:
+    assert container.writer is not None
+    container.writer.execute(lambda connection: enqueue(connection, "match", payload))
+
+
+def test_claimed_events_come_back_once_their_lease_expires(
+    built_container: Container,
+) -> None:
+    outbox = built_container.outbox
+    assert outbox is not None
+    add_event(built_container, {"n": 1})
+
+    [claimed] = outbox.claim(limit=10, lease=0.05, max_attempts=2)
+    assert claimed.payload == {"n": 1}
+    assert claimed.attempts == 1
+    assert outbox.claim(limit=10, lease=0.05, max_attempts=2) == []
+
+    time.sleep(0.06)
+    [again] = outbox.claim(limit=10, lease=0.05, max_attempts=2)
+    assert (again.id, again.attempts) == (claimed.id, 2)
+
+    # out of attempts, it stays put but is not handed out again
+    time.sleep(0.06)
+    assert outbox.claim(limit=10, lease=0.05, max_attempts=2) == []
+
+
+def test_failed_events_are_retried_until_they_succeed(
+    built_container: Container,
+) -> None:
+    outbox = built_container.outbox
+    assert outbox is not None
+    add_event(built_container, {"n": 1})
+
+    calls: list[dict[str, Any]] = []
+
+    def handle(payload: dict[str, Any]) -> None:
+        calls.append(payload)
+        if len(calls) == 1:
+            raise RuntimeError("first attempt fails")
+
+    worker = OutboxWorker(
+        outbox, handlers={"match": handle}, metrics=MetricsRegistry(), lease=0.0
+    )
+    assert worker.run_once() == 1
+    assert worker.run_once() == 1
+    assert worker.run_once() == 0
+    assert calls == [{"n": 1}, {"n": 1}]
+
+
+def create_match(container: Container) -> tuple[str, str, int]:
+    core = container.core
+    for username in ["alice", "carol"]:
+        core.register(RegisterRequest(username, "secret"))
+
+    owner = Account(username="carol", password="")
+    company = cast(
+        Company,
+        core.create_company(
+            account=owner,
+            name="Acme",
+            website="",
+            industry=Industry.SOFTWARE_ENGINEERING,
+            organization_size=OrganizationSize.SMALL,
+            image_uri="",
+            cover_image_uri="",
+        ).response_content,
+    )
+    application = cast(
+        ApplicationId,
+        core.create_application(
+            account=owner,
+            request=CreateApplicationRequest(title="Developer", company_id=company.id),
+        ).response_content,
+    )
+
+    return "alice", "carol", application.application_id
+
+
+def pending(container: Container, username: str) -> list[int]:
+    return [
+        notification.id
+        for notification in container.notification_repository.get_notifications(
+            username, limit=100
+        )
+    ]
+
+
+@pytest.mark.parametrize(
+    "settings", [{"storage": "sqlite"}, {"storage": "memory"}], indirect=True
+)
+def test_handling_a_match_again_notifies_no_one_twice(
+    built_container: Container,
+) -> None:
+    container = built_container
+    user, owner, application_id = create_match(container)
+
+    container.core.handle_match(username=user, application_id=application_id)
+    container.core.handle_match(username=user, application_id=application_id)
+    assert len(pending(container, user)) == 1
+    assert len(pending(container, owner)) == 1
+
+    # nor once they have seen it
+    [notification_id] = pending(container, user)
+    container.notification_repository.acknowledge(user, notification_id)
+    container.core.handle_match(username=user, application_id=application_id)
+    assert pending(container, user) == []
@@ -0,0 +1,81 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.identity_map import identity_scope
+from app.core.models import Account, SwipeDirection
+from app.core.requests import RegisterRequest
+from app.core.responses import SwipeListResponse
+from app.infra.query_log import assert_max_queries
+from app.runner.container import Container
+from tests.conftest import register
+
+APPLICATIONS = 30
+USERS = 4
+
+
+@pytest.fixture
+def alice(client: TestClient, container: Container) -> Account:
+    """Someone looking for any job, among USERS candidates, and APPLICATIONS jobs."""
+    headers = register(client, "alice")
+    preferences = {
+        "job_location": ["On-site", "Remote", "Hybrid"],
+        "job_type": ["Part-time", "Full-time"],
+        "experience_level": ["Intern", "Junior", "Middle", "Senior", "Lead"],
+    }
+    response = client.put("/preferences/update", json=preferences, headers=headers)
+    assert response.status_code == 200
+
+    for i in range(1, USERS):
+        container.core.register(RegisterRequest(f"user{i}", "secret"))
+
+    owner = register(client, "carol")
+    response = client.post("/company", json={"name": "Acme"}, headers=owner)
+    assert response.status_code == 200
+    for i in range(APPLICATIONS):
+        application = {"title": f"job {i}", "company_id": 1}
+        response = client.post("/application", json=application, headers=owner)
+        assert response.status_code == 200
+
+    return Account(username="alice", password="")
+
+
+# the routes only call into core, which is where their queries are issued; each
+# request gets its own identity map, as under IdentityMapMiddleware
+
+
+@pytest.mark.parametrize("amount", [5, 25])
+def test_decks_take_the_same_queries_whatever_their_size(
+    container: Container, alice: Account, amount: int
+) -> None:
+    core = container.core
+
+    with identity_scope(), assert_max_queries(4):
+        response = core.get_swipe_list_applications(account=alice, amount=amount)
+    assert isinstance(response.response_content, SwipeListResponse)
+    assert len(response.response_content.swipe_list) == amount
+
+    with identity_scope(), assert_max_queries(4):
+        response = core.get_swipe_list_users(swiper_application_id=1, amount=amount)
+    assert isinstance(response.response_content, SwipeListResponse)
+    assert len(response.response_content.swipe_list) == min(amount, USERS + 1)
+
+
+def test_swipes_stay_within_their_query_budget(
+    container: Container, alice: Account
+) -> None:
+    core = container.core
+
+    with identity_scope(), assert_max_queries(6):
+        core.swipe_application(
+            swiper_username=alice.username,
+            application_id=1,
+            direction=SwipeDirection.RIGHT,
+        )
+
+    # completing the match adds its event to the outbox in the same transaction
+    with identity_scope(), assert_max_queries(7):
+        core.swipe_user(
+            swiper_application_id=1,
+            swiped_username=alice.username,
+            direction=SwipeDirection.RIGHT,
+        )
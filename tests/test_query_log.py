@@ -0,0 +1,67 @@
+import sqlite3
+import threading
+from pathlib import Path
+from typing import cast
+
+import pytest
+
+from app.infra.db_setup import connect
+from app.infra.query_log import ThreadLocalConnection, TracingConnection, capture
+
+
+def opener(path: Path, opened: list[TracingConnection]) -> ThreadLocalConnection:
+    def open_connection() -> TracingConnection:
+        connection = cast(TracingConnection, connect(path, factory=TracingConnection))
+        opened.append(connection)
+        return connection
+
+    return ThreadLocalConnection(open_connection)
+
+
+def closed(connection: sqlite3.Connection) -> bool:
+    try:
+        connection.execute("SELECT 1")
+    except sqlite3.ProgrammingError:
+        return True
+    return False
+
+
+def test_every_thread_reads_through_its_own_connection(tmp_path: Path) -> None:
+    opened: list[TracingConnection] = []
+    connection = opener(tmp_path / "test.db", opened)
+
+    def read() -> None:
+        for _ in range(2):
+            assert connection.execute("SELECT 1").fetchone() == (1,)
+
+    # both stay alive until each has opened its connection
+    barrier = threading.Barrier(2)
+
+    def read_together() -> None:
+        read()
+        barrier.wait()
+
+    read()
+    threads = [threading.Thread(target=read_together) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(opened) == 3
+
+    # statements still land in the query log of the caller
+    with capture() as log:
+        connection.cursor().execute("SELECT 2").fetchall()
+    assert log.count == 1
+
+    # opening another one closes those of the threads that are gone
+    assert [closed(c) for c in opened] == [False, False, False]
+    thread = threading.Thread(target=read)
+    thread.start()
+    thread.join()
+    assert [closed(c) for c in opened] == [False, True, True, False]
+
+    connection.close()
+    assert all(closed(c) for c in opened)
+    with pytest.raises(sqlite3.ProgrammingError):
+        connection.execute("SELECT 1")
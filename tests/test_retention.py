@@ -0,0 +1,86 @@
+import time
+from sqlite3 import Connection
+
+import pytest
+
+from app.core.models import SwipeDirection, SwipeFor
+from app.infra.metrics import MetricsRegistry
+from app.infra.retention import SqliteSwipeRetention, SwipeCompactor
+from app.runner.container import Container
+
+DAY = 24 * 60 * 60.0
+
+
+@pytest.fixture
+def retention(built_container: Container) -> SqliteSwipeRetention:
+    connection, writer = built_container.connection, built_container.writer
+    assert connection is not None and writer is not None
+    return SqliteSwipeRetention(connection, writer)
+
+
+def add_swipes(container: Container, swipes: list[tuple[int, str, float]]) -> None:
+    """Adds (application id, direction, age in days) swipes, one per user."""
+
+    def insert(connection: Connection) -> None:
+        connection.execute("INSERT INTO application (id, title) VALUES (1, 'kept')")
+        connection.executemany(
+            "INSERT INTO swipe (user_id, application_id, swipe_for, direction, "
+            "swiped_at) VALUES (?, ?, ?, ?, ?)",
+            [
+                (
+                    user_id,
+                    application_id,
+                    SwipeFor.APPLICATION,
+                    direction,
+                    time.time() - age * DAY,
+                )
+                for user_id, (application_id, direction, age) in enumerate(swipes)
+            ],
+        )
+
+    assert container.writer is not None
+    container.writer.execute(insert)
+
+
+def remaining(container: Container) -> list[tuple[int, str]]:
+    assert container.connection is not None
+    return container.connection.execute(
+        "SELECT application_id, direction FROM swipe ORDER BY user_id"
+    ).fetchall()
+
+
+def test_old_left_swipes_and_orphans_go_in_batches(
+    built_container: Container, retention: SqliteSwipeRetention
+) -> None:
+    add_swipes(
+        built_container,
+        [
+            (1, SwipeDirection.LEFT, 100),
+            (1, SwipeDirection.LEFT, 1),
+            (1, SwipeDirection.RIGHT, 100),
+            (2, SwipeDirection.RIGHT, 1),
+            (2, SwipeDirection.LEFT, 100),
+        ],
+    )
+
+    batches = list(retention.compact(time.time() - 90 * DAY, batch_size=2))
+    assert len(batches) == 3
+    assert sum(expired for expired, _ in batches) == 2
+    assert sum(orphaned for _, orphaned in batches) == 1
+    assert remaining(built_container) == [
+        (1, SwipeDirection.LEFT),
+        (1, SwipeDirection.RIGHT),
+    ]
+
+
+def test_compactor_counts_what_it_deleted(
+    built_container: Container, retention: SqliteSwipeRetention
+) -> None:
+    add_swipes(
+        built_container, [(1, SwipeDirection.LEFT, 100), (3, SwipeDirection.LEFT, 1)]
+    )
+    compactor = SwipeCompactor(retention, MetricsRegistry(), batch_size=1)
+
+    assert compactor.run_once() == (1, 1)
+    assert compactor.run_once() == (0, 0)
+    assert remaining(built_container) == []
@@ -0,0 +1,73 @@
+import random
+import sqlite3
+from pathlib import Path
+
+from app.core.models import SwipeDirection, SwipeFor
+from app.infra.metrics import MetricsRegistry
+from app.infra.swipe_filter import FIRST_LAYER_IDS, IdFilter, SwipeFilters
+from app.runner.settings import Settings
+
+
+def test_false_positives_stay_rare_as_the_filter_grows() -> None:
+    added = random.Random(1).sample(range(10**9), 5000)
+    id_filter = IdFilter()
+    for item in added:
+        id_filter.add(item)
+
+    # an id already reported present is not counted again
+    assert 0.99 * 5000 < len(id_filter) <= 5000
+    assert all(item in id_filter for item in added)
+    assert len(id_filter.layers) > 1
+
+    absent = set(range(10**9, 10**9 + 100_000))
+    rate = sum(item in id_filter for item in absent) / len(absent)
+    assert rate < 0.01
+    # the estimate is what gets exported, so it should be about right
+    assert abs(rate - id_filter.false_positive_rate()) < 0.005
+
+
+def test_discarded_ids_are_gone_until_added_again() -> None:
+    id_filter = IdFilter()
+    for item in range(FIRST_LAYER_IDS):
+        id_filter.add(item)
+
+    id_filter.discard(3)
+    id_filter.discard(3)
+    assert 3 not in id_filter
+    assert 4 in id_filter
+    assert len(id_filter) == FIRST_LAYER_IDS - 1
+
+    id_filter.add(3)
+    assert 3 in id_filter
+    assert len(id_filter) == FIRST_LAYER_IDS
+
+
+def test_filters_load_once_and_then_follow_recorded_swipes(
+    settings: Settings,
+) -> None:
+    connection = sqlite3.connect(Path(settings.db_path), check_same_thread=False)
+    connection.executemany(
+        "INSERT INTO swipe (user_id, application_id, swipe_for, direction, "
+        "swiped_at) VALUES (?, ?, ?, ?, 0)",
+        [
+            (1, 10, SwipeFor.APPLICATION, SwipeDirection.RIGHT),
+            (1, 11, SwipeFor.APPLICATION, SwipeDirection.LEFT),
+            (2, 10, SwipeFor.USER, SwipeDirection.RIGHT),
+        ],
+    )
+    connection.commit()
+    filters = SwipeFilters(connection, MetricsRegistry())
+
+    liked = filters.liked_applications(1)
+    assert 10 in liked and 11 not in liked
+    assert 2 in filters.liked_users(10)
+
+    # later swipes come from the write path, not from reading the table again
+    connection.execute("DELETE FROM swipe")
+    connection.commit()
+    filters.record(1, 11, SwipeFor.APPLICATION, SwipeDirection.RIGHT)
+    filters.record(1, 10, SwipeFor.APPLICATION, SwipeDirection.LEFT)
+
+    liked = filters.liked_applications(1)
+    assert 11 in liked and 10 not in liked
+    assert 2 in filters.liked_users(10)
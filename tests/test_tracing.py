@@ -0,0 +1,88 @@
+import asyncio
+import sys
+import threading
+from dataclasses import replace
+
+from fastapi.testclient import TestClient
+from starlette.concurrency import run_in_threadpool
+
+from app.infra.tracing import RingBufferExporter, Span, Tracer
+from app.runner.api import create_app
+from app.runner.settings import Settings
+from tests.conftest import register
+
+
+def test_spans_nest_across_the_threadpool() -> None:
+    spans = RingBufferExporter()
+    tracer = Tracer(exporters=[spans])
+
+    def work() -> None:
+        with tracer.span("query"):
+            pass
+
+    async def request() -> None:
+        with tracer.span("request"):
+            with tracer.span("handler"):
+                await run_in_threadpool(work)
+
+    asyncio.run(request())
+
+    query, handler, request_span = spans.find()
+    assert [query.name, handler.name, request_span.name] == [
+        "query",
+        "handler",
+        "request",
+    ]
+    assert query.trace_id == handler.trace_id == request_span.trace_id
+    assert query.parent_id == handler.span_id
+    assert handler.parent_id == request_span.span_id
+    assert request_span.parent_id is None
+    assert Tracer.current() is None
+
+
+def test_spans_can_be_read_while_they_are_exported() -> None:
+    spans = RingBufferExporter(capacity=10_000)
+    for _ in range(10_000):
+        spans.export(Span(name="old", trace_id="t"))
+    done = threading.Event()
+
+    def export() -> None:
+        while not done.is_set():
+            spans.export(Span(name="busy", trace_id="t"))
+
+    # switch threads often, so that exports land in the middle of reads
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    thread = threading.Thread(target=export)
+    thread.start()
+    try:
+        for _ in range(20):
+            assert len(spans.find("t", limit=50)) == 50
+    finally:
+        done.set()
+        thread.join()
+        sys.setswitchinterval(interval)
+
+
+def test_request_spans_are_served_by_trace(settings: Settings) -> None:
+    app = create_app(replace(settings, tracing=True, debug_token="secret"))
+    with TestClient(app) as client:
+        headers = register(client, "alice")
+        response = client.get("/users/me", headers=headers)
+        trace_id = response.headers["X-Trace-Id"]
+
+        found = client.get(
+            "/debug/spans",
+            params={"trace_id": trace_id},
+            headers={"X-Debug-Token": "secret"},
+        ).json()
+
+    by_id = {span["span_id"]: span for span in found}
+    [root] = [span for span in found if span["parent_id"] is None]
+    assert root["name"] == "GET /users/me"
+    assert len(found) > 1
+    # every other span hangs off the request, however deep
+    for span in found:
+        while span["parent_id"] is not None:
+            span = by_id[span["parent_id"]]
+        assert span is root
@@ -0,0 +1,108 @@
+import sqlite3
+import threading
+from pathlib import Path
+from sqlite3 import Connection
+from typing import Callable
+
+import pytest
+
+from app.infra.metrics import MetricsRegistry
+from app.infra.writer import SqliteWriter
+
+
+@pytest.fixture
+def db_path(tmp_path: Path) -> Path:
+    path = tmp_path / "writer.db"
+    with sqlite3.connect(path) as connection:
+        connection.execute("CREATE TABLE item (id INTEGER PRIMARY KEY, name TEXT)")
+    return path
+
+
+def insert(name: str) -> Callable[[Connection], int]:
+    def operation(connection: Connection) -> int:
+        cursor = connection.execute("INSERT INTO item (name) VALUES (?)", [name])
+        return int(cursor.lastrowid or 0)
+
+    return operation
+
+
+def names(path: Path) -> list[str]:
+    with sqlite3.connect(path) as connection:
+        return [name for (name,) in connection.execute("SELECT name FROM item")]
+
+
+def test_writes_queued_during_a_commit_go_in_one_batch(db_path: Path) -> None:
+    metrics = MetricsRegistry()
+    writer = SqliteWriter(db_path, metrics=metrics)
+    started, release = threading.Event(), threading.Event()
+
+    def block(connection: Connection) -> None:
+        started.set()
+        release.wait(5)
+
+    try:
+        first = writer.submit(block)
+        assert started.wait(5)
+        queued = [writer.submit(insert(f"item {i}")) for i in range(3)]
+        release.set()
+
+        first.result(5)
+        assert [future.result(5) for future in queued] == [1, 2, 3]
+    finally:
+        writer.close()
+
+    batches = metrics.histogram("sqlite_write_batch_size", "").values[()]
+    # one batch of 1 and one of 3, with 4 writes in total
+    assert sum(batches[:-1]) == 2
+    assert batches[-1] == 4
+
+
+def test_a_failing_write_only_rolls_back_its_own_savepoint(db_path: Path) -> None:
+    writer = SqliteWriter(db_path)
+    started, release = threading.Event(), threading.Event()
+
+    def block(connection: Connection) -> None:
+        started.set()
+        release.wait(5)
+
+    def fail(connection: Connection) -> None:
+        connection.execute("INSERT INTO item (name) VALUES ('failed')")
+        raise ValueError("no")
+
+    try:
+        writer.submit(block)
+        assert started.wait(5)
+        before = writer.submit(insert("before"))
+        failing = writer.submit(fail)
+        after = writer.submit(insert("after"))
+        release.set()
+
+        before.result(5)
+        after.result(5)
+        with pytest.raises(ValueError):
+            failing.result(5)
+    finally:
+        writer.close()
+
+    assert names(db_path) == ["before", "after"]
+
+
+def test_execute_returns_once_the_write_is_committed(db_path: Path) -> None:
+    writer = SqliteWriter(db_path)
+    try:
+        writer.execute(insert("durable"))
+        assert names(db_path) == ["durable"]
+    finally:
+        writer.close()
+
+
+def test_slow_writes_are_logged(
+    db_path: Path, caplog: pytest.LogCaptureFixture
+) -> None:
+    writer = SqliteWriter(db_path, slow_query_seconds=0.0)
+    try:
+        writer.execute(insert("slow"))
+    finally:
+        writer.close()
+
+    assert any("INSERT INTO item" in record.getMessage() for record in caplog.records)